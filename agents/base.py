@@ -1,6 +1,7 @@
 # agents/base.py
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Callable, Optional
 
 from llm_client import LLMClient
 
@@ -17,16 +18,40 @@ class BaseAgent(ABC):
         self.llm = llm_client
 
     @abstractmethod
-    def run(self, *args, **kwargs) -> Any:
+    async def arun(self, *args, **kwargs) -> Any:
         """
         Main entry for the agent.
         """
         raise NotImplementedError
 
-    def _chat(self, user_content: str) -> str:
+    def run(self, *args, **kwargs) -> Any:
+        """
+        Blocking wrapper around arun() for callers without an event loop.
+        The LLM client's async connections are closed before the loop ends.
+        """
+        async def run_and_close() -> Any:
+            try:
+                return await self.arun(*args, **kwargs)
+            finally:
+                await self.llm.aclose_async_client()
+
+        return asyncio.run(run_and_close())
+
+    def _chat(self, user_content: str, validate: Optional[Callable[[str], bool]] = None,
+              refresh: bool = False) -> str:
+        """
+        Helper to call LLM with a single user message. Only replies
+        `validate` accepts are cached (see LLMClient.chat).
+        """
+        messages = [{"role": "user", "content": user_content}]
+        return self.llm.chat(self.system_prompt, messages, validate=validate, refresh=refresh)
+
+    async def _achat(self, user_content: str, validate: Optional[Callable[[str], bool]] = None,
+                     refresh: bool = False) -> str:
         """
-        Helper to call LLM with a single user message.
+        Async helper to call LLM with a single user message.
         """
         messages = [{"role": "user", "content": user_content}]
-        return self.llm.chat(self.system_prompt, messages)
+        return await self.llm.achat(self.system_prompt, messages,
+                                    validate=validate, refresh=refresh)
 
@@ -1,17 +1,32 @@
 # agents/coder_agent.py
-import json
 import re
-import base64
-from typing import List
+import time
+import asyncio
+from fnmatch import fnmatch
+from typing import Any, AsyncIterator, Callable, Collection, Dict, List, Optional, Set, Tuple, Union
 
+import telemetry
 from agents.base import BaseAgent
-from tasks import Task
-from tools.file_tools import create_file
-from config import USE_REAL_LLM
+from tasks import Task, FileResult
+from hedging import HedgePolicy, first_valid
+from scheduler import arun_task_graph, arun_task_stream
+from tools.file_tools import FileTransaction, create_file, ensure_workspace_subpath, replace_if_changed
+from tools.stream_decode import StreamingB64Decoder
+from tools.file_frames import decode_frame, parse_file_frames
+from tools.json_repair import find_string_field, loads_lenient
+from tools.prompt_context import CoderPrompt
+from config import (
+    USE_REAL_LLM, CODER_MAX_WORKERS, CODER_STREAMING, CODER_STREAM_MAX_BYTES,
+    CODER_BATCH_MODE, CODER_BATCH_MAX_FILES, CODER_CONTEXT_MAX_CHARS, CODER_HEDGING,
+    CODER_CRITICAL_FILES,
+)
 
 
 CODER_SYSTEM_PROMPT = """
 You are CoderAgent.
+The request gives the project architecture, the interfaces of files the
+task depends on (already written; import from them, keep their names and
+signatures) and, under "## Request", the file to write.
 You MUST output EXACTLY ONE JSON object.
 FORMAT:
 {
@@ -22,101 +37,370 @@ Rules:
 - Generate ONLY one file per request.
 - DO NOT add explanations.
 - DO NOT wrap JSON in code fences.
-- Base64 must be a single-line string.
+- Base64 must be a single-line string, including its "=" padding.
+- You MAY add "sha256": "<hex digest of the decoded content>", only if you can compute it exactly.
 """
 
+CODER_BATCH_SYSTEM_PROMPT = """
+You are CoderAgent in batch mode.
+The request gives the project architecture, the interfaces of files the
+task depends on (already written; import from them, keep their names and
+signatures) and, under "## Request", a task and a list of files.
+Generate EVERY listed file.
+FORMAT, repeated once per file:
+=== FILE: relative/path/to/file ===
+<base64 encoded file content, lines of at most 76 characters>
+=== END FILE: relative/path/to/file ===
+Rules:
+- Use exactly the paths from the request.
+- You MAY append " sha256=<hex digest of the decoded content>" to the END FILE path, only if you can compute it exactly.
+- DO NOT add explanations or code fences.
+"""
+
+BINARY_EXT = (".ico", ".png", ".jpg", ".jpeg", ".gif", ".pdf")
+
+
 class CoderAgent(BaseAgent):
-    def __init__(self, llm_client):
+    def __init__(self, llm_client, max_workers: int = CODER_MAX_WORKERS,
+                 streaming: bool = CODER_STREAMING, batch: bool = CODER_BATCH_MODE,
+                 hedging: bool = CODER_HEDGING,
+                 critical_files: Collection[str] = CODER_CRITICAL_FILES):
         super().__init__("coder", CODER_SYSTEM_PROMPT, llm_client)
+        self.max_workers = max_workers
+        self.streaming = streaming
+        self.batch = batch
+        self.hedge: Optional[HedgePolicy] = HedgePolicy() if hedging else None
+        self.critical_files = tuple(critical_files)
+
+    async def arun(
+        self,
+        tasks: Union[List[Task], AsyncIterator[Task]],
+        project_root: str,
+        only_files: Optional[Collection[str]] = None,
+        on_result: Optional[Callable[[FileResult], None]] = None,
+        architecture: Optional[Dict[str, Any]] = None,
+    ) -> List[FileResult]:
+        """
+        Generate the files of `tasks` in dependency order. `tasks` may also
+        be an async iterator, e.g. tasks streamed from the planner; each one
+        starts as soon as its dependencies are done.
 
-    def run(self, tasks: List[Task], project_root: str) -> None:
+        Every request starts with the same `architecture` prefix followed by
+        the interfaces of the files of the task's dependencies, so providers
+        with prompt caching reuse the shared part.
+
+        If `only_files` is given, files outside it are kept as they are and
+        reported as "unchanged". `on_result` is called as each file finishes.
+        """
         if not USE_REAL_LLM:
             raise RuntimeError("Real LLM required for CoderAgent")
 
         print("=== DeepSeek CoderAgent generating code ===")
+        print(f"Generating up to {self.max_workers} files in parallel")
 
-        binary_ext = (".ico", ".png", ".jpg", ".jpeg", ".gif", ".pdf")
+        # One shared request per batch of a task's files (batch mode)
+        batches: Dict[Tuple[int, Tuple[str, ...]], asyncio.Future] = {}
+        prompt = CoderPrompt(project_root, architecture, CODER_CONTEXT_MAX_CHARS)
+        # Tasks seen so far; a task's dependencies always start before it does
+        known: Dict[int, Task] = {}
 
-        for task in tasks:
-            print(f"\n[Task {task.id}] {task.name}")
-            for file_path in task.files:
+        async def work(task: Task, file_path: str) -> FileResult:
+            known[task.id] = task
+            deps = [f for d in task.depends_on if d in known for f in known[d].files]
+            if only_files is not None and file_path not in only_files:
+                result = FileResult(task.id, file_path, "unchanged")
+            else:
+                with telemetry.span("coder.file", task=task.id, path=file_path) as span:
+                    try:
+                        result = None
+                        if self.batch:
+                            result = await self._generate_batched(task, file_path, project_root,
+                                                                  only_files, batches, prompt, deps)
+                        if result is None:
+                            result = await self._generate_file(task, file_path, project_root,
+                                                               prompt, deps)
+                    except Exception as e:
+                        result = FileResult(task.id, file_path, "failed", f"{type(e).__name__}: {e}")
+                        span.error = result.error
+                    span.attrs["status"] = result.status
+            if on_result is not None:
+                on_result(result)
+            return result
 
-                print(f" → Generating file: {file_path}")
+        if isinstance(tasks, list):
+            results = await arun_task_graph(tasks, work, max_workers=self.max_workers)
+        else:
+            results = await arun_task_stream(tasks, work, max_workers=self.max_workers)
 
-                # Skip binary files
-                if file_path.lower().endswith(binary_ext):
-                    print(f"⚠ Skipping binary file: {file_path}")
-                    create_file(f"{project_root}/{file_path}", "")
-                    continue
+        failed = [r for r in results if not r.ok]
+        kept = sum(r.status == "unchanged" for r in results)
+        print(f"\n=== CoderAgent completed all tasks "
+              f"({len(results) - len(failed)}/{len(results)} files ok, {kept} unchanged) ===")
+        for r in failed:
+            print(f"⚠ [Task {r.task_id}] {r.path}: {r.status} ({r.error})")
+        if self.hedge is not None and self.hedge.hedges:
+            print(f"Hedged {self.hedge.hedges} of {self.hedge.requests} request(s); "
+                  f"the duplicate won {self.hedge.wins} time(s)")
+        return results
 
-                payload = json.dumps({
-                    "project_root": project_root,
-                    "file_path": file_path,
-                    "task_name": task.name,
-                    "task_description": task.description
-                }, ensure_ascii=False)
+    async def _generate_file(self, task: Task, file_path: str, project_root: str,
+                             prompt: CoderPrompt, deps: List[str]) -> FileResult:
+        print(f" → [Task {task.id}] Generating file: {file_path}")
 
-                # retry
-                raw = None
-                for attempt in range(3):
-                    raw = self._chat(payload)
-                    clean = self._extract_json(raw)
-                    if self._is_json(clean):
-                        break
-                    print(f"⚠ Non-JSON (attempt {attempt+1}/3). Retrying...")
+        # Skip binary files
+        if file_path.lower().endswith(BINARY_EXT):
+            print(f"⚠ Skipping binary file: {file_path}")
+            create_file(f"{project_root}/{file_path}", "")
+            return FileResult(task.id, file_path, "ok")
 
-                if not self._is_json(clean):
-                    print("⚠ Attempting JSON repair...")
-                    clean = self._repair_json(clean)
+        payload = prompt.build({
+            "project_root": project_root,
+            "file_path": file_path,
+            "task_name": task.name,
+            "task_description": task.description
+        }, deps)
 
-                data = json.loads(clean)
+        if self.streaming:
+            try:
+                return await self._stream_file(task, file_path, project_root, payload)
+            except Exception as e:
+                print(f"⚠ Streaming failed for {file_path} ({e}). Falling back to buffered mode...")
 
-                # Strip whitespace from Base64
-                content_b64 = data["content_b64"].replace("\n", "").replace(" ", "")
+        # Replies are recovered locally first; only unrecoverable ones are
+        # regenerated. Only replies that decode are cached, and retries skip
+        # the cache so they reach the API.
+        decoded: Dict[str, Optional[Tuple[Optional[str], str]]] = {}
 
-                # Fix padding
-                missing = len(content_b64) % 4
-                if missing:
-                    content_b64 += "=" * (4 - missing)
+        def valid(raw: str) -> bool:
+            decoded[raw] = self._decode_reply(raw)
+            return decoded[raw] is not None
 
-                # Decode Base64
-                content = base64.b64decode(content_b64).decode("utf-8", errors="ignore")
+        reply = None
+        for attempt in range(3):
+            if self.hedge is not None:
+                raw, reply = await self._hedged_reply(payload, file_path, valid, refresh=attempt > 0)
+            else:
+                raw = await self._achat(payload, validate=valid, refresh=attempt > 0)
+                reply = decoded[raw] if raw in decoded else self._decode_reply(raw)
+            if reply is not None:
+                break
+            print(f"⚠ Unrecoverable reply for {file_path} (attempt {attempt+1}/3). Retrying...")
+            telemetry.record(retries=1)
 
-                final_path = f"{project_root}/{data['path']}"
-                create_file(final_path, content)
+        if reply is None:
+            print(f"⚠ Attempting JSON repair for {file_path}...")
+            repaired = await self._repair_json(raw, valid)
+            reply = decoded[repaired] if repaired in decoded else self._decode_reply(repaired)
+            if reply is None:
+                raise ValueError(f"No valid content_b64 could be recovered for {file_path}")
 
-                print("✔ File generated:", final_path)
+        path, content = reply
+        self._check_reply_path(file_path, path)
 
-        print("\n=== CoderAgent completed all tasks ===")
+        final_path = f"{project_root}/{file_path}"
+        if create_file(final_path, content):
+            telemetry.record(bytes_written=len(content.encode("utf-8")))
+            print("✔ File generated:", final_path)
+        else:
+            print("✔ File generated (unchanged on disk):", final_path)
+        return FileResult(task.id, file_path, "ok")
 
-    # ---------------------- Utilities ----------------------
+    def _check_reply_path(self, file_path: str, reply_path: Optional[str]) -> None:
+        # The reply's "path" is only echoed back: the planned path is always
+        # the one written, so a reply cannot redirect content elsewhere
+        if reply_path and reply_path != file_path:
+            print(f"⚠ Reply for {file_path} named another path ({reply_path}); ignoring it")
+
+    async def _hedged_reply(self, payload: str, file_path: str, valid: Callable[[str], bool],
+                            refresh: bool = False) -> Tuple[str, Optional[Tuple[Optional[str], str]]]:
+        """
+        Request `file_path`, racing a duplicate request when the first one is
+        slow or the file is critical. The first reply that decodes and, for
+        Python files, compiles wins; if none does, the first decodable one is
+        used. `valid` gates caching, as in _achat(). Returns (raw reply,
+        decoded reply or None).
+        """
+        def accept(raw: str) -> Optional[Tuple[Optional[str], str]]:
+            reply = self._decode_reply(raw)
+            if reply is not None and _compiles(file_path, reply[1]):
+                return reply
+            return None
+
+        critical = any(fnmatch(file_path, p) for p in self.critical_files)
+        reply, replies = await first_valid(
+            lambda: self._achat(payload, validate=valid, refresh=refresh),
+            accept, self.hedge, critical)
+        if reply is not None:
+            return replies[-1], reply
+        for raw in replies:
+            reply = self._decode_reply(raw)
+            if reply is not None:
+                return raw, reply
+        return replies[-1], None
+
+    async def _generate_batched(
+        self,
+        task: Task,
+        file_path: str,
+        project_root: str,
+        only_files: Optional[Collection[str]],
+        batches: Dict[Tuple[int, Tuple[str, ...]], asyncio.Future],
+        prompt: CoderPrompt,
+        deps: List[str],
+    ) -> Optional[FileResult]:
+        """
+        Generate `file_path` through one multi-file request shared with up to
+        CODER_BATCH_MAX_FILES sibling files of the same task. The files of a
+        batch are written together by _request_batch(). Returns None when the
+        file is not batched or its frame failed to decode, so the caller
+        falls back to a single-file request.
+        """
+        eligible = [
+            f for f in dict.fromkeys(task.files)
+            if not f.lower().endswith(BINARY_EXT) and (only_files is None or f in only_files)
+        ]
+        if file_path not in eligible:
+            return None
+        i = eligible.index(file_path) // CODER_BATCH_MAX_FILES * CODER_BATCH_MAX_FILES
+        group = tuple(eligible[i:i + CODER_BATCH_MAX_FILES])
+        if len(group) < 2:
+            return None
 
-    def _extract_json(self, text: str) -> str:
-        """Extract first valid {...} block."""
-        t = text.strip()
+        key = (task.id, group)
+        if key not in batches:
+            batches[key] = asyncio.ensure_future(
+                self._request_batch(task, group, project_root, prompt, deps))
+        try:
+            files, written_paths = await batches[key]
+        except Exception as e:
+            print(f"⚠ Batch request for task {task.id} failed ({e}). Falling back to single files...")
+            return None
+
+        content = files.get(file_path)
+        if content is None:
+            print(f"⚠ {file_path} missing or invalid in batch reply. Falling back to single file...")
+            return None
+        final_path = f"{project_root}/{file_path}"
+        written = file_path in written_paths
+        telemetry.record(batched=True, bytes_written=len(content.encode("utf-8")) if written else 0)
+        print(f"✔ File generated (batched{'' if written else ', unchanged on disk'}):", final_path)
+        return FileResult(task.id, file_path, "ok")
 
-        # remove fences
-        t = t.replace("```json", "").replace("```", "")
+    async def _request_batch(self, task: Task, group: Tuple[str, ...], project_root: str,
+                             prompt: CoderPrompt, deps: List[str]) -> Tuple[Dict[str, str], Set[str]]:
+        """
+        Request a batch of files and write every file that decoded in one
+        FileTransaction. Returns ({path: content}, paths that changed on disk).
+        """
+        print(f" → [Task {task.id}] Generating {len(group)} files in one request: {list(group)}")
+        payload = prompt.build({
+            "project_root": project_root,
+            "files": list(group),
+            "task_name": task.name,
+            "task_description": task.description
+        }, deps)
+        # Cached only if every file of the group came back intact
+        raw = await self.llm.achat(CODER_BATCH_SYSTEM_PROMPT, [{"role": "user", "content": payload}],
+                                   validate=lambda r: set(group) <= parse_file_frames(r).keys())
+        files = {f: c for f, c in parse_file_frames(raw).items() if f in group}
+        with FileTransaction() as tx:
+            for f, content in files.items():
+                tx.stage(f"{project_root}/{f}", content)
+        written = set(tx.written)
+        return files, {f for f in files
+                       if ensure_workspace_subpath(f"{project_root}/{f}", create_parent=False) in written}
 
-        # find first { and last }
-        start = t.find("{")
-        end = t.rfind("}")
-        if start == -1 or end == -1 or end <= start:
-            return ""
-        return t[start:end+1]
+    async def _stream_file(self, task: Task, file_path: str, project_root: str,
+                           payload: str) -> FileResult:
+        """
+        Generate one file in streaming mode: Base64 is decoded as it arrives
+        and written to a .part file that replaces the target once complete.
+        """
+        target = ensure_workspace_subpath(f"{project_root}/{file_path}")
+        part = target.with_name(target.name + ".part")
+        messages = [{"role": "user", "content": payload}]
 
-    def _is_json(self, text: str) -> bool:
-        if not text.strip().startswith("{"): return False
+        start = time.perf_counter()
+        ttfb: Optional[float] = None
         try:
-            json.loads(text)
-            return True
-        except:
-            return False
+            with part.open("wb") as out:
+                decoder = StreamingB64Decoder(out, max_bytes=CODER_STREAM_MAX_BYTES)
+                stream = self.llm.astream(self.system_prompt, messages)
+                try:
+                    async for chunk in stream:
+                        if ttfb is None:
+                            ttfb = time.perf_counter() - start
+                        decoder.feed(chunk)
+                finally:
+                    # Closes the HTTP stream early when the decoder aborts
+                    await stream.aclose()
+                decoder.close()
+
+            self._check_reply_path(file_path, decoder.path)
+            final_path = f"{project_root}/{file_path}"
+            written = replace_if_changed(part, target)
+        finally:
+            if part.exists():
+                part.unlink()
+
+        total = time.perf_counter() - start
+        telemetry.record(streamed=True, ttfb=ttfb,
+                         bytes_written=decoder.bytes_written if written else 0)
+        print(f"✔ File generated{'' if written else ' (unchanged on disk)'}: {final_path} "
+              f"({decoder.bytes_written} bytes, first chunk {ttfb or 0:.2f}s, total {total:.2f}s)")
+        return FileResult(task.id, file_path, "ok", ttfb=ttfb)
+
+    # ---------------------- Utilities ----------------------
 
-    def _repair_json(self, broken: str) -> str:
+    def _decode_reply(self, raw: str) -> Optional[Tuple[Optional[str], str]]:
+        """
+        Recover (path, file content) from a coder reply without another LLM
+        call. The reply is parsed leniently (fences, prose, trailing commas,
+        raw newlines); content_b64 itself is taken by regex so only a closed
+        string counts. The Base64 (padding included) and UTF-8 are decoded
+        strictly and checked against the optional sha256, so a cut-off file
+        is never returned.
+        Returns None if the reply is unusable.
+        """
+        content_b64 = find_string_field(raw, "content_b64")
+        if content_b64 is None:
+            return None
+        try:
+            data = loads_lenient(raw)
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            path, sha256 = data.get("path"), data.get("sha256")
+        else:
+            path, sha256 = find_string_field(raw, "path"), find_string_field(raw, "sha256")
+
+        # Not padded here: a length that is not a multiple of 4 means
+        # characters are missing, and padding would accept a cut-off file
+        b64 = "".join(content_b64.split())
+        if len(b64) % 4:
+            print("⚠ Base64 content is truncated")
+            return None
+        content = decode_frame(b64, sha256 if isinstance(sha256, str) else None)
+        if content is None:
+            print("⚠ Base64 content failed to decode or did not match its sha256")
+            return None
+        return (path if isinstance(path, str) else None), content
+
+    async def _repair_json(self, broken: str, valid: Optional[Callable[[str], bool]] = None) -> str:
         """Ask LLM to repair JSON output."""
         repair_prompt = (
             "Fix this JSON. Output JSON only, no commentary:\n"
         )
-        fixed = self.llm.chat(repair_prompt, [{"role": "user", "content": broken}])
-        return self._extract_json(fixed)
+        with telemetry.span("coder.repair_json", size=len(broken)):
+            return await self.llm.achat(repair_prompt, [{"role": "user", "content": broken}],
+                                        validate=valid)
+
+
+def _compiles(path: str, content: str) -> bool:
+    if not path.endswith(".py"):
+        return True
+    try:
+        compile(content, path, "exec")
+    except (SyntaxError, ValueError):
+        return False
+    return True
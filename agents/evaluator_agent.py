@@ -1,13 +1,19 @@
 # agents/evaluator_agent.py
+import os
 import json
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Collection, Dict, List, Optional
 
+import telemetry
 from llm_client import LLMClient
 from agents.base import BaseAgent
 from tasks import Task, EvaluationResult
-from tools.exec_tools import run_command
+from tools.eval_tools import EvalCache, check_python_source, issues_pass, project_context
+from tools.exec_tools import find_jobs, get_runner
 from tools.file_tools import ensure_workspace_subpath
+from config import EVALUATOR_WORKERS, EVAL_CACHE_PATH, EVALUATOR_RUN_TESTS
 
 
 EVALUATOR_SYSTEM_PROMPT = """
@@ -19,41 +25,125 @@ Return JSON: {"passed": bool, "issues": [string, ...]}
 
 
 class EvaluatorAgent(BaseAgent):
-    def __init__(self, llm_client: LLMClient):
+    def __init__(self, llm_client: LLMClient, workers: Optional[int] = EVALUATOR_WORKERS,
+                 run_tests: bool = EVALUATOR_RUN_TESTS):
         super().__init__("evaluator", EVALUATOR_SYSTEM_PROMPT, llm_client)
+        self.workers = workers
+        self.run_tests = run_tests
+        self.cache = EvalCache(EVAL_CACHE_PATH)
 
-    def run(self, tasks: List[Task], project_root: str) -> List[EvaluationResult]:
+    async def arun(
+        self,
+        tasks: List[Task],
+        project_root: str,
+        only_files: Optional[Collection[str]] = None,
+    ) -> List[EvaluationResult]:
         """
-        Evaluate the generated project.
+        Evaluate the generated project and return one EvaluationResult per file.
         Currently we do lightweight checks:
         - Ensure expected files exist.
-        - Try to compile Python files.
+        - Compile, lint and import-check Python files in a process pool.
+        - Run the project's pytest files (or smoke-import its entry point)
+          in the sandbox pool, with results merged into the files' results.
+        Check results are cached by content hash, so unchanged files are not
+        re-checked. If `only_files` is given, only those files are checked,
+        and tests run only if it is non-empty.
         """
-        results: List[EvaluationResult] = []
+        with telemetry.span("evaluator", project_root=project_root) as span:
+            results = await self._evaluate(tasks, project_root, only_files)
+            span.attrs["failed"] = sum(not r.passed for r in results)
+        return results
 
+    async def _evaluate(
+        self,
+        tasks: List[Task],
+        project_root: str,
+        only_files: Optional[Collection[str]],
+    ) -> List[EvaluationResult]:
         root_path = ensure_workspace_subpath(project_root)
 
-        # File existence check
-        missing_files = []
+        owner: Dict[str, int] = {}
         for t in tasks:
             for f in t.files:
-                target = root_path / f
-                if not target.exists():
-                    missing_files.append(str(target))
+                owner[f] = t.id
 
-        issues = []
-        if missing_files:
-            issues.append(f"Missing files: {missing_files}")
+        wanted = set(owner) if only_files is None else set(only_files)
+        if only_files is None:
+            # Also check Python files the model created outside the plan
+            wanted.update(p.relative_to(root_path).as_posix() for p in root_path.rglob("*.py"))
 
-        # Try compileall
-        code, out, err = run_command(["python", "-m", "compileall", project_root])
-        if code != 0:
-            issues.append(f"Python compileall failed: {err}")
+        results: List[EvaluationResult] = []
+        to_check: Dict[str, str] = {}
+        context = project_context(root_path)
 
-        # You could also call LLM here with logs & issues for richer analysis.
-        # For now we simply aggregate into one EvaluationResult.
-        passed = len(issues) == 0
-        results.append(EvaluationResult(task_id=-1, passed=passed, issues=issues))
+        for f in sorted(wanted):
+            target = root_path / f
+            if not target.is_file():
+                results.append(EvaluationResult(owner.get(f, -1), False, ["Missing file"], path=f))
+                continue
+            if not f.endswith(".py"):
+                results.append(EvaluationResult(owner.get(f, -1), True, path=f))
+                continue
+            content = target.read_bytes()
+            key = EvalCache.make_key(f, content, context)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results.append(EvaluationResult(owner.get(f, -1), issues_pass(cached), list(cached), path=f))
+            else:
+                to_check[f] = key
+
+        if to_check:
+            workers = min(len(to_check), self.workers or os.cpu_count() or 1)
+            print(f"Checking {len(to_check)} Python file(s) with {workers} worker(s), "
+                  f"{len(wanted) - len(to_check)} file(s) cached or non-Python")
+            loop = asyncio.get_running_loop()
+            with telemetry.span("evaluator.check", files=len(to_check), workers=workers), \
+                    ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    f: loop.run_in_executor(
+                        pool, check_python_source,
+                        (root_path / f).read_text(encoding="utf-8", errors="replace"),
+                        f, context,
+                    )
+                    for f in to_check
+                }
+                for f, fut in futures.items():
+                    issues = await fut
+                    self.cache.put(to_check[f], issues)
+                    results.append(EvaluationResult(owner.get(f, -1), issues_pass(issues), issues, path=f))
+            self.cache.save()
 
+        if self.run_tests and (only_files is None or only_files):
+            await self._run_tests(root_path, results, owner)
+
+        # You could also call LLM here with logs & issues for richer analysis.
+        results.sort(key=lambda r: r.path)
         return results
 
+    async def _run_tests(self, root_path: Path, results: List[EvaluationResult],
+                         owner: Dict[str, int]) -> None:
+        """
+        Run the project's tests in the sandbox pool and fold each job's
+        outcome into the result of its test or entry-point file.
+        """
+        jobs = find_jobs(root_path)
+        if not jobs:
+            return
+        by_path = {r.path: r for r in results}
+        runner = get_runner()
+        print(f"Running {len(jobs)} {jobs[0].kind} job(s) with {runner.workers} worker(s)")
+        failed = 0
+        with telemetry.span("evaluator.tests", jobs=len(jobs)) as span:
+            async for job_result in runner.stream(jobs):
+                failed += not job_result.passed
+                path = job_result.job.target
+                mark = "✔" if job_result.passed else "⚠"
+                print(f"{mark} {path}: {job_result.status} in {job_result.duration:.2f}s")
+                result = by_path.get(path)
+                if result is None:
+                    result = by_path[path] = EvaluationResult(owner.get(path, -1), True, path=path)
+                    results.append(result)
+                # A new list: the static issues may be shared with the eval cache
+                result.issues = result.issues + job_result.issues()
+                result.passed = result.passed and job_result.passed
+            span.attrs["failed"] = failed
@@ -1,10 +1,12 @@
 # agents/planner_agent.py
 import json
-import re
-from typing import List
+from typing import Any, AsyncIterator, Dict, List, Union
 
+import telemetry
 from agents.base import BaseAgent
 from tasks import Plan, Task
+from tools.json_stream import JSONStreamScanner
+from tools.json_repair import repair_json
 
 
 PLANNER_SYSTEM_PROMPT = """
@@ -33,6 +35,8 @@ Your job:
 3. IMPORTANT RULES:
    - Output ONLY JSON (no markdown, no explanation)
    - "files" must NOT include project_root prefix
+   - Write "architecture" before "tasks", and list every task after
+     the tasks in its "depends_on"
    - Always include at least:
        main.py
        utils.py
@@ -40,24 +44,124 @@ Your job:
        requirements.txt
 """
 
+# Keys a task object needs to be usable
+TASK_KEYS = {"id", "name", "description"}
+
+
 class PlannerAgent(BaseAgent):
     def __init__(self, llm_client):
         super().__init__("planner", PLANNER_SYSTEM_PROMPT, llm_client)
 
-    def run(self, requirement: str) -> Plan:
+    async def arun(self, requirement: str) -> Plan:
+        print("Requirement received:", requirement)
+
+        with telemetry.span("planner"):
+            raw = await self._achat(requirement, validate=self._plan_parses)
+            plan = self._parse_plan(raw)
+            telemetry.record(tasks=len(plan.tasks))
+        return plan
+
+    async def astream_plan(self, requirement: str) -> AsyncIterator[Union[Dict[str, Any], Task]]:
+        """
+        Stream the plan: yield the architecture dict first, then each Task as
+        soon as its JSON object has arrived, then any tasks added to ensure
+        the minimal project structure.
+
+        If the stream fails or ends before the plan is complete (e.g. a
+        truncated reply), the rest comes from the buffered planner: its
+        tasks not streamed already are yielded, keeping the streamed
+        architecture if one was yielded.
+        """
         print("Requirement received:", requirement)
 
-        raw = self._chat(requirement)
+        scanner = JSONStreamScanner()
+        architecture = None
+        held: List[Dict[str, Any]] = []
+        tasks: List[Task] = []
+        messages = [{"role": "user", "content": requirement}]
+
+        with telemetry.span("planner", streamed=True):
+            try:
+                async for chunk in self.llm.astream(self.system_prompt, messages):
+                    for kind, key, value in scanner.feed(chunk):
+                        if key == "architecture" and kind == "member":
+                            architecture = self._normalize_architecture(value)
+                            yield architecture
+                        elif key == "tasks" and kind == "item":
+                            held.append(value)
+                        if architecture is not None:
+                            for t in held:
+                                tasks.append(self._make_task(architecture["project_root"], t))
+                                yield tasks[-1]
+                            held.clear()
+                if not scanner.complete or architecture is None:
+                    raise ValueError("Planner reply ended before the plan was complete")
+            except Exception as e:
+                print(f"⚠ Streamed plan failed ({type(e).__name__}: {e}); "
+                      "falling back to the buffered planner")
+                telemetry.record(fallback=True)
+                plan = await self.arun(requirement)
+                if architecture is None:
+                    architecture = plan.architecture
+                    yield architecture
+                for t in self._remaining_tasks(plan.tasks, tasks):
+                    tasks.append(t)
+                    yield t
+            telemetry.record(tasks=len(tasks))
+
+        count = len(tasks)
+        self._ensure_minimal_structure(architecture, tasks)
+        for t in tasks[count:]:
+            yield t
+
+    # -------- helper methods --------
+
+    def _remaining_tasks(self, planned: List[Task], streamed: List[Task]) -> List[Task]:
+        # Tasks of the buffered plan not streamed already, by id; its
+        # auto-created tasks are dropped when the files are already covered
+        ids = {t.id for t in streamed}
+        files = {f for t in streamed for f in t.files}
+        remaining = []
+        for t in planned:
+            if t.id in ids or (t.files and set(t.files) <= files):
+                continue
+            remaining.append(t)
+            files.update(t.files)
+        return remaining
+
+    def _plan_parses(self, raw: str) -> bool:
+        # Only plans that parse are cached
+        try:
+            data = json.loads(self._clean_json(raw), strict=False)
+        except ValueError:
+            return False
+        return isinstance(data, dict) and "architecture" in data and "tasks" in data
+
+    def _parse_plan(self, raw: str) -> Plan:
         clean = self._clean_json(raw)
 
         try:
-            data = json.loads(clean)
+            data = json.loads(clean, strict=False)
         except Exception as e:
             print("LLM returned invalid JSON:")
             print(raw)
             raise ValueError(f"JSON decode failed: {e}\nCleaned JSON:\n{clean}")
 
-        architecture = data["architecture"]
+        architecture = self._normalize_architecture(data["architecture"])
+        project_root = architecture["project_root"]
+
+        # Normalize tasks; a task cut off by a truncated reply is dropped
+        complete = [t for t in data["tasks"] if isinstance(t, dict) and TASK_KEYS <= t.keys()]
+        if len(complete) < len(data["tasks"]):
+            print(f"⚠ Dropped {len(data['tasks']) - len(complete)} incomplete task(s) from the plan")
+        tasks: List[Task] = [self._make_task(project_root, t) for t in complete]
+
+        # Ensure minimal structure for simple tasks
+        self._ensure_minimal_structure(architecture, tasks)
+
+        return Plan(architecture=architecture, tasks=tasks)
+
+    def _normalize_architecture(self, architecture: Dict[str, Any]) -> Dict[str, Any]:
         project_root = architecture["project_root"]
 
         # Fix missing language/framework
@@ -71,34 +175,25 @@ class PlannerAgent(BaseAgent):
             self._normalize_path(project_root, m)
             for m in architecture.get("modules", [])
         ]
+        return architecture
 
-        # Normalize tasks
-        tasks: List[Task] = []
-        for t in data["tasks"]:
-            normalized_files = [
-                self._normalize_path(project_root, f)
-                for f in t.get("files", [])
-            ]
-            tasks.append(Task(
-                id=int(t["id"]),
-                name=t["name"],
-                description=t["description"],
-                files=normalized_files,
-                depends_on=[int(x) for x in t.get("depends_on", [])]
-            ))
-
-        # Ensure minimal structure for simple tasks
-        self._ensure_minimal_structure(architecture, tasks)
-
-        return Plan(architecture=architecture, tasks=tasks)
-
-    # -------- helper methods --------
+    def _make_task(self, project_root: str, t: Dict[str, Any]) -> Task:
+        normalized_files = [
+            self._normalize_path(project_root, f)
+            for f in t.get("files", [])
+        ]
+        return Task(
+            id=int(t["id"]),
+            name=t["name"],
+            description=t["description"],
+            files=normalized_files,
+            depends_on=[int(x) for x in t.get("depends_on", [])]
+        )
 
     def _clean_json(self, text: str) -> str:
-        clean = text.strip()
-        clean = re.sub(r"^```(?:json|python)?", "", clean)
-        clean = clean.replace("```", "").strip()
-        return clean
+        # Strips fences and prose, fixes trailing commas and raw newlines,
+        # and closes a truncated reply
+        return repair_json(text)
 
     def _normalize_path(self, project_root: str, path: str) -> str:
         if path.startswith(project_root + "/"):
@@ -0,0 +1,222 @@
+# batch_build.py
+import re
+import json
+import time
+import asyncio
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+import telemetry
+from config import (
+    WORKSPACE_ROOT, MANIFEST_NAME, LOG_DIR, BATCH_MAX_PROJECTS, BATCH_WORKSPACE,
+    BATCH_RESULTS_PATH, BATCH_POLL_INTERVAL, EVALUATOR_RUN_TESTS,
+)
+from llm_client import LLMClient
+from rate_limit import FairShareLimiter, current_project
+from main import abuild, ensure_workspace
+from tools.exec_tools import close_runner
+
+
+@dataclass
+class BuildRequest:
+    id: str
+    requirement: str
+
+
+def load_requests(source: Path) -> List[BuildRequest]:
+    """
+    Read requirements from a directory (one *.txt file per request, named by
+    its id) or a JSONL file with "id"/"request_id" and "requirement" (or
+    "title" and "body") fields.
+    """
+    requests: List[BuildRequest] = []
+    if source.is_dir():
+        for path in sorted(source.glob("*.txt")):
+            text = path.read_text(encoding="utf-8").strip()
+            if text:
+                requests.append(BuildRequest(_safe_id(path.stem), text))
+        return requests
+
+    for n, line in enumerate(source.read_text(encoding="utf-8").splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            print(f"⚠ Skipping invalid JSON on line {n} of {source}")
+            continue
+        text = data.get("requirement") or "\n\n".join(
+            part for part in (data.get("title"), data.get("body")) if part)
+        if not text:
+            print(f"⚠ Skipping line {n} of {source}: no requirement text")
+            continue
+        req_id = data.get("id") or data.get("request_id") or f"line-{n}"
+        requests.append(BuildRequest(_safe_id(str(req_id)), text.strip()))
+    return requests
+
+
+def _safe_id(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", value).strip(".") or "request"
+
+
+class BatchBuilder:
+    """
+    Builds queued requirements concurrently over one shared LLMClient.
+
+    Up to `max_projects` builds run at once. Their LLM requests share the
+    client's connection pool and AIMD limit through a FairShareLimiter, so
+    no single large project starves the others. Each request is built under
+    WORKSPACE_ROOT/BATCH_WORKSPACE/<id>/ with its own manifest, and a result
+    record is written there and appended to `results_path`.
+    """
+
+    def __init__(self, llm: LLMClient, max_projects: int = BATCH_MAX_PROJECTS,
+                 results_path: Path = BATCH_RESULTS_PATH, pipeline: bool = False,
+                 run_tests: bool = EVALUATOR_RUN_TESTS):
+        self.llm = llm
+        self.max_projects = max(1, max_projects)
+        self.results_path = Path(results_path)
+        self.pipeline = pipeline
+        self.run_tests = run_tests
+        # Shares follow the adaptive limit, which is what actually admits requests
+        self.llm.fair_share = FairShareLimiter(lambda: int(llm.concurrency.limit))
+        self._write_lock = asyncio.Lock()
+
+    async def run(self, source: Path, watch: bool = False,
+                  poll_interval: float = BATCH_POLL_INTERVAL) -> List[Dict[str, Any]]:
+        """
+        Build every request in `source` not already recorded as "ok". With
+        watch=True, keep polling `source` for new requests until cancelled.
+        """
+        queue: "asyncio.Queue[Optional[BuildRequest]]" = asyncio.Queue()
+        seen: Set[str] = self._completed_ids()
+        records: List[Dict[str, Any]] = []
+        if seen:
+            print(f"Skipping {len(seen)} request(s) already built successfully")
+
+        async def produce():
+            while True:
+                for req in load_requests(source):
+                    if req.id not in seen:
+                        seen.add(req.id)
+                        await queue.put(req)
+                if not watch:
+                    break
+                await asyncio.sleep(poll_interval)
+            for _ in range(self.max_projects):
+                await queue.put(None)
+
+        async def consume():
+            while True:
+                req = await queue.get()
+                if req is None:
+                    return
+                records.append(await self._build_one(req))
+
+        await asyncio.gather(produce(), *(consume() for _ in range(self.max_projects)))
+        return records
+
+    async def _build_one(self, req: BuildRequest) -> Dict[str, Any]:
+        prefix = f"{BATCH_WORKSPACE}/{req.id}"
+        project_dir = WORKSPACE_ROOT / prefix
+        project_dir.mkdir(parents=True, exist_ok=True)
+        print(f"\n>>> [{req.id}] build started")
+
+        current_project.set(req.id)
+        start = time.perf_counter()
+        record: Dict[str, Any] = {"id": req.id}
+        try:
+            result = await abuild(requirement=req.requirement, llm=self.llm, resume=True,
+                                  pipeline=self.pipeline, workspace_prefix=prefix,
+                                  manifest_path=project_dir / MANIFEST_NAME, trace=False,
+                                  run_tests=self.run_tests)
+            record.update(
+                status="ok" if result.ok else "failed",
+                project_root=result.project_root,
+                files=result.files,
+                failed_files=result.failed_files,
+                evaluation={"passed": result.evaluation_passed, "total": result.evaluation_total},
+                issues=result.issues,
+            )
+        except Exception as e:
+            record.update(status="error", error=f"{type(e).__name__}: {e}")
+        record["duration_s"] = round(time.perf_counter() - start, 3)
+        record["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+        await self._write_record(project_dir, record)
+        print(f"<<< [{req.id}] {record['status']} in {record['duration_s']:.1f}s")
+        return record
+
+    async def _write_record(self, project_dir: Path, record: Dict[str, Any]) -> None:
+        (project_dir / "result.json").write_text(
+            json.dumps(record, indent=2, ensure_ascii=False), encoding="utf-8")
+        async with self._write_lock:
+            self.results_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.results_path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _completed_ids(self) -> Set[str]:
+        # The last record per id wins, so failed builds are retried
+        status: Dict[str, str] = {}
+        if self.results_path.is_file():
+            for line in self.results_path.read_text(encoding="utf-8").splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                status[record.get("id")] = record.get("status")
+        return {k for k, v in status.items() if v == "ok"}
+
+
+async def abuild_batch(source: Path, max_projects: int = BATCH_MAX_PROJECTS,
+                       results_path: Path = BATCH_RESULTS_PATH, watch: bool = False,
+                       pipeline: bool = False, use_cache: bool = True,
+                       run_tests: bool = EVALUATOR_RUN_TESTS) -> List[Dict[str, Any]]:
+    ensure_workspace()
+    tracer = telemetry.start_trace(LOG_DIR / f"trace-batch-{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+    try:
+        async with LLMClient(use_cache=use_cache) as llm:
+            builder = BatchBuilder(llm, max_projects, results_path, pipeline, run_tests)
+            records = await builder.run(source, watch=watch)
+    finally:
+        close_runner()
+
+    ok = sum(r["status"] == "ok" for r in records)
+    print(f"\n=== Batch done: {ok}/{len(records)} request(s) built successfully ===")
+    print(f"Result records appended to {results_path}")
+    print("\n=== Telemetry ===")
+    print(tracer.summary())
+    print(f"Trace written to {tracer.path}")
+    return records
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build many requirements over one shared LLM client")
+    parser.add_argument("source", type=Path,
+                        help="directory of *.txt requirements or a JSONL file of requests")
+    parser.add_argument("--max-projects", type=int, default=BATCH_MAX_PROJECTS,
+                        help="number of projects built concurrently")
+    parser.add_argument("--results", type=Path, default=BATCH_RESULTS_PATH,
+                        help="JSONL file the result records are appended to")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and build requests added to the source later")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="start generating files while each plan is still streaming in")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ignore cached LLM replies and call the API for every request")
+    parser.add_argument("--run-tests", action="store_true", default=EVALUATOR_RUN_TESTS,
+                        help="run each project's generated tests; they are NOT sandboxed and "
+                             "get this user's full filesystem and network access")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        asyncio.run(abuild_batch(args.source, args.max_projects, args.results,
+                                 watch=args.watch, pipeline=args.pipeline,
+                                 use_cache=not args.no_cache, run_tests=args.run_tests))
+    except KeyboardInterrupt:
+        print("\nBatch interrupted; rerun to resume unfinished requests.")
@@ -0,0 +1,298 @@
+# benchmarks/fake_arxiv.py
+"""
+Local stand-in for export.arxiv.org serving canned, deterministic RSS feeds
+at /rss/<category> (with ETag/Last-Modified support) and Atom results at
+/api/query (search_query=cat:<category>, id_list=, start=, max_results=).
+
+    python -m benchmarks.fake_arxiv --port 8001 --papers 50
+
+Every fifth paper of a category is cross-listed in the next category, so
+merged results contain duplicates to remove.
+"""
+import re
+import sys
+import time
+import hashlib
+import argparse
+import threading
+from dataclasses import dataclass
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape, quoteattr
+
+CATEGORIES = ["cs.AI", "cs.CV", "cs.LG", "cs.CL", "cs.TH", "cs.SY"]
+# Like arXiv, an id_list holding anything else is rejected with 400
+ID_RE = re.compile(r"(\d{4}\.\d{4,5}|[a-z]+(-[a-z]+)*(\.[A-Z]{2})?/\d{7})(v\d+)?")
+
+
+@dataclass
+class FakeArxivConfig:
+    papers_per_category: int = 50
+    latency: float = 0.0     # seconds before each reply
+    categories: tuple = tuple(CATEGORIES)
+    api_page_cap: int = 2000  # largest max_results the API honours, like arXiv's
+
+
+def paper_id(category_index: int, n: int) -> str:
+    return f"2401.{category_index:01d}{n:04d}"
+
+
+def category_papers(config: FakeArxivConfig, category: str) -> List[Dict[str, str]]:
+    """
+    Papers listed in `category`: its own plus the cross-listed ones of the
+    previous category.
+    """
+    cats = list(config.categories)
+    i = cats.index(category)
+    papers = []
+    for n in range(config.papers_per_category):
+        papers.append(_paper(i, n, category))
+    prev = (i - 1) % len(cats)
+    if prev != i:
+        for n in range(0, config.papers_per_category, 5):
+            papers.append(_paper(prev, n, cats[prev]))
+    return papers
+
+
+def _paper(category_index: int, n: int, primary: str) -> Dict[str, str]:
+    pid = paper_id(category_index, n)
+    return {
+        "id": pid,
+        "title": f"Paper {pid} on {primary}",
+        "summary": f"Abstract of paper {pid}, primarily in {primary}. " * 4,
+        "authors": f"Author {n % 7}, Author {n % 11 + 7}",
+        "primary": primary,
+    }
+
+
+def render_rss(category: str, papers: List[Dict[str, str]]) -> bytes:
+    items = []
+    for p in papers:
+        items.append(
+            "<item>"
+            f"<title>{escape(p['title'])}</title>"
+            f"<link>https://arxiv.org/abs/{p['id']}</link>"
+            f"<description>{escape(p['summary'])}</description>"
+            f"<guid isPermaLink=\"false\">oai:arXiv.org:{p['id']}v1</guid>"
+            f"<category>{p['primary']}</category>"
+            f"<dc:creator>{escape(p['authors'])}</dc:creator>"
+            "<pubDate>Mon, 01 Jan 2024 00:00:00 -0500</pubDate>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/"><channel>'
+        f"<title>{category} updates on arXiv.org</title>"
+        f"<link>http://arxiv.org/</link><description>{category}</description>"
+        + "".join(items) + "</channel></rss>"
+    ).encode("utf-8")
+
+
+def render_atom(papers: List[Dict[str, str]], total: int, start: int) -> bytes:
+    entries = []
+    for p in papers:
+        authors = "".join(f"<author><name>{escape(a.strip())}</name></author>"
+                          for a in p["authors"].split(","))
+        entries.append(
+            "<entry>"
+            f"<id>http://arxiv.org/abs/{p['id']}v1</id>"
+            "<updated>2024-01-02T00:00:00Z</updated>"
+            "<published>2024-01-01T00:00:00Z</published>"
+            f"<title>{escape(p['title'])}</title>"
+            f"<summary>  {escape(p['summary'])}\n</summary>"
+            f"{authors}"
+            f"<link href=\"http://arxiv.org/abs/{p['id']}v1\" rel=\"alternate\" type=\"text/html\"/>"
+            f"<link title=\"pdf\" href=\"http://arxiv.org/pdf/{p['id']}v1\" rel=\"related\" type=\"application/pdf\"/>"
+            f"<arxiv:primary_category term={quoteattr(p['primary'])} scheme=\"http://arxiv.org/schemas/atom\"/>"
+            f"<category term={quoteattr(p['primary'])} scheme=\"http://arxiv.org/schemas/atom\"/>"
+            "</entry>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom" '
+        'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+        'xmlns:arxiv="http://arxiv.org/schemas/atom">'
+        "<title>ArXiv Query</title><id>http://arxiv.org/api/fake</id>"
+        "<updated>2024-01-02T00:00:00Z</updated>"
+        f"<opensearch:totalResults>{total}</opensearch:totalResults>"
+        f"<opensearch:startIndex>{start}</opensearch:startIndex>"
+        f"<opensearch:itemsPerPage>{len(papers)}</opensearch:itemsPerPage>"
+        + "".join(entries) + "</feed>"
+    ).encode("utf-8")
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeArxivServer:
+    """
+    Serves /rss/<category> and /api/query. An RSS request whose If-None-Match
+    matches the feed's ETag is answered with 304. `stats` counts requests
+    (API ones separately too), 304s and bytes sent.
+    """
+
+    def __init__(self, config: Optional[FakeArxivConfig] = None, host: str = "127.0.0.1",
+                 port: int = 0):
+        self.config = config or FakeArxivConfig()
+        self.stats = {"requests": 0, "api_requests": 0, "not_modified": 0, "bytes": 0}
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        self._feeds: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = _HTTPServer((host, port), Handler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeArxivServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeArxivServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def invalidate(self, category: Optional[str] = None) -> None:
+        """
+        Pretend `category` (or every category) published new papers: its
+        ETag and Last-Modified change.
+        """
+        with self._lock:
+            if category is None:
+                self._feeds.clear()
+            else:
+                self._feeds.pop(category, None)
+            self.last_modified = formatdate(time.time(), usegmt=True)
+
+    def _feed(self, category: str) -> bytes:
+        with self._lock:
+            if category not in self._feeds:
+                body = render_rss(category, category_papers(self.config, category))
+                # A new version stamp keeps the ETag changing after invalidate()
+                self._feeds[category] = body + f"<!-- {time.time_ns()} -->".encode()
+            return self._feeds[category]
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        with self._lock:
+            self.stats["requests"] += 1
+        if self.config.latency:
+            time.sleep(self.config.latency)
+
+        path = handler.path.split("?", 1)[0]
+        if path == "/api/query":
+            self._handle_api(handler)
+            return
+        category = path.rsplit("/", 1)[-1]
+        if not path.startswith("/rss/") or category not in self.config.categories:
+            self._send(handler, 404, b"unknown category", {"Content-Type": "text/plain"})
+            return
+
+        body = self._feed(category)
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        headers = {"ETag": etag, "Last-Modified": self.last_modified,
+                   "Content-Type": "application/rss+xml; charset=utf-8"}
+        if handler.headers.get("If-None-Match") == etag:
+            with self._lock:
+                self.stats["not_modified"] += 1
+            self._send(handler, 304, b"", headers)
+            return
+        self._send(handler, 200, body, headers)
+
+    def _handle_api(self, handler: BaseHTTPRequestHandler) -> None:
+        with self._lock:
+            self.stats["api_requests"] += 1
+        query = parse_qs(urlsplit(handler.path).query)
+        start = int(query.get("start", ["0"])[0])
+        max_results = min(int(query.get("max_results", ["10"])[0]), self.config.api_page_cap)
+
+        if "id_list" in query:
+            wanted = [i.strip() for i in query["id_list"][0].split(",") if i.strip()]
+            if not all(ID_RE.fullmatch(i) for i in wanted):
+                self._send(handler, 400, b"incorrect id format", {"Content-Type": "text/plain"})
+                return
+            papers = [p for p in (self._lookup(i) for i in wanted) if p is not None]
+        else:
+            search = query.get("search_query", [""])[0]
+            category = search[4:] if search.startswith("cat:") else ""
+            if category not in self.config.categories:
+                papers = []
+            else:
+                cats = list(self.config.categories)
+                papers = [_paper(cats.index(category), n, category)
+                          for n in range(self.config.papers_per_category)]
+        page = papers[start:start + max_results]
+        self._send(handler, 200, render_atom(page, len(papers), start),
+                   {"Content-Type": "application/atom+xml; charset=utf-8"})
+
+    def _lookup(self, arxiv_id: str) -> Optional[Dict[str, str]]:
+        arxiv_id = arxiv_id.split("v")[0] if arxiv_id.count("v") == 1 else arxiv_id
+        try:
+            prefix, number = arxiv_id.split(".")
+            cats = list(self.config.categories)
+            i, n = int(number[0]), int(number[1:])
+        except ValueError:
+            return None
+        if prefix != "2401" or i >= len(cats) or n >= self.config.papers_per_category:
+            return None
+        return _paper(i, n, cats[i])
+
+    def _send(self, handler: BaseHTTPRequestHandler, status: int, body: bytes,
+              headers: Dict[str, str]) -> None:
+        handler.send_response(status)
+        for k, v in headers.items():
+            handler.send_header(k, v)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+        with self._lock:
+            self.stats["bytes"] += len(body)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for export.arxiv.org")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--papers", type=int, default=FakeArxivConfig.papers_per_category,
+                        help="papers per category")
+    parser.add_argument("--latency", type=float, default=FakeArxivConfig.latency)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = FakeArxivServer(FakeArxivConfig(args.papers, args.latency), args.host, args.port)
+    print(f"Fake arXiv listening on {server.url} "
+          f"(RSS at {server.url}/rss/<category>, API at {server.url}/api/query)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
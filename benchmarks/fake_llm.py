@@ -0,0 +1,297 @@
+# benchmarks/fake_llm.py
+import re
+import sys
+import json
+import hashlib
+import time
+import base64
+import random
+import argparse
+import threading
+from dataclasses import dataclass
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional
+
+FILES_PER_TASK = 5
+# Prompt prefixes are cached in blocks of this many characters (~64 tokens)
+CACHE_BLOCK_CHARS = 256
+REQUIRED_FILES = ["main.py", "utils.py", "README.md", "requirements.txt"]
+
+
+@dataclass
+class FakeLLMConfig:
+    latency: float = 0.05        # mean seconds before the reply starts
+    jitter: float = 0.02         # +/- seconds added uniformly to latency
+    error_rate: float = 0.0      # fraction of requests answered with 429/503
+    slow_rate: float = 0.0       # fraction of requests delayed by slow_latency instead
+    slow_latency: float = 1.0    # seconds before a slow request's reply starts
+    response_bytes: int = 2048   # size of each generated file
+    stream_chunk: int = 64       # characters per SSE delta
+    max_output_chars: int = 0    # cut longer replies with finish_reason "length" (0 = never)
+    seed: Optional[int] = None
+
+
+def synthetic_plan(n_files: int, project_root: str) -> Dict[str, Any]:
+    """
+    A plan with `n_files` files in tasks of FILES_PER_TASK. Task k depends on
+    task k // 2, giving a DAG whose depth grows with log2 of the task count.
+    """
+    files = list(REQUIRED_FILES)
+    files += [f"pkg_{i // 50}/mod_{i}.py" for i in range(max(0, n_files - len(files)))]
+    files = files[:max(n_files, 1)]
+
+    tasks = []
+    for k, i in enumerate(range(0, len(files), FILES_PER_TASK), start=1):
+        tasks.append({
+            "id": k,
+            "name": f"Task {k}",
+            "description": f"Generate group {k} of the benchmark project.",
+            "files": files[i:i + FILES_PER_TASK],
+            "depends_on": [k // 2] if k > 1 else [],
+        })
+    return {
+        "architecture": {
+            "language": "Python",
+            "framework": "None",
+            "project_root": project_root,
+            "modules": files,
+        },
+        "tasks": tasks,
+    }
+
+
+def synthetic_file(path: str, size: int, rng: random.Random) -> str:
+    """
+    File body of roughly `size` bytes. A random nonce keeps content hashes
+    (and so the evaluator cache) cold across runs.
+    """
+    nonce = f"{rng.getrandbits(64):016x}"
+    if not path.endswith(".py"):
+        head = f"{path} {nonce}\n"
+        return head + "x" * max(0, size - len(head) - 1) + "\n"
+    head = f"# {path} {nonce}\nVALUE = 1\n\n\ndef value():\n    return VALUE\n"
+    filler = ""
+    while len(head) + len(filler) < size:
+        filler += f"# {'-' * 70}\n"
+    return head + filler
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # Clients hang up on requests they no longer need (hedging, aborts)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeLLMServer:
+    """
+    OpenAI-compatible /chat/completions server answering the planner,
+    coder (single-file, batch and streaming) and JSON repair prompts with
+    synthetic content. The requirement text selects the plan size via
+    "files=<n>".
+    """
+
+    def __init__(self, config: FakeLLMConfig, host: str = "127.0.0.1", port: int = 0):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.stats = {"requests": 0, "errors": 0, "truncated": 0}
+        # Truncated reply text -> the rest of it, for continuation requests
+        self._pending: Dict[str, str] = {}
+        # Hashes of prompt prefixes seen so far, to report prefix cache hits
+        self._prefixes = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                server._handle(self, json.loads(body))
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = _HTTPServer((host, port), Handler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ---------------------- request handling ----------------------
+
+    def _handle(self, handler: BaseHTTPRequestHandler, request: Dict[str, Any]) -> None:
+        cfg = self.config
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = max(0.0, cfg.latency + self.rng.uniform(-cfg.jitter, cfg.jitter))
+            if self.rng.random() < cfg.slow_rate:
+                delay = cfg.slow_latency
+            fail = self.rng.random() < cfg.error_rate
+            if fail:
+                self.stats["errors"] += 1
+        time.sleep(delay)
+
+        if fail:
+            status = 429 if self.rng.random() < 0.5 else 503
+            self._send(handler, status, b'{"error": {"message": "injected failure"}}',
+                       {"Retry-After": "0"})
+            return
+
+        messages: List[Dict[str, str]] = request["messages"]
+        if len(messages) > 2 and messages[-2]["role"] == "assistant":
+            # Continuation: send what was cut off after the assistant's text
+            previous = messages[-2]["content"]
+            with self._lock:
+                content = self._pending.pop(previous, "")
+        else:
+            previous = ""
+            content = self._reply(messages[0]["content"], messages[-1]["content"])
+
+        finish_reason = "stop"
+        limit = self.config.max_output_chars
+        if limit and len(content) > limit:
+            content, rest = content[:limit], content[limit:]
+            finish_reason = "length"
+            with self._lock:
+                self.stats["truncated"] += 1
+                self._pending[previous + content] = rest
+        prompt_chars = sum(len(m["content"]) for m in messages)
+        cached_chars = self._cached_prefix(messages)
+        usage = {
+            "prompt_tokens": prompt_chars // 4,
+            "prompt_cache_hit_tokens": cached_chars // 4,
+            "prompt_cache_miss_tokens": prompt_chars // 4 - cached_chars // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (prompt_chars + len(content)) // 4,
+        }
+
+        if request.get("stream"):
+            self._send_stream(handler, content, usage, finish_reason)
+            return
+        body = json.dumps({
+            "object": "chat.completion",
+            "model": request.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": finish_reason}],
+            "usage": usage,
+        }).encode()
+        self._send(handler, 200, body)
+
+    def _cached_prefix(self, messages: List[Dict[str, str]]) -> int:
+        """
+        Simulate provider prefix caching: the number of leading prompt
+        characters, in whole blocks, already seen in an earlier request.
+        """
+        text = "".join(f"<{m['role']}>{m['content']}" for m in messages)
+        h = hashlib.sha256()
+        cached = 0
+        with self._lock:
+            for end in range(CACHE_BLOCK_CHARS, len(text) + 1, CACHE_BLOCK_CHARS):
+                h.update(text[end - CACHE_BLOCK_CHARS:end].encode())
+                digest = h.copy().digest()
+                if digest in self._prefixes and cached == end - CACHE_BLOCK_CHARS:
+                    cached = end
+                self._prefixes.add(digest)
+        return cached
+
+    def _reply(self, system_prompt: str, user: str) -> str:
+        prompt = system_prompt.lower()
+        request = user.rsplit("## Request\n", 1)[-1]
+        size = self.config.response_bytes
+        if "planning agent" in prompt:
+            m = re.search(r"files\s*=\s*(\d+)", user)
+            n = int(m.group(1)) if m else 10
+            return json.dumps(synthetic_plan(n, f"benchmark_{n}"))
+        if "batch mode" in prompt:
+            frames = []
+            for path in json.loads(request)["files"]:
+                b64 = base64.encodebytes(synthetic_file(path, size, self.rng).encode()).decode()
+                frames.append(f"=== FILE: {path} ===\n{b64}=== END FILE: {path} ===")
+            return "\n".join(frames)
+        if "coderagent" in prompt:
+            path = json.loads(request)["file_path"]
+            content = synthetic_file(path, size, self.rng)
+            return json.dumps({"path": path,
+                               "content_b64": base64.b64encode(content.encode()).decode()})
+        # JSON repair and anything else: echo the input back
+        return user
+
+    def _send(self, handler: BaseHTTPRequestHandler, status: int, body: bytes,
+              headers: Optional[Dict[str, str]] = None) -> None:
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            handler.send_header(k, v)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _send_stream(self, handler: BaseHTTPRequestHandler, content: str,
+                     usage: Dict[str, int], finish_reason: str) -> None:
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def event(data: str) -> None:
+            raw = f"data: {data}\n\n".encode()
+            handler.wfile.write(f"{len(raw):x}\r\n".encode() + raw + b"\r\n")
+
+        step = self.config.stream_chunk
+        for i in range(0, len(content), step):
+            event(json.dumps({"choices": [{"index": 0, "delta": {"content": content[i:i + step]}}]}))
+        event(json.dumps({"choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]}))
+        event(json.dumps({"choices": [], "usage": usage}))
+        event("[DONE]")
+        handler.wfile.write(b"0\r\n\r\n")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the fake OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=FakeLLMConfig.latency)
+    parser.add_argument("--jitter", type=float, default=FakeLLMConfig.jitter)
+    parser.add_argument("--error-rate", type=float, default=FakeLLMConfig.error_rate)
+    parser.add_argument("--slow-rate", type=float, default=FakeLLMConfig.slow_rate)
+    parser.add_argument("--slow-latency", type=float, default=FakeLLMConfig.slow_latency)
+    parser.add_argument("--response-bytes", type=int, default=FakeLLMConfig.response_bytes)
+    parser.add_argument("--max-output-chars", type=int, default=FakeLLMConfig.max_output_chars)
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    config = FakeLLMConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                           slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+                           response_bytes=args.response_bytes,
+                           max_output_chars=args.max_output_chars, seed=args.seed)
+    server = FakeLLMServer(config, args.host, args.port)
+    print(f"Fake LLM listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,200 @@
+# benchmarks/run_benchmarks.py
+"""
+End-to-end benchmark of main.build against a local fake LLM server.
+
+    python -m benchmarks.run_benchmarks --sizes 10 100 1000 --latency 0.05
+
+Each plan size is built in a fresh subprocess (so peak RSS is per run)
+with the LLM cache disabled. Results are printed and written as JSON.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+from typing import Any, Dict, List
+
+import config
+from telemetry import percentile
+from benchmarks.fake_llm import FakeLLMConfig, FakeLLMServer
+
+DEFAULT_SIZES = [10, 100, 1000]
+
+
+def latency_stats(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(values[-1], 4),
+    }
+
+
+def run_child(args) -> Dict[str, Any]:
+    """
+    Build one synthetic project and return its measurements.
+    """
+    # Settings read as CoderAgent defaults must be set before main is imported
+    config.CODER_STREAMING = args.streaming
+    config.CODER_BATCH_MODE = args.batch
+    config.CODER_HEDGING = args.hedge
+    if args.workers:
+        config.CODER_MAX_WORKERS = args.workers
+    os.environ.setdefault(config.LLM_API_KEY_ENV, "benchmark")
+
+    import main
+    import telemetry
+    from llm_client import LLMClient
+    from rate_limit import RateLimiter
+
+    llm = LLMClient(api_base=args.api_base, use_cache=False)
+    if not args.keep_rate_limits:
+        llm.rate_limiter = RateLimiter(0, 0)
+
+    project_dir = config.WORKSPACE_ROOT / f"benchmark_{args.child}"
+    shutil.rmtree(project_dir, ignore_errors=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            main.build(full=True, pipeline=args.pipeline, llm=llm,
+                       requirement=f"Synthetic benchmark project, files={args.child}",
+                       manifest_path=os.path.join(tmp, config.MANIFEST_NAME))
+        wall = time.perf_counter() - start
+
+    spans = telemetry.get_tracer().spans
+    files = [s for s in spans if s.name == "coder.file"]
+    requests = [s for s in spans if s.name in ("llm.chat", "llm.stream")]
+    if not args.keep_output:
+        shutil.rmtree(project_dir, ignore_errors=True)
+
+    return {
+        "files": args.child,
+        "wall_s": round(wall, 3),
+        "files_per_s": round(len(files) / wall, 2) if wall else None,
+        "requests": len(requests),
+        "retries": sum(s.retries for s in requests),
+        "continuations": sum(s.continuations for s in requests),
+        "failed_files": sum(s.attrs.get("status") != "ok" for s in files),
+        "hedged_files": sum(bool(s.attrs.get("hedged")) for s in files),
+        "hedge_wins": sum(bool(s.attrs.get("hedge_won")) for s in files),
+        "prompt_tokens": sum(s.prompt_tokens for s in requests),
+        "cached_prompt_tokens": sum(s.cached_tokens for s in requests),
+        "bytes_in": sum(s.bytes_in for s in requests),
+        "bytes_out": sum(s.bytes_out for s in requests),
+        "file_latency_s": latency_stats([s.duration for s in files]),
+        "request_latency_s": latency_stats([s.duration for s in requests]),
+        "stage_s": {s.name: round(s.duration, 3) for s in spans
+                    if s.name in ("planner", "evaluator", "build")},
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_rss_children_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+def run_size(size: int, api_base: str, args) -> Dict[str, Any]:
+    cmd = [sys.executable, "-m", "benchmarks.run_benchmarks", "--child", str(size),
+           "--api-base", api_base]
+    for flag in ("pipeline", "streaming", "batch", "hedge", "keep_rate_limits", "keep_output"):
+        if getattr(args, flag):
+            cmd.append("--" + flag.replace("_", "-"))
+    if args.workers:
+        cmd += ["--workers", str(args.workers)]
+    proc = subprocess.run(cmd, cwd=config.PROJECT_ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"files": size, "error": proc.stderr.strip().splitlines()[-1:]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(args) -> Dict[str, Any]:
+    fake = FakeLLMConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                         slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+                         response_bytes=args.response_bytes,
+                         max_output_chars=args.max_output_chars, seed=args.seed)
+    results = []
+    with FakeLLMServer(fake) as server:
+        for size in args.sizes:
+            print(f"Benchmarking {size} files...", flush=True)
+            result = run_size(size, server.url, args)
+            results.append(result)
+            if "error" in result:
+                print(f"  failed: {result['error']}")
+            else:
+                print(f"  {result['wall_s']:.2f}s, {result['files_per_s']} files/s, "
+                      f"file p50 {result['file_latency_s']['p50']:.3f}s "
+                      f"p95 {result['file_latency_s']['p95']:.3f}s "
+                      f"p99 {result['file_latency_s']['p99']:.3f}s, "
+                      f"peak RSS {result['peak_rss_mb']} MB")
+        server_stats = dict(server.stats)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "fake_llm": vars(fake),
+            "pipeline": args.pipeline,
+            "streaming": args.streaming,
+            "batch": args.batch,
+            "hedge": args.hedge,
+            "workers": args.workers or config.CODER_MAX_WORKERS,
+            "client_rate_limits": args.keep_rate_limits,
+        },
+        "server": server_stats,
+        "results": results,
+    }
+    output = args.output or config.LOG_DIR / f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark main.build against a fake LLM server")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="number of files in each synthetic plan")
+    parser.add_argument("--latency", type=float, default=FakeLLMConfig.latency)
+    parser.add_argument("--jitter", type=float, default=FakeLLMConfig.jitter)
+    parser.add_argument("--error-rate", type=float, default=FakeLLMConfig.error_rate)
+    parser.add_argument("--slow-rate", type=float, default=FakeLLMConfig.slow_rate,
+                        help="fraction of requests delayed by --slow-latency (tail latency)")
+    parser.add_argument("--slow-latency", type=float, default=FakeLLMConfig.slow_latency)
+    parser.add_argument("--response-bytes", type=int, default=FakeLLMConfig.response_bytes)
+    parser.add_argument("--max-output-chars", type=int, default=FakeLLMConfig.max_output_chars,
+                        help="truncate longer replies with finish_reason 'length'")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="override CODER_MAX_WORKERS")
+    parser.add_argument("--pipeline", action="store_true", help="stream the plan into the coder")
+    parser.add_argument("--streaming", action="store_true", help="enable CODER_STREAMING")
+    parser.add_argument("--batch", action="store_true", help="enable CODER_BATCH_MODE")
+    parser.add_argument("--hedge", action="store_true", help="enable CODER_HEDGING")
+    parser.add_argument("--keep-rate-limits", action="store_true",
+                        help="keep the client-side requests/tokens per minute limits")
+    parser.add_argument("--keep-output", action="store_true",
+                        help="keep the generated benchmark projects in the workspace")
+    parser.add_argument("--output", default=None, help="JSON results path")
+    # Internal: build a single size against --api-base and print its result
+    parser.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--api-base", default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.child is not None:
+        print(json.dumps(run_child(args)))
+    else:
+        main(args)
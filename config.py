@@ -7,6 +7,10 @@ PROJECT_ROOT = Path(__file__).parent
 # Workspace where the generated code project will be created
 WORKSPACE_ROOT = PROJECT_ROOT / "workspace"
 
+# Build checkpoint written under WORKSPACE_ROOT; `python main.py --resume`
+# picks up from it after a crash.
+MANIFEST_NAME = ".build_manifest.json"
+
 # Whether to use a real LLM API.
 # If False, agents will use built-in demo logic so you can run without API keys.
 USE_REAL_LLM = True
@@ -16,7 +20,111 @@ DEFAULT_LLM_MODEL = "deepseek-chat"
 LLM_API_BASE = "https://api.deepseek.com"    # DeepSeek 官方 API 地址
 LLM_API_KEY_ENV = "DEEPSEEK_API_KEY"         # 让 Key 放环境变量
 
+# HTTP transport for LLM calls. Every call, sync ones included, goes
+# through the async client, whose pool is sized by LLM_MAX_CONCURRENCY.
+LLM_CONNECT_TIMEOUT = 10     # seconds to establish a connection
+LLM_READ_TIMEOUT = 240       # seconds to wait for the model's reply
+
+# Upper bound on in-flight requests made through LLMClient.achat.
+# The async connection pool is sized to match.
+LLM_MAX_CONCURRENCY = 32
+
+# Client-side rate limiting (0 disables a bucket).
+LLM_REQUESTS_PER_MINUTE = 600
+LLM_TOKENS_PER_MINUTE = 1_000_000
+# 429/5xx and connection errors are retried with jittered exponential backoff.
+LLM_MAX_RETRIES = 5
+LLM_BACKOFF_BASE = 1.0       # seconds
+LLM_BACKOFF_CAP = 60.0       # seconds
+# Replies cut off at the output token limit (finish_reason "length") are
+# continued and stitched up to this many times before giving up.
+LLM_MAX_CONTINUATIONS = 3
+# Adaptive (AIMD) concurrency: starts here, grows by ~1 per round of replies
+# whose headers arrive within LLM_LATENCY_TARGET seconds, halves on errors.
+LLM_INITIAL_CONCURRENCY = 8
+LLM_LATENCY_TARGET = 120.0
+
+# CoderAgent settings
+# Maximum number of files generated concurrently. Tasks still wait for
+# everything listed in their depends_on before any of their files start.
+CODER_MAX_WORKERS = 8
+
+# Stream replies and decode Base64 straight into the target file instead of
+# buffering the whole reply. Generation is aborted once a file grows past
+# CODER_STREAM_MAX_BYTES.
+CODER_STREAMING = False
+CODER_STREAM_MAX_BYTES = 2 * 1024 * 1024
+
+# Ask for up to CODER_BATCH_MAX_FILES files of the same task in one request,
+# using a framed multi-file reply. Files that fail to decode are retried
+# one per request.
+CODER_BATCH_MODE = False
+CODER_BATCH_MAX_FILES = 5
+
+# Hedged generation (opt-in): a file whose request is still running after
+# the CODER_HEDGE_PERCENTILE latency of recent requests (CODER_HEDGE_INITIAL_DELAY
+# seconds until CODER_HEDGE_MIN_SAMPLES are known) gets one duplicate request,
+# as do files matching CODER_CRITICAL_FILES right away. The first reply that
+# decodes and compiles wins. At most CODER_HEDGE_BUDGET duplicates per file
+# request (plus CODER_HEDGE_BURST) are sent.
+CODER_HEDGING = False
+CODER_HEDGE_PERCENTILE = 95
+CODER_HEDGE_INITIAL_DELAY = 60.0
+CODER_HEDGE_MIN_SAMPLES = 8
+CODER_HEDGE_BUDGET = 0.1
+CODER_HEDGE_BURST = 2
+CODER_CRITICAL_FILES = ("main.py", "app.py")
+
+# Each coder request carries the architecture and the interfaces (signatures,
+# constants) of files from the task's dependencies, up to this many characters.
+CODER_CONTEXT_MAX_CHARS = 20000
+
 # Misc settings
 LOG_DIR = PROJECT_ROOT / "logs"
 LOG_DIR.mkdir(exist_ok=True)
 
+# On-disk cache of LLM replies, keyed by (model, prompts, temperature).
+# Re-running the same requirement replays cached replies instead of
+# calling the API again. Disable per run with `python main.py --no-cache`.
+LLM_CACHE_ENABLED = True
+LLM_CACHE_DIR = LOG_DIR / "llm_cache"
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024
+LLM_CACHE_MAX_AGE = 7 * 24 * 3600   # seconds
+
+# EvaluatorAgent checks Python files in a process pool (None = one worker
+# per CPU) and caches results by file content hash.
+EVALUATOR_WORKERS = None
+EVAL_CACHE_PATH = LOG_DIR / "eval_cache.json"
+# With EVALUATOR_RUN_TESTS (or --run-tests) it then runs the project's
+# pytest files (or, without tests, imports its main.py/app.py as a smoke
+# check) in a pool of warm worker processes, each job under these CPU,
+# memory and wall-clock limits. Linux only. Off by default: jobs are not
+# confined to the project and run with the agent user's full filesystem
+# and network access.
+EVALUATOR_RUN_TESTS = False
+SANDBOX_WORKERS = None
+SANDBOX_CPU_SECONDS = 30
+SANDBOX_MEMORY_BYTES = 1024 * 1024 * 1024
+SANDBOX_WALL_SECONDS = 60.0
+SANDBOX_OUTPUT_MAX_CHARS = 8000
+
+
+# batch_build.py: requirements built concurrently over one shared client,
+# each under WORKSPACE_ROOT/BATCH_WORKSPACE/<request id>/.
+BATCH_MAX_PROJECTS = 4
+BATCH_WORKSPACE = "batch"
+BATCH_RESULTS_PATH = LOG_DIR / "batch_results.jsonl"
+BATCH_POLL_INTERVAL = 5.0    # seconds between source re-reads in --watch mode
+
+
+# tools/arxiv_tools.py: category feeds are fetched concurrently and kept on
+# disk with their ETag/Last-Modified, so unchanged feeds are revalidated
+# (304) instead of downloaded and parsed again.
+ARXIV_RSS_BASE = "https://export.arxiv.org/rss"
+# Paper details come from the API in batched id_list queries (tools/arxiv_lookup.py)
+ARXIV_API_URL = "https://export.arxiv.org/api/query"
+ARXIV_FEED_CACHE_DIR = LOG_DIR / "arxiv_feeds"
+ARXIV_FETCH_CONCURRENCY = 6
+ARXIV_FETCH_TIMEOUT = 30     # seconds per request
+# Local full-text index (SQLite FTS5) of every paper fetched, for offline search
+ARXIV_INDEX_PATH = LOG_DIR / "arxiv_index.sqlite3"
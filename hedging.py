@@ -0,0 +1,125 @@
+# hedging.py
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple, TypeVar
+
+import telemetry
+from telemetry import percentile
+from config import (
+    CODER_HEDGE_PERCENTILE, CODER_HEDGE_INITIAL_DELAY, CODER_HEDGE_MIN_SAMPLES,
+    CODER_HEDGE_BUDGET, CODER_HEDGE_BURST,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Seconds between re-reads of the hedge delay while a request is running,
+# so the threshold follows latencies observed in the meantime
+RECHECK_INTERVAL = 0.5
+
+
+class HedgePolicy:
+    """
+    Decides when a duplicate ("hedge") request is launched for a request
+    that is still running.
+
+    The delay is the `pct` percentile of recently observed request
+    latencies (`initial_delay` until `min_samples` have been seen); critical
+    requests are hedged right away. Hedges are capped at `budget` times the
+    number of primary requests plus `burst`, so the extra cost stays bounded.
+    """
+
+    def __init__(self, pct: float = CODER_HEDGE_PERCENTILE,
+                 initial_delay: float = CODER_HEDGE_INITIAL_DELAY,
+                 min_samples: int = CODER_HEDGE_MIN_SAMPLES,
+                 budget: float = CODER_HEDGE_BUDGET, burst: int = CODER_HEDGE_BURST,
+                 window: int = 200):
+        self.pct = pct
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.budget = budget
+        self.burst = burst
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+
+    def delay(self, critical: bool = False) -> float:
+        if critical:
+            return 0.0
+        if len(self.latencies) < self.min_samples:
+            return self.initial_delay
+        return percentile(sorted(self.latencies), self.pct)
+
+    def observe(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+
+    def try_spend(self) -> bool:
+        """
+        Take one hedge from the budget; False when it is exhausted.
+        """
+        if self.hedges >= self.budget * self.requests + self.burst:
+            return False
+        self.hedges += 1
+        return True
+
+
+async def first_valid(
+    start: Callable[[], Awaitable[T]],
+    accept: Callable[[T], Optional[R]],
+    policy: HedgePolicy,
+    critical: bool = False,
+) -> Tuple[Optional[R], List[T]]:
+    """
+    Await `start()` and hedge it with one more `start()` if it is still
+    running after policy.delay() and the budget allows. Each reply is
+    passed to `accept`; the first non-None result wins and the other
+    request is cancelled. Returns (result or None, replies in arrival order).
+    Errors of one request are ignored while the other is still running.
+    "hedged" and "hedge_won" are recorded on the current telemetry span.
+    """
+    loop = asyncio.get_running_loop()
+    policy.requests += 1
+    started = loop.time()
+    primary = asyncio.ensure_future(start())
+    pending = {primary}
+    replies: List[T] = []
+    hedged = False
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            timeout = None
+            if not hedged:
+                remaining = started + policy.delay(critical) - loop.time()
+                if remaining <= 0:
+                    hedged = True
+                    if policy.try_spend():
+                        telemetry.record(hedged=True)
+                        pending.add(asyncio.ensure_future(start()))
+                    continue
+                timeout = min(remaining, RECHECK_INTERVAL)
+            done, _ = await asyncio.wait(pending, timeout=timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                pending.discard(fut)
+                if fut.exception() is not None:
+                    error = fut.exception()
+                    continue
+                replies.append(fut.result())
+                result = accept(fut.result())
+                if result is not None:
+                    if fut is not primary:
+                        policy.wins += 1
+                        telemetry.record(hedge_won=True)
+                    return result, replies
+    finally:
+        for fut in pending:
+            if fut.done() and not fut.cancelled():
+                fut.exception()  # retrieved, so it is not logged as unhandled
+            fut.cancel()
+        # Time to the first usable reply: the primary's latency, or a lower
+        # bound of it when a hedge won
+        policy.observe(loop.time() - started)
+    if not replies and error is not None:
+        raise error
+    return None, replies
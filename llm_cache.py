@@ -0,0 +1,121 @@
+# llm_cache.py
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional, Union
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache for LLM replies.
+
+    Entries are keyed by a hash of (model, system_prompt, messages,
+    temperature) and stored as one JSON file each. A hit refreshes the
+    entry's mtime, so eviction by oldest mtime is LRU. Entries older than
+    max_age seconds are ignored and removed; when the directory grows
+    past max_bytes the least recently used entries are dropped.
+    """
+
+    def __init__(self, directory: Union[str, Path], max_bytes: int, max_age: float):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = sum(p.stat().st_size for p in self._entries())
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, messages: List[Dict[str, str]],
+                 temperature: float) -> str:
+        blob = json.dumps(
+            [model, system_prompt, messages, temperature],
+            ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+        )
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            st = path.stat()
+            if time.time() - st.st_mtime > self.max_age:
+                self._remove(path)
+                raise FileNotFoundError(path)
+            content = json.loads(path.read_text(encoding="utf-8"))["content"]
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return content
+
+    def put(self, key: str, content: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        data = json.dumps({"content": content, "created": time.time()}, ensure_ascii=False)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(data, encoding="utf-8")
+        old_size = path.stat().st_size if path.exists() else 0
+        os.replace(tmp, path)
+        with self._lock:
+            self._size += path.stat().st_size - old_size
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def invalidate(self, key: str) -> None:
+        """
+        Drop one entry, e.g. a reply its caller found unusable.
+        """
+        self._remove(self._path(key))
+
+    def evict(self) -> None:
+        """
+        Drop expired entries, then least recently used ones until the
+        cache fits in max_bytes.
+        """
+        now = time.time()
+        entries = []
+        for p in self._entries():
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            if now - st.st_mtime > self.max_age:
+                self._remove(p)
+            else:
+                entries.append((st.st_mtime, st.st_size, p))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(p)
+            total -= size
+        with self._lock:
+            self._size = total
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "bytes": self._size}
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _entries(self):
+        return self.directory.glob("*/*.json")
+
+    def _remove(self, path: Path) -> None:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            self._size -= size
@@ -1,33 +1,367 @@
 # llm_client.py
 import os
 import json
-import requests
-from typing import List, Dict, Any, Optional
+import time
+import asyncio
+from contextlib import asynccontextmanager
+import httpx
+from typing import List, Dict, Any, Optional, AsyncIterator, Callable, Tuple
 
-from config import DEFAULT_LLM_MODEL, LLM_API_BASE, LLM_API_KEY_ENV, USE_REAL_LLM
+from config import (
+    DEFAULT_LLM_MODEL, LLM_API_BASE, LLM_API_KEY_ENV, USE_REAL_LLM,
+    LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT, LLM_MAX_CONCURRENCY,
+    LLM_CACHE_ENABLED, LLM_CACHE_DIR, LLM_CACHE_MAX_BYTES, LLM_CACHE_MAX_AGE,
+    LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE, LLM_BACKOFF_CAP, LLM_INITIAL_CONCURRENCY, LLM_LATENCY_TARGET,
+    LLM_MAX_CONTINUATIONS,
+)
+import telemetry
+from llm_cache import ResponseCache
+from rate_limit import (
+    RateLimiter, AdaptiveConcurrency, FairShareLimiter, RETRYABLE_STATUS,
+    backoff_delay, current_project, retry_after_seconds,
+)
+
+
+# Sent after a reply that stopped at the output token limit
+CONTINUE_PROMPT = (
+    "Your previous reply was cut off by the output length limit. Continue exactly "
+    "where it stopped. Do not repeat anything already written and do not add any "
+    "preamble, code fence or explanation."
+)
+
+
+class TruncatedReplyError(RuntimeError):
+    """
+    The reply still ended at the output token limit after all continuations.
+    `partial` holds the text received so far.
+    """
+
+    def __init__(self, partial: str):
+        super().__init__("LLM reply truncated at the output token limit")
+        self.partial = partial
+
+
+def continuation_messages(messages: List[Dict[str, str]], partial: str) -> List[Dict[str, str]]:
+    return [*messages,
+            {"role": "assistant", "content": partial},
+            {"role": "user", "content": CONTINUE_PROMPT}]
 
 
 class LLMClient:
     """
     Thin wrapper around an LLM API.
     When USE_REAL_LLM is False, it falls back to simple mock responses.
+
+    achat() makes the requests, over an httpx.AsyncClient created lazily
+    for the running event loop, so calls within a loop reuse connections.
+    In-flight requests follow an AIMD limit of at most max_concurrency.
+    Use the client as an async context manager (or call aclose()) to
+    close it. chat() is a blocking wrapper running achat() in a loop of
+    its own.
+
+    All calls share requests/min and tokens/min buckets and retry 429/5xx
+    replies with jittered exponential backoff, honouring Retry-After.
+    When `fair_share` is set, async requests are first admitted per
+    project (rate_limit.current_project) so concurrent builds share the
+    client evenly; its capacity should follow `concurrency.limit`.
+
+    Replies are served from a ResponseCache when one is configured;
+    pass use_cache=False to bypass it. Callers that check replies pass
+    `validate`: only replies it accepts are cached, and a cached reply it
+    rejects is dropped. `refresh=True` skips the lookup (e.g. on a retry)
+    but still caches a valid reply.
     """
 
-    def __init__(self, model: str = DEFAULT_LLM_MODEL):
+    def __init__(
+        self,
+        model: str = DEFAULT_LLM_MODEL,
+        api_base: Optional[str] = None,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        read_timeout: float = LLM_READ_TIMEOUT,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        use_cache: bool = LLM_CACHE_ENABLED,
+        cache_dir=LLM_CACHE_DIR,
+    ):
         self.model = model
+        self.temperature = 0.5
         self.use_real_llm = USE_REAL_LLM
+        self.cache: Optional[ResponseCache] = (
+            ResponseCache(cache_dir, LLM_CACHE_MAX_BYTES, LLM_CACHE_MAX_AGE)
+            if use_cache else None
+        )
 
         # You can extend this init to support different providers.
-        self.api_base = LLM_API_BASE
+        self.api_base = api_base or LLM_API_BASE
         self.api_key = os.getenv(LLM_API_KEY_ENV, "")
 
-    def chat(self, system_prompt: str, messages: List[Dict[str, str]]) -> str:
+        self.timeout = (connect_timeout, read_timeout)
+
+        self.max_retries = LLM_MAX_RETRIES
+        self.max_continuations = LLM_MAX_CONTINUATIONS
+        self.rate_limiter = RateLimiter(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+        self.max_concurrency = max_concurrency
+        self.concurrency = AdaptiveConcurrency(
+            initial=min(LLM_INITIAL_CONCURRENCY, max_concurrency),
+            minimum=1,
+            maximum=max_concurrency,
+            latency_target=LLM_LATENCY_TARGET,
+        )
+        # Set by multi-project callers to share in-flight slots fairly
+        self.fair_share: Optional[FairShareLimiter] = None
+        self._aloop: Optional[asyncio.AbstractEventLoop] = None
+        self._aclient: Optional[httpx.AsyncClient] = None
+
+    async def aclose(self) -> None:
+        """
+        Close the AsyncClient of the running loop.
+        """
+        await self.aclose_async_client()
+        self._aloop = self._aclient = None
+
+    async def aclose_async_client(self) -> None:
+        """
+        Close the running loop's AsyncClient. A client can no longer be closed once its loop has ended, so call
+        this before leaving a loop that used it (BaseAgent.run() does). The
+        next loop gets a fresh client.
+        """
+        if self._aclient is not None and self._aloop is asyncio.get_running_loop():
+            await self._aclient.aclose()
+            self._aloop = self._aclient = None
+
+    async def __aenter__(self) -> "LLMClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    def chat(self, system_prompt: str, messages: List[Dict[str, str]],
+             validate: Optional[Callable[[str], bool]] = None, refresh: bool = False) -> str:
         """
-        Use DeepSeek ChatCompletion API.
+        Blocking wrapper around achat() for callers without an event loop.
+        Like BaseAgent.run(), the loop's AsyncClient is closed before the
+        loop ends, so each call connects anew.
+        """
+        async def chat_and_close() -> str:
+            try:
+                return await self.achat(system_prompt, messages, validate=validate, refresh=refresh)
+            finally:
+                await self.aclose_async_client()
+
+        return asyncio.run(chat_and_close())
+
+    async def achat(self, system_prompt: str, messages: List[Dict[str, str]],
+                    validate: Optional[Callable[[str], bool]] = None,
+                    refresh: bool = False) -> str:
+        """
+        Use DeepSeek ChatCompletion API; rate-limited and bounded by the
+        adaptive concurrency limit.
+
+        A reply cut off at the output token limit (finish_reason "length")
+        is continued up to max_continuations times and stitched together;
+        TruncatedReplyError is raised if it is still incomplete.
         """
         if not self.use_real_llm:
             return self._mock_response(system_prompt, messages)
 
+        with telemetry.span("llm.chat", model=self.model):
+            cache_key = self._cache_key(system_prompt, messages)
+            cached = self._cache_lookup(cache_key, validate, refresh)
+            if cached is not None:
+                return cached
+
+            content, finish_reason = await self._achat_once(system_prompt, messages)
+            for _ in range(self.max_continuations):
+                if finish_reason != "length":
+                    break
+                telemetry.record(continuations=1)
+                more, finish_reason = await self._achat_once(
+                    system_prompt, continuation_messages(messages, content))
+                content += more
+            if finish_reason == "length":
+                raise TruncatedReplyError(content)
+
+            self._cache_store(cache_key, content, validate)
+            return content
+
+    def _cache_lookup(self, cache_key: Optional[str], validate: Optional[Callable[[str], bool]],
+                      refresh: bool) -> Optional[str]:
+        if not cache_key or refresh:
+            return None
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return None
+        if validate is not None and not validate(cached):
+            # Cached before it was checked (or checks got stricter): drop it
+            self.cache.invalidate(cache_key)
+            return None
+        telemetry.record(cache_hit=True)
+        return cached
+
+    def _cache_store(self, cache_key: Optional[str], content: str,
+                     validate: Optional[Callable[[str], bool]]) -> None:
+        if cache_key and (validate is None or validate(content)):
+            self.cache.put(cache_key, content)
+
+    async def _achat_once(self, system_prompt: str,
+                          messages: List[Dict[str, str]]) -> Tuple[str, Optional[str]]:
+        url, payload, headers = self._build_request(system_prompt, messages)
+        estimate = self._estimate_tokens(payload)
+
+        async with self._arequest(url, payload, headers, estimate) as resp:
+            await resp.aread()
+
+        data = resp.json()
+        telemetry.record(bytes_in=len(resp.content))
+        return self._settle_completion(data, estimate)
+
+    def _settle_completion(self, data: Dict[str, Any], estimate: int) -> Tuple[str, Optional[str]]:
+        telemetry.record_usage(data.get("usage"))
+        self.rate_limiter.settle(estimate, data.get("usage", {}).get("total_tokens", 0))
+        choice = data["choices"][0]
+        return choice["message"]["content"] or "", choice.get("finish_reason")
+
+    async def astream(self, system_prompt: str, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """
+        Stream the reply as content deltas parsed from server-sent events.
+
+        A cached reply is replayed as a single chunk, but streamed replies
+        are not written to the cache since they are never held whole.
+        TruncatedReplyError is raised after the last chunk if the reply was
+        cut off at the output token limit.
+        """
+        if not self.use_real_llm:
+            yield self._mock_response(system_prompt, messages)
+            return
+
+        with telemetry.span("llm.stream", model=self.model):
+            cache_key = self._cache_key(system_prompt, messages)
+            if cache_key:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    telemetry.record(cache_hit=True)
+                    yield cached
+                    return
+
+            url, payload, headers = self._build_request(system_prompt, messages)
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
+            estimate = self._estimate_tokens(payload)
+
+            finish_reason = None
+            async with self._arequest(url, payload, headers, estimate) as resp:
+                async for line in resp.aiter_lines():
+                    telemetry.record(bytes_in=len(line) + 1)
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    event = json.loads(data)
+                    if event.get("usage"):
+                        telemetry.record_usage(event["usage"])
+                        self.rate_limiter.settle(estimate, event["usage"].get("total_tokens", 0))
+                    choices = event.get("choices") or [{}]
+                    finish_reason = choices[0].get("finish_reason") or finish_reason
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+            if finish_reason == "length":
+                # Streams are not continued; callers fall back to achat()
+                raise TruncatedReplyError("")
+
+    @asynccontextmanager
+    async def _arequest(self, url: str, payload: Dict[str, Any], headers: Dict[str, str],
+                        estimate: int) -> AsyncIterator[httpx.Response]:
+        """
+        Send a request with rate limiting, adaptive concurrency and retries.
+
+        429/5xx replies and transport errors are retried with jittered
+        exponential backoff (honouring Retry-After) and shrink the
+        concurrency limit. The concurrency slot is held until the caller
+        has finished reading the response body.
+        """
+        client = self._async_client()
+        telemetry.record(bytes_out=len(json.dumps(payload)))
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self.rate_limiter.reserve(estimate))
+            started = await self._acquire_slot()
+            start = time.perf_counter()
+            try:
+                request = client.build_request("POST", url, json=payload, headers=headers)
+                resp = await client.send(request, stream=True)
+            except httpx.TransportError as e:
+                await self._release_slot(started, None, error=True)
+                if attempt == self.max_retries:
+                    raise
+                reason = f"{type(e).__name__}: {e}"
+                delay = self._retry_delay(attempt, reason, None)
+                with telemetry.span("llm.retry", attempt=attempt + 1, reason=reason):
+                    await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled by the caller (e.g. a hedged duplicate won); not an
+                # overload signal, but the slot must still be returned
+                await self._release_slot(started, None, error=False)
+                raise
+            latency = time.perf_counter() - start
+
+            if resp.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                await resp.aclose()
+                await self._release_slot(started, latency, error=True)
+                reason = f"HTTP {resp.status_code}"
+                delay = self._retry_delay(attempt, reason, resp.headers.get("Retry-After"))
+                with telemetry.span("llm.retry", attempt=attempt + 1, reason=reason):
+                    await asyncio.sleep(delay)
+                continue
+            break
+
+        failed = resp.is_error
+        try:
+            resp.raise_for_status()
+            yield resp
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await resp.aclose()
+            await self._release_slot(started, latency, error=failed)
+
+    async def _acquire_slot(self) -> float:
+        if self.fair_share is None:
+            return await self.concurrency.acquire()
+        await self.fair_share.acquire(current_project.get())
+        try:
+            return await self.concurrency.acquire()
+        except BaseException:
+            await self.fair_share.release(current_project.get())
+            raise
+
+    async def _release_slot(self, started: float, latency: Optional[float], error: bool) -> None:
+        await self.concurrency.release(started, latency, error)
+        if self.fair_share is not None:
+            await self.fair_share.release(current_project.get())
+
+    def _retry_delay(self, attempt: int, reason: str, retry_after: Optional[str]) -> float:
+        delay = backoff_delay(attempt, LLM_BACKOFF_BASE, LLM_BACKOFF_CAP,
+                              retry_after_seconds(retry_after))
+        telemetry.record(retries=1)
+        print(f"⚠ LLM request failed ({reason}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    @staticmethod
+    def _estimate_tokens(payload: Dict[str, Any]) -> int:
+        # Rough prompt size (~4 characters per token); settled against real usage later
+        return sum(len(m["content"]) for m in payload["messages"]) // 4 + 1
+
+    def _cache_key(self, system_prompt: str, messages: List[Dict[str, str]]) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return ResponseCache.make_key(self.model, system_prompt, messages, self.temperature)
+
+    def _build_request(self, system_prompt: str, messages: List[Dict[str, str]]):
         if not self.api_key:
             raise RuntimeError("DEEPSEEK_API_KEY 环境变量未设置！")
 
@@ -40,19 +374,34 @@ class LLMClient:
                 {"role": "system", "content": system_prompt},
                 *messages
             ],
-            "temperature": 0.5
+            "temperature": self.temperature
         }
 
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
+        return url, payload, headers
 
-        resp = requests.post(url, json=payload, headers=headers, timeout=240)
-        resp.raise_for_status()
-
-        data = resp.json()
-        return data["choices"][0]["message"]["content"]
+    def _async_client(self) -> httpx.AsyncClient:
+        """
+        Return the AsyncClient bound to the running event loop. Clients
+        cannot cross loops, so a new loop (e.g. another asyncio.run() from
+        a sync wrapper) gets a fresh one; the previous loop's client must
+        have been closed with aclose_async_client() before that loop ended.
+        """
+        loop = asyncio.get_running_loop()
+        if self._aloop is not loop:
+            connect, read = self.timeout
+            self._aclient = httpx.AsyncClient(
+                timeout=httpx.Timeout(read, connect=connect),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+            self._aloop = loop
+        return self._aclient
 
     # ----------------- mock logic for demo mode -----------------
 
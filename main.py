@@ -1,9 +1,19 @@
 # main.py
+import time
+import asyncio
+import argparse
+from contextlib import AsyncExitStack
 from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from config import PROJECT_ROOT, WORKSPACE_ROOT
+import telemetry
+from config import PROJECT_ROOT, WORKSPACE_ROOT, MANIFEST_NAME, LOG_DIR, EVALUATOR_RUN_TESTS
 from llm_client import LLMClient
-from tasks import Plan
+from manifest import RunManifest
+from tools.exec_tools import close_runner
+from tools.file_tools import reset_dir_cache
+from plan_diff import affected_files
+from tasks import Plan, Task, FileResult, BuildResult
 from agents.planner_agent import PlannerAgent
 from agents.coder_agent import CoderAgent
 from agents.evaluator_agent import EvaluatorAgent
@@ -40,52 +50,248 @@ def read_requirement(requirement_file: str = "question.txt") -> str:
     return content
 
 
-def build():
+def build(use_cache: bool = True, resume: bool = False, full: bool = False,
+          pipeline: bool = False, requirement: Optional[str] = None,
+          manifest_path: Optional[Path] = None, llm: Optional[LLMClient] = None,
+          run_tests: bool = EVALUATOR_RUN_TESTS):
     """
     End-to-end pipeline for the test case: build project from requirement file.
+    Blocking wrapper around abuild(); a caller's `llm` keeps its sync
+    session, but its async connections are closed with the loop.
+    """
+    async def build_and_close():
+        try:
+            return await abuild(use_cache=use_cache, resume=resume, full=full, pipeline=pipeline,
+                                requirement=requirement, manifest_path=manifest_path, llm=llm,
+                                run_tests=run_tests)
+        finally:
+            if llm is not None:
+                await llm.aclose_async_client()
+
+    asyncio.run(build_and_close())
+
+
+async def abuild(use_cache: bool = True, resume: bool = False, full: bool = False,
+                 pipeline: bool = False, requirement: Optional[str] = None,
+                 manifest_path: Optional[Path] = None, llm: Optional[LLMClient] = None,
+                 workspace_prefix: str = "", trace: bool = True,
+                 run_tests: bool = EVALUATOR_RUN_TESTS) -> BuildResult:
+    """
+    Async end-to-end pipeline; all LLM calls share one client and event loop.
+
+    `requirement` defaults to the contents of question.txt and
+    `manifest_path` to WORKSPACE_ROOT/MANIFEST_NAME. A caller-provided `llm`
+    is used as is and left open, as is the shared sandbox runner; otherwise
+    both are closed when the build ends. The project is generated under
+    WORKSPACE_ROOT/`workspace_prefix`/<project_root>.
+
+    With resume=True, the plan and every file still matching the checkpoint
+    manifest are reused and only missing or modified files are regenerated.
+    Otherwise the requirement is re-planned and, unless full=True, only files
+    whose tasks changed (or depend on changed tasks) are regenerated.
+
+    With pipeline=True, coding starts while the plan is still streaming in.
+    This always regenerates every file, since diffing needs the whole plan.
+
+    Unless trace=False (the caller owns the trace), spans for every stage
+    are written to LOG_DIR/trace-<timestamp>.jsonl and summarized at the end
+    of the run.
+
+    With run_tests=True the evaluator also runs the generated project's
+    tests (see EVALUATOR_RUN_TESTS: they are not sandboxed).
     """
     ensure_workspace()
+    reset_dir_cache()
+    if trace:
+        tracer = telemetry.start_trace(LOG_DIR / f"trace-{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+
+    if requirement is None:
+        requirement = read_requirement()
+    if manifest_path is None:
+        manifest_path = WORKSPACE_ROOT / MANIFEST_NAME
+
+    async with AsyncExitStack() as stack:
+        if llm is None:
+            llm = await stack.enter_async_context(LLMClient(use_cache=use_cache))
+            # A standalone build; builds given a client share the sandbox workers
+            stack.callback(close_runner)
+        with telemetry.span("build", resume=resume, full=full, pipeline=pipeline,
+                            workspace_prefix=workspace_prefix):
+            result = await _run_pipeline(llm, requirement, manifest_path, resume, full,
+                                         pipeline, workspace_prefix, run_tests)
+        if llm.cache is not None:
+            stats = llm.cache.stats()
+            print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses")
 
-    llm = LLMClient()
+    if trace:
+        print("\n=== Telemetry ===")
+        print(tracer.summary())
+        print(f"Trace written to {tracer.path}")
+    return result
 
+
+async def _run_pipeline(llm: LLMClient, requirement: str, manifest_path: Path,
+                        resume: bool = False, full: bool = False, pipeline: bool = False,
+                        workspace_prefix: str = "", run_tests: bool = EVALUATOR_RUN_TESTS) -> BuildResult:
+    """
+    Plan, generate and evaluate the project with a shared LLM client.
+    """
     planner = PlannerAgent(llm)
     coder = CoderAgent(llm)
-    evaluator = EvaluatorAgent(llm)
+    evaluator = EvaluatorAgent(llm, run_tests=run_tests)
 
-    # 🔥 Read requirement from file (instead of hardcoding)
-    requirement = read_requirement()
     print("\n=== Requirement Loaded ===")
     print(requirement)
     print("==========================\n")
 
-    print("=== [1] Planning phase ===")
-    plan: Plan = planner.run(requirement)
-    print("Architecture:", plan.architecture)
-    print("Tasks:")
-    for t in plan.tasks:
-        print(f"- ({t.id}) {t.name}: files={t.files}, depends_on={t.depends_on}")
+    previous = None if full else RunManifest.load(manifest_path)
+    manifest = previous if resume else None
+    if manifest is not None and not manifest.matches(requirement):
+        print("⚠ Requirement changed since the last checkpoint; re-planning.")
+        manifest = None
+
+    if pipeline and manifest is None:
+        print("=== [1+2] Pipelined planning and coding ===")
+        manifest = RunManifest(manifest_path, requirement)
+        plan, file_results = await _plan_and_code(planner, coder, requirement, manifest,
+                                                  workspace_prefix)
+        project_root = _project_root(plan.architecture, workspace_prefix)
+        pending = {f for t in plan.tasks for f in t.files}
+    else:
+        print("=== [1] Planning phase ===")
+        if manifest is not None and manifest.plan is not None:
+            plan: Plan = manifest.plan
+            print(f"Resuming with the plan stored in {manifest.path}")
+        else:
+            plan = await planner.arun(requirement)
+            manifest = RunManifest(manifest_path, requirement)
+            manifest.set_plan(plan)
+        print("Architecture:", plan.architecture)
+        print("Tasks:")
+        for t in plan.tasks:
+            print(f"- ({t.id}) {t.name}: files={t.files}, depends_on={t.depends_on}")
+
+        project_root = _project_root(plan.architecture, workspace_prefix)
+
+        print("\n=== [2] Coding phase ===")
+        all_files = {f for t in plan.tasks for f in t.files}
+        if manifest is not previous and previous is not None and previous.plan is not None:
+            # Incremental build: keep files of tasks untouched by the new plan
+            changed = affected_files(previous.plan, plan)
+            manifest.inherit_files(previous, all_files - changed)
+            print(f"Incremental build: {len(changed)} of {len(all_files)} file(s) affected by plan changes")
+        pending = {f for f in all_files if not manifest.is_file_current(project_root, f)}
+        if len(pending) < len(all_files):
+            print(f"{len(all_files) - len(pending)} file(s) up to date, {len(pending)} to generate")
 
-    project_root = plan.architecture.get("project_root", "generated_project")
+        file_results = await coder.arun(plan.tasks, project_root, only_files=pending,
+                                        on_result=_checkpointer(manifest, project_root),
+                                        architecture=plan.architecture)
 
-    print("\n=== [2] Coding phase ===")
-    coder.run(plan.tasks, project_root)
+    if all(r.ok for r in file_results):
+        manifest.mark_stage("coding")
 
     print("\n=== [3] Evaluation phase ===")
-    results = evaluator.run(plan.tasks, project_root)
+    results = await evaluator.arun(plan.tasks, project_root, only_files=pending)
+    manifest.mark_stage("evaluation")
+    passed = [r for r in results if r.passed]
+    print(f"Evaluation result: {len(passed)}/{len(results)} file(s) passed")
     for r in results:
-        print(f"Evaluation result: passed={r.passed}")
         if r.issues:
-            print("Issues:")
+            print(f"Issues in {r.path}:")
             for issue in r.issues:
                 print(" -", issue)
 
+    ttfbs = [r.ttfb for r in file_results if r.ttfb is not None]
+    if ttfbs:
+        print(f"Time to first chunk: avg {sum(ttfbs) / len(ttfbs):.2f}s, max {max(ttfbs):.2f}s")
+
+    failed_files = [r for r in file_results if not r.ok]
+    if failed_files:
+        print(f"\n{len(failed_files)} file(s) were not generated:")
+        for r in failed_files:
+            print(f" - {r.path} ({r.status}: {r.error})")
+
     print("\n=== Done ===")
     print(f"Generated project under: {WORKSPACE_ROOT / project_root}")
     print("You can now run:")
     print(f"  cd {WORKSPACE_ROOT / project_root}")
     print("  pip install -r requirements.txt")
     print("  python main.py or python app.py (depending on project type)")
+    return BuildResult(
+        project_root=project_root,
+        files=len(file_results),
+        failed_files=[r.path for r in failed_files],
+        evaluation_passed=len(passed),
+        evaluation_total=len(results),
+        issues={r.path: r.issues for r in results if r.issues},
+    )
+
+
+def _project_root(architecture: Dict[str, Any], workspace_prefix: str = "") -> str:
+    """
+    Workspace-relative directory of the generated project.
+    """
+    root = architecture.get("project_root", "generated_project")
+    return f"{workspace_prefix.rstrip('/')}/{root}" if workspace_prefix else root
+
+
+def _checkpointer(manifest: RunManifest, project_root: str):
+    """
+    Callback recording each finished file in the manifest.
+    """
+    def checkpoint(result: FileResult):
+        if result.status == "ok":
+            manifest.record_file(project_root, result.path)
+        elif not result.ok:
+            manifest.forget_file(result.path)
+    return checkpoint
+
+
+async def _plan_and_code(planner: PlannerAgent, coder: CoderAgent, requirement: str,
+                         manifest: RunManifest,
+                         workspace_prefix: str = "") -> Tuple[Plan, List[FileResult]]:
+    """
+    Stream the plan into the coder: each task is generated as soon as it has
+    been parsed and its dependencies are done, while planning continues.
+    """
+    stream = planner.astream_plan(requirement)
+    architecture = await stream.__anext__()
+    print("Architecture:", architecture)
+    project_root = _project_root(architecture, workspace_prefix)
+    tasks: List[Task] = []
+
+    async def planned_tasks() -> AsyncIterator[Task]:
+        async for t in stream:
+            print(f"- ({t.id}) {t.name}: files={t.files}, depends_on={t.depends_on}")
+            tasks.append(t)
+            yield t
+
+    file_results = await coder.arun(planned_tasks(), project_root,
+                                    on_result=_checkpointer(manifest, project_root),
+                                    architecture=architecture)
+    plan = Plan(architecture=architecture, tasks=tasks)
+    manifest.set_plan(plan)
+    return plan, file_results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build a project from question.txt")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ignore cached LLM replies and call the API for every request")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the last build from its checkpoint manifest")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore the previous build and regenerate every file")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="start generating files while the plan is still streaming in")
+    parser.add_argument("--run-tests", action="store_true", default=EVALUATOR_RUN_TESTS,
+                        help="run the generated tests; they are NOT sandboxed and get this "
+                             "user's full filesystem and network access")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    build()
+    args = parse_args()
+    build(use_cache=not args.no_cache, resume=args.resume, full=args.full,
+          pipeline=args.pipeline, run_tests=args.run_tests)
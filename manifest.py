@@ -0,0 +1,110 @@
+# manifest.py
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from config import WORKSPACE_ROOT, MANIFEST_NAME
+from tasks import Plan
+from tools.file_tools import file_sha256
+
+
+def requirement_hash(requirement: str) -> str:
+    return hashlib.sha256(requirement.encode("utf-8")).hexdigest()
+
+
+class RunManifest:
+    """
+    Checkpoint of a build, stored as JSON under the workspace.
+
+    Records the requirement hash, the serialized Plan, finished stages and
+    the content hash of every generated file, and is rewritten atomically
+    after each update so a crashed build can be resumed.
+    """
+
+    def __init__(self, path: Union[str, Path], requirement: str):
+        self.path = Path(path)
+        self.data: Dict[str, Any] = {
+            "requirement_hash": requirement_hash(requirement),
+            "plan": None,
+            "stages": [],
+            "files": {},
+        }
+
+    @classmethod
+    def load(cls, path: Union[str, Path] = WORKSPACE_ROOT / MANIFEST_NAME) -> Optional["RunManifest"]:
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except ValueError:
+            print(f"⚠ Ignoring unreadable manifest: {path}")
+            return None
+        manifest = cls.__new__(cls)
+        manifest.path = path
+        manifest.data = data
+        return manifest
+
+    def save(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.data, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    # -------- plan & stages --------
+
+    def matches(self, requirement: str) -> bool:
+        return self.data.get("requirement_hash") == requirement_hash(requirement)
+
+    @property
+    def plan(self) -> Optional[Plan]:
+        if self.data.get("plan") is None:
+            return None
+        return Plan.from_dict(self.data["plan"])
+
+    def set_plan(self, plan: Plan) -> None:
+        self.data["plan"] = plan.to_dict()
+        self.data["stages"] = ["planning"]
+        self.save()
+
+    def stage_done(self, stage: str) -> bool:
+        return stage in self.data["stages"]
+
+    def mark_stage(self, stage: str) -> None:
+        if stage not in self.data["stages"]:
+            self.data["stages"].append(stage)
+        self.save()
+
+    # -------- files --------
+
+    def record_file(self, project_root: str, path: str) -> None:
+        """
+        Store the hash of a generated file as it is on disk now.
+        """
+        digest = file_sha256(f"{project_root}/{path}")
+        if digest is None:
+            self.data["files"].pop(path, None)
+        else:
+            self.data["files"][path] = digest
+        self.save()
+
+    def inherit_files(self, previous: "RunManifest", paths) -> None:
+        """
+        Carry over recorded hashes of `paths` from an earlier build.
+        """
+        for path in paths:
+            if path in previous.data["files"]:
+                self.data["files"][path] = previous.data["files"][path]
+        self.save()
+
+    def forget_file(self, path: str) -> None:
+        self.data["files"].pop(path, None)
+        self.save()
+
+    def is_file_current(self, project_root: str, path: str) -> bool:
+        """
+        True when the file exists and still has the recorded hash.
+        """
+        recorded = self.data["files"].get(path)
+        return recorded is not None and file_sha256(f"{project_root}/{path}") == recorded
@@ -0,0 +1,54 @@
+# plan_diff.py
+import json
+import hashlib
+from typing import Dict, Set
+
+from tasks import Plan
+from scheduler import topological_order
+
+# Architecture keys whose change invalidates every generated file
+ARCHITECTURE_KEYS = ("language", "framework", "project_root")
+
+
+def task_fingerprints(plan: Plan) -> Dict[int, str]:
+    """
+    Hash each task together with the fingerprints of the tasks it depends on.
+
+    Two tasks share a fingerprint only if their own fields and their whole
+    transitive depends_on chain are identical, regardless of task ids.
+    """
+    fingerprints: Dict[int, str] = {}
+    for t in topological_order(plan.tasks):
+        blob = json.dumps(
+            [t.name, t.description, t.files, sorted(fingerprints[d] for d in t.depends_on)],
+            ensure_ascii=False,
+        )
+        fingerprints[t.id] = hashlib.sha256(blob.encode("utf-8")).hexdigest()
+    return fingerprints
+
+
+def affected_files(old: Plan, new: Plan) -> Set[str]:
+    """
+    Files of `new` that must be regenerated given the previous plan `old`.
+
+    A file is affected when the task producing it is new, was edited, or
+    sits downstream of an edited task. Everything is affected if the
+    architecture's language, framework or project root changed, or if
+    `old` is not a valid task graph (e.g. a stored plan with a cycle).
+    """
+    all_files = {f for t in new.tasks for f in t.files}
+    if any(old.architecture.get(k) != new.architecture.get(k) for k in ARCHITECTURE_KEYS):
+        return all_files
+
+    try:
+        old_fingerprints = set(task_fingerprints(old).values())
+    except ValueError as e:
+        print(f"⚠ Previous plan is invalid ({e}); regenerating every file")
+        return all_files
+    new_fingerprints = task_fingerprints(new)
+    return {
+        f
+        for t in new.tasks
+        if new_fingerprints[t.id] not in old_fingerprints
+        for f in t.files
+    }
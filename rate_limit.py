@@ -0,0 +1,219 @@
+# rate_limit.py
+import math
+import time
+import random
+import asyncio
+import threading
+from collections import defaultdict
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Union
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `per_minute` units per minute.
+
+    reserve() debits immediately and returns how long the caller must wait
+    before its reservation is covered, so concurrent callers queue up
+    behind each other instead of all retrying at once.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        with self._lock:
+            self._refill()
+            self.level -= amount
+            return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def adjust(self, amount: float) -> None:
+        """
+        Debit (positive) or refund (negative) units after the fact, e.g.
+        once actual token usage is known.
+        """
+        with self._lock:
+            self._refill()
+            self.level = min(self.capacity, self.level - amount)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budgets for one LLM backend.
+    A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def reserve(self, estimated_tokens: int) -> float:
+        """
+        Reserve one request and `estimated_tokens`; return the wait in seconds.
+        """
+        delay = 0.0
+        if self.requests is not None:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.reserve(estimated_tokens))
+        return delay
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """
+        Correct the token bucket once the response reports real usage.
+        """
+        if self.tokens is not None and actual_tokens:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on in-flight requests.
+
+    The limit grows by about one slot per round of healthy responses
+    (additive increase) and halves on throttling or server errors
+    (multiplicative decrease), staying within [minimum, maximum]. A burst
+    of failures halves it once: errors from requests that were already in
+    flight at the last decrease are ignored.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, latency_target: float):
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._decreased_at = float("-inf")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._cond: Optional[asyncio.Condition] = None
+
+    async def acquire(self) -> float:
+        """
+        Wait for a free slot; return the start time to pass to release().
+        """
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+            return time.monotonic()
+
+    async def release(self, started: float, latency: Optional[float], error: bool) -> None:
+        if error:
+            if started > self._decreased_at:
+                self.limit = max(self.minimum, self.limit / 2)
+                self._decreased_at = time.monotonic()
+        elif latency is not None and latency <= self.latency_target:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+        cond = self._condition()
+        async with cond:
+            self.in_flight -= 1
+            cond.notify_all()
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A new event loop starts with nothing in flight
+            self._loop, self._cond, self.in_flight = loop, asyncio.Condition(), 0
+        return self._cond
+
+
+# Project a request is made for, used as the FairShareLimiter key
+current_project: ContextVar[str] = ContextVar("current_project", default="")
+
+
+class FairShareLimiter:
+    """
+    Shares `capacity` in-flight requests between projects.
+
+    While several projects have requests waiting, none may hold more than
+    its equal share (capacity divided by the number of active projects);
+    a project may exceed it only when nobody else is waiting. `capacity`
+    may be a callable, e.g. the current AdaptiveConcurrency limit, so that
+    shares follow it: admitting more than the limit would only queue the
+    extra requests first come, first served behind it.
+    """
+
+    def __init__(self, capacity: Union[int, Callable[[], int]]):
+        self._capacity = capacity
+        self.in_flight: Dict[str, int] = defaultdict(int)
+        self.waiting: Dict[str, int] = defaultdict(int)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._cond: Optional[asyncio.Condition] = None
+
+    async def acquire(self, key: str) -> None:
+        cond = self._condition()
+        async with cond:
+            self.waiting[key] += 1
+            try:
+                await cond.wait_for(lambda: self._may_start(key))
+            finally:
+                self.waiting[key] -= 1
+            self.in_flight[key] += 1
+
+    async def release(self, key: str) -> None:
+        cond = self._condition()
+        async with cond:
+            self.in_flight[key] -= 1
+            cond.notify_all()
+
+    @property
+    def capacity(self) -> int:
+        return max(1, self._capacity() if callable(self._capacity) else self._capacity)
+
+    def _may_start(self, key: str) -> bool:
+        capacity = self.capacity
+        if sum(self.in_flight.values()) >= capacity:
+            return False
+        active = {k for k, n in self.in_flight.items() if n} | {k for k, n in self.waiting.items() if n}
+        share = math.ceil(capacity / max(1, len(active)))
+        if self.in_flight[key] < share:
+            return True
+        return not any(n for k, n in self.waiting.items() if k != key)
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._cond = loop, asyncio.Condition()
+            self.in_flight.clear()
+            self.waiting.clear()
+        return self._cond
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given either as seconds or as an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """
+    Exponential backoff with full jitter; a server-provided Retry-After
+    is honoured as the minimum wait.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
@@ -0,0 +1,179 @@
+# scheduler.py
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from tasks import Task, FileResult
+
+
+def topological_order(tasks: List[Task]) -> List[Task]:
+    """
+    Order tasks so that every task comes after the tasks it depends on.
+    Raises ValueError on duplicate ids, unknown dependency ids or cycles.
+    """
+    by_id: Dict[int, Task] = {}
+    for t in tasks:
+        if t.id in by_id:
+            raise ValueError(f"Duplicate task id in plan: {t.id}")
+        by_id[t.id] = t
+
+    for t in tasks:
+        unknown = [d for d in t.depends_on if d not in by_id]
+        if unknown:
+            raise ValueError(f"Task {t.id} depends on unknown task id(s): {unknown}")
+        if t.id in t.depends_on:
+            raise ValueError(f"Task {t.id} depends on itself")
+
+    position = {t.id: i for i, t in enumerate(tasks)}
+    remaining = {t.id: set(t.depends_on) for t in tasks}
+
+    ordered: List[Task] = []
+    while remaining:
+        ready = [tid for tid, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Dependency cycle between tasks: {sorted(remaining)}")
+        # Keep plan order among tasks that become ready together
+        ready.sort(key=position.get)
+        for tid in ready:
+            ordered.append(by_id[tid])
+            del remaining[tid]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return ordered
+
+
+async def arun_task_graph(
+    tasks: List[Task],
+    work: Callable[[Task, str], Awaitable[FileResult]],
+    max_workers: int = 4,
+) -> List[FileResult]:
+    """
+    Await `work(task, file_path)` for every file of every task.
+
+    A task's files start as soon as all tasks in its depends_on have
+    finished, and at most `max_workers` files are in flight at once.
+    The same path is never generated by two jobs at the same time.
+    Files of tasks whose dependencies failed are reported as skipped.
+    The graph is validated before any work starts.
+    """
+    ordered = topological_order(tasks)
+
+    async def source() -> AsyncIterator[Task]:
+        for t in ordered:
+            yield t
+
+    return await arun_task_stream(source(), work, max_workers)
+
+
+async def arun_task_stream(
+    source: AsyncIterator[Task],
+    work: Callable[[Task, str], Awaitable[FileResult]],
+    max_workers: int = 4,
+) -> List[FileResult]:
+    """
+    Like arun_task_graph(), but tasks arrive one by one from `source`
+    (e.g. while the plan is still being generated) and start as soon as
+    their dependencies have arrived and finished.
+
+    Duplicate ids and self-dependencies raise ValueError. Tasks still
+    waiting when the source is exhausted (unknown ids or a cycle) are
+    reported as skipped.
+    """
+    by_id: Dict[int, Task] = {}
+    dependents: Dict[int, List[int]] = {}
+    waiting_on: Dict[int, Set[int]] = {}
+    finished: Set[int] = set()
+
+    results: List[FileResult] = []
+    pending: List[Tuple[Task, str]] = []
+    open_files: Dict[int, int] = {}
+    failed_tasks: Set[int] = set()
+    busy_paths: Set[str] = set()
+
+    def add(task: Task) -> None:
+        if task.id in by_id:
+            raise ValueError(f"Duplicate task id in plan: {task.id}")
+        if task.id in task.depends_on:
+            raise ValueError(f"Task {task.id} depends on itself")
+        by_id[task.id] = task
+        waiting_on[task.id] = {d for d in task.depends_on if d not in finished}
+        for d in waiting_on[task.id]:
+            dependents.setdefault(d, []).append(task.id)
+        if not waiting_on[task.id]:
+            schedule(task)
+
+    def release(task_id: int) -> None:
+        finished.add(task_id)
+        for tid in dependents.pop(task_id, []):
+            waiting_on[tid].discard(task_id)
+            if not waiting_on[tid]:
+                schedule(by_id[tid])
+
+    def schedule(task: Task) -> None:
+        if failed_tasks.intersection(task.depends_on):
+            failed_tasks.add(task.id)
+            for f in task.files:
+                results.append(FileResult(task.id, f, "skipped", "dependency failed"))
+            release(task.id)
+            return
+        if not task.files:
+            release(task.id)
+            return
+        open_files[task.id] = len(task.files)
+        pending.extend((task, f) for f in task.files)
+
+    limit = max(1, max_workers)
+    running: Dict[asyncio.Future, Tuple[Task, str]] = {}
+    next_task: Optional[asyncio.Future] = asyncio.ensure_future(source.__anext__())
+    try:
+        while next_task is not None or pending or running:
+            # Fill free slots with jobs whose path is not already being written
+            i = 0
+            while i < len(pending) and len(running) < limit:
+                task, path = pending[i]
+                if path in busy_paths:
+                    i += 1
+                    continue
+                pending.pop(i)
+                busy_paths.add(path)
+                running[asyncio.ensure_future(work(task, path))] = (task, path)
+
+            waiting = set(running)
+            if next_task is not None:
+                waiting.add(next_task)
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+            if next_task in done:
+                done.discard(next_task)
+                try:
+                    add(next_task.result())
+                    next_task = asyncio.ensure_future(source.__anext__())
+                except StopAsyncIteration:
+                    next_task = None
+
+            for fut in done:
+                task, path = running.pop(fut)
+                busy_paths.discard(path)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    result = FileResult(task.id, path, "failed", f"{type(e).__name__}: {e}")
+                results.append(result)
+                if not result.ok:
+                    failed_tasks.add(task.id)
+
+                open_files[task.id] -= 1
+                if open_files[task.id] == 0:
+                    release(task.id)
+    finally:
+        for fut in running:
+            fut.cancel()
+        if next_task is not None:
+            next_task.cancel()
+
+    for tid, deps in waiting_on.items():
+        if tid not in finished:
+            reason = f"unresolved dependencies {sorted(deps)} (unknown id or cycle)"
+            for f in by_id[tid].files:
+                results.append(FileResult(tid, f, "skipped", reason))
+
+    return results
@@ -1,6 +1,6 @@
 # tasks.py
-from dataclasses import dataclass, field
-from typing import List, Dict, Any
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Any, Optional
 
 
 @dataclass
@@ -17,10 +17,48 @@ class Plan:
     architecture: Dict[str, Any]
     tasks: List[Task]
 
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Plan":
+        return cls(
+            architecture=data["architecture"],
+            tasks=[Task(**t) for t in data["tasks"]],
+        )
+
 
 @dataclass
 class EvaluationResult:
     task_id: int
     passed: bool
     issues: List[str] = field(default_factory=list)
+    path: str = ""
+
+
+
+@dataclass
+class FileResult:
+    task_id: int
+    path: str
+    status: str  # "ok", "unchanged", "failed" or "skipped"
+    error: str = ""
+    ttfb: Optional[float] = None  # seconds to first streamed chunk
+
+    @property
+    def ok(self) -> bool:
+        return self.status in ("ok", "unchanged")
+
+
+@dataclass
+class BuildResult:
+    project_root: str  # relative to WORKSPACE_ROOT
+    files: int
+    failed_files: List[str] = field(default_factory=list)
+    evaluation_passed: int = 0
+    evaluation_total: int = 0
+    issues: Dict[str, List[str]] = field(default_factory=dict)
 
+    @property
+    def ok(self) -> bool:
+        return not self.failed_files and self.evaluation_passed == self.evaluation_total
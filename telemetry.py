@@ -0,0 +1,177 @@
+# telemetry.py
+import json
+import time
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+_ids = itertools.count(1)
+
+
+@dataclass
+class Span:
+    name: str
+    id: int
+    parent_id: Optional[int]
+    start: float
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    duration: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    retries: int = 0
+    continuations: int = 0
+    error: str = ""
+
+
+# Counters summed into the parent span when a child finishes
+COUNTERS = ("bytes_in", "bytes_out", "prompt_tokens", "completion_tokens", "cached_tokens",
+            "retries", "continuations")
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """
+    Collects spans for one build and appends each finished span as a JSON
+    line to `path`. Spans nest through a context variable, so coroutines
+    started inside a span become its children, and a finished child adds
+    its counters to its parent.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path else None
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text("", encoding="utf-8")
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Span]:
+        parent = _current.get()
+        s = Span(name, next(_ids), parent.id if parent else None, time.time(), attrs)
+        token = _current.set(s)
+        t0 = time.perf_counter()
+        try:
+            yield s
+        except BaseException as e:
+            s.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            s.duration = time.perf_counter() - t0
+            try:
+                _current.reset(token)
+            except ValueError:
+                # Async generator finalized from another context
+                pass
+            if parent is not None:
+                for key in COUNTERS:
+                    setattr(parent, key, getattr(parent, key) + getattr(s, key))
+            self._finish(s)
+
+    def _finish(self, s: Span) -> None:
+        with self._lock:
+            self.spans.append(s)
+            if self.path is not None:
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(asdict(s), ensure_ascii=False, default=str) + "\n")
+
+    def summary(self, slowest: int = 5) -> str:
+        """
+        Per-span-name latency table (p50/p95/max), token totals and the
+        slowest generated files.
+        """
+        by_name: Dict[str, List[Span]] = {}
+        for s in self.spans:
+            by_name.setdefault(s.name, []).append(s)
+
+        lines = [f"{'span':<22}{'count':>7}{'p50 s':>9}{'p95 s':>9}{'max s':>9}"
+                 f"{'tokens in':>11}{'cached':>9}{'tokens out':>12}{'retries':>9}"]
+        for name in sorted(by_name):
+            spans = by_name[name]
+            durations = sorted(s.duration for s in spans)
+            lines.append(
+                f"{name:<22}{len(spans):>7}{percentile(durations, 50):>9.2f}"
+                f"{percentile(durations, 95):>9.2f}{durations[-1]:>9.2f}"
+                f"{sum(s.prompt_tokens for s in spans):>11}"
+                f"{sum(s.cached_tokens for s in spans):>9}"
+                f"{sum(s.completion_tokens for s in spans):>12}"
+                f"{sum(s.retries for s in spans):>9}"
+            )
+
+        roots = [s for s in self.spans if s.parent_id is None]
+        prompt_tokens = sum(s.prompt_tokens for s in roots)
+        if prompt_tokens:
+            cached = sum(s.cached_tokens for s in roots)
+            lines.append(f"Prompt cache: {cached}/{prompt_tokens} input tokens served from "
+                         f"the provider's cache ({100 * cached / prompt_tokens:.1f}%)")
+
+        files = sorted(by_name.get("coder.file", []), key=lambda s: s.duration, reverse=True)
+        if files:
+            lines.append("Slowest files:")
+            for s in files[:slowest]:
+                lines.append(f"  {s.duration:8.2f}s  {s.attrs.get('path')}")
+        return "\n".join(lines)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+_tracer = Tracer()
+
+
+def start_trace(path: Optional[Union[str, Path]]) -> Tracer:
+    """
+    Begin a new trace, replacing the current global tracer.
+    """
+    global _tracer
+    _tracer = Tracer(path)
+    return _tracer
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def span(name: str, **attrs):
+    return _tracer.span(name, **attrs)
+
+
+def record(**counters) -> None:
+    """
+    Add numeric counters (bytes_in, prompt_tokens, retries, ...) to the
+    innermost open span, or set attributes for non-counter keys.
+    """
+    s = _current.get()
+    if s is None:
+        return
+    for key, value in counters.items():
+        if key in COUNTERS:
+            setattr(s, key, getattr(s, key) + int(value or 0))
+        else:
+            s.attrs[key] = value
+
+
+def record_usage(usage: Optional[Dict[str, Any]]) -> None:
+    """
+    Record token usage from an OpenAI-compatible `usage` object.
+    """
+    if not usage:
+        return
+    cached = usage.get("prompt_cache_hit_tokens")
+    if cached is None:
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+    record(prompt_tokens=usage.get("prompt_tokens", 0),
+           completion_tokens=usage.get("completion_tokens", 0),
+           cached_tokens=cached)
@@ -0,0 +1,76 @@
+# tests/test_arxiv_index.py
+import pytest
+
+from tools.arxiv_index import PaperIndex, fts_query, snippet
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("graph neural", '"graph" "neural"'),
+    ('"large language" models', '"large language" "models"'),
+    ("transform*", '"transform"*'),
+    ("cs.AI 2401.01234", '"cs AI" "2401 01234"'),
+    ("NEAR(a b) OR title:x -y ^z", '"NEAR" "a" "b" "OR" "title" "x" "y" "z"'),
+    ('unbalanced "quote', '"unbalanced" "quote"'),
+    ("*** () :", ""),
+])
+def test_fts_query(text, expected):
+    assert fts_query(text) == expected
+
+
+def test_snippet_highlights_matches():
+    text = " ".join(f"w{i}" for i in range(100)) + " Diffusion models"
+    result = snippet(text, "diffusion", size=8)
+    assert result.startswith("…")
+    assert "[Diffusion]" in result
+    assert snippet("Résumé of work", "resume") == "[Résumé] of work"
+
+
+def paper(arxiv_id, title, summary="An abstract.", category="cs.AI", **extra):
+    return dict({"id": arxiv_id + "v1", "arxiv_id": arxiv_id, "title": title, "summary": summary,
+                 "authors": ["Ada Lovelace"], "published": "2024-01-01T00:00:00Z",
+                 "category": category}, **extra)
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = PaperIndex(tmp_path / "papers.db")
+    yield idx
+    idx.close()
+
+
+def test_upsert_skips_unchanged_and_reindexes_changed(index):
+    assert index.add([paper("2401.00001", "Graph networks")]) == 1
+    assert index.add([paper("2401.00001", "Graph networks")]) == 0
+    assert index.add([paper("2401.00001", "Hypergraph networks")]) == 1
+    assert len(index) == 1
+    assert index.search("hypergraph").total == 1
+    assert index.search("graph").total == 0
+    assert index.get("2401.00001v2")["title"] == "Hypergraph networks"
+
+
+def test_categories_merge_across_feeds(index):
+    index.add([paper("2401.00001", "Graph networks", category="cs.AI")])
+    assert index.add([paper("2401.00001", "Graph networks", category="cs.LG")]) == 1
+    assert index.add([paper("2401.00001", "Graph networks", category="cs.AI")]) == 0
+    record = index.get("2401.00001")
+    assert record["categories"] == ["cs.AI", "cs.LG"]
+    assert record["category"] == "cs.AI"
+    assert index.search("graph", category="cs.LG").total == 1
+    assert index.search("graph", category="cs.AI").total == 1
+    assert index.search("graph", category="cs.CV").total == 0
+
+
+def test_search_ranks_title_over_abstract_and_pages(index):
+    index.add([
+        paper("2401.00001", "Unrelated title", summary="About transformers."),
+        paper("2401.00002", "Transformers for vision"),
+        paper("2401.00003", "Other work", summary="Nothing relevant.", published="2024-02-01T00:00:00Z"),
+    ])
+    result = index.search("transformers", limit=1)
+    assert result.total == 2 and result.has_more
+    assert result.hits[0]["arxiv_id"] == "2401.00002"
+    assert index.search("transformers", limit=1, offset=1).hits[0]["arxiv_id"] == "2401.00001"
+    # Every paper has the same author
+    newest = index.search("lovelace", sort="newest")
+    assert newest.total == 3
+    assert newest.hits[0]["arxiv_id"] == "2401.00003"
@@ -0,0 +1,165 @@
+# tests/test_arxiv_lookup.py
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from benchmarks.fake_arxiv import FakeArxivConfig, FakeArxivServer, paper_id, render_atom, _paper
+from tools.arxiv_lookup import PaperLookup, is_arxiv_id, iter_atom_entries, iter_query, parse_atom
+
+
+def atom(count, total=None):
+    papers = [_paper(0, n, "cs.AI") for n in range(count)]
+    return render_atom(papers, count if total is None else total, 0)
+
+
+def test_parse_atom():
+    [paper] = parse_atom(atom(1))
+    assert paper["arxiv_id"] == paper_id(0, 0)
+    assert paper["title"] == f"Paper {paper_id(0, 0)} on cs.AI"
+    assert paper["authors"] == ["Author 0", "Author 7"]
+
+
+def test_entries_arrive_before_document_ends():
+    xml = atom(3, total=40)
+    end_of_first = xml.index(b"</entry>") + len(b"</entry>")
+    fed = []
+
+    def chunks():
+        for part in (xml[:end_of_first], xml[end_of_first:]):
+            fed.append(part)
+            yield part
+
+    meta = {}
+    entries = iter_atom_entries(chunks(), meta)
+    first = next(entries)
+    assert first["arxiv_id"] == paper_id(0, 0)
+    assert len(fed) == 1
+    assert meta["total"] == 40
+    assert [p["arxiv_id"] for p in entries] == [paper_id(0, 1), paper_id(0, 2)]
+
+
+def test_small_chunks_parse_like_whole_document():
+    xml = atom(5)
+    chunks = [xml[i:i + 7] for i in range(0, len(xml), 7)]
+    assert list(iter_atom_entries(chunks)) == parse_atom(xml)
+
+
+@pytest.fixture
+def server():
+    with FakeArxivServer(FakeArxivConfig(papers_per_category=23, api_page_cap=1000)) as srv:
+        yield srv
+
+
+def query(server, **kwargs):
+    return list(iter_query({"search_query": "cat:cs.AI"}, api_url=server.url + "/api/query",
+                           page_delay=0, **kwargs))
+
+
+def test_iter_query_pages_until_total(server):
+    papers = query(server, page_size=10)
+    assert [p["arxiv_id"] for p in papers] == [paper_id(0, n) for n in range(23)]
+    assert server.stats["api_requests"] == 3
+
+
+def test_iter_query_stops_at_limit(server):
+    papers = query(server, page_size=10, limit=15)
+    assert len(papers) == 15
+    assert server.stats["api_requests"] == 2
+
+
+def test_iter_query_follows_capped_pages(server):
+    server.config.api_page_cap = 4
+    papers = query(server, page_size=10)
+    assert len({p["arxiv_id"] for p in papers}) == 23
+    assert server.stats["api_requests"] == 6
+
+
+def test_iter_query_empty_result(server):
+    papers = list(iter_query({"search_query": "cat:math.CO"}, api_url=server.url + "/api/query",
+                             page_delay=0))
+    assert papers == []
+    assert server.stats["api_requests"] == 1
+
+
+def test_is_arxiv_id():
+    for value in ("2401.01234", "0704.0001", "hep-th/9901001", "math.CO/0601001"):
+        assert is_arxiv_id(value)
+    for value in ("", "2401.1", "2401.01234,2401.01235", "../etc/passwd", "cs/123"):
+        assert not is_arxiv_id(value)
+
+
+def test_lookup_of_invalid_id_skips_upstream(server):
+    lookup = PaperLookup(server.url + "/api/query", window=0.01)
+    assert lookup.get("not-an-id") is None
+    assert lookup.get(f"{paper_id(0, 3)}v2")["arxiv_id"] == paper_id(0, 3)
+    assert server.stats["api_requests"] == 1
+
+
+def test_malformed_id_list_is_rejected_upstream(server):
+    # Why PaperLookup validates ids: one bad id fails the whole id_list query
+    lookup = PaperLookup(server.url + "/api/query")
+    with pytest.raises(requests.HTTPError):
+        lookup.fetch_batch([paper_id(0, 1), "bad id"])
+
+
+def test_concurrent_lookups_of_one_id_share_a_request():
+    release = threading.Event()
+    batches = []
+
+    def fetch(ids):
+        batches.append(ids)
+        release.wait(5)
+        return {i: {"arxiv_id": i} for i in ids}
+
+    lookup = PaperLookup(window=0.01, fetch=fetch)
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(lookup.get, paper_id(0, 1)) for _ in range(8)]
+        while lookup.stats["lookups"] < 8 or not batches:
+            time.sleep(0.01)
+        release.set()
+        results = [f.result(5) for f in futures]
+
+    assert batches == [[paper_id(0, 1)]]
+    assert results == [{"arxiv_id": paper_id(0, 1)}] * 8
+    assert lookup.stats["coalesced"] == 7
+
+
+def test_distinct_ids_within_window_are_batched(server):
+    lookup = PaperLookup(server.url + "/api/query", window=0.2)
+    ids = [paper_id(0, n) for n in range(6)] + ["2401.99999"]
+    with ThreadPoolExecutor(len(ids)) as pool:
+        results = list(pool.map(lookup.get, ids))
+
+    assert [p["arxiv_id"] for p in results[:6]] == ids[:6]
+    assert results[6] is None
+    assert server.stats["api_requests"] == 1
+    assert lookup.stats["batches"] == 1
+
+
+def test_failing_id_does_not_fail_its_batch():
+    bad = paper_id(0, 2)
+    batches = []
+
+    def fetch(ids):
+        batches.append(ids)
+        if bad in ids:
+            raise RuntimeError("upstream error")
+        return {i: {"arxiv_id": i} for i in ids}
+
+    lookup = PaperLookup(window=0.2, fetch=fetch)
+    ids = [paper_id(0, n) for n in range(4)]
+    with ThreadPoolExecutor(len(ids)) as pool:
+        futures = {i: pool.submit(lookup.get, i) for i in ids}
+        for i in ids:
+            if i == bad:
+                with pytest.raises(RuntimeError):
+                    futures[i].result(5)
+            else:
+                assert futures[i].result(5) == {"arxiv_id": i}
+
+    # The batch was retried in halves until the failing id was alone
+    assert len(batches[0]) == 4
+    assert [bad] in batches
@@ -0,0 +1,63 @@
+# tests/test_arxiv_tools.py
+import asyncio
+
+import pytest
+
+from benchmarks.fake_arxiv import FakeArxivConfig, FakeArxivServer, paper_id
+from tools.arxiv_tools import FeedCache, afetch_categories, normalize_arxiv_id
+
+CATEGORIES = ["cs.AI", "cs.CV", "cs.LG"]
+
+
+@pytest.fixture
+def server():
+    config = FakeArxivConfig(papers_per_category=10, categories=tuple(CATEGORIES))
+    with FakeArxivServer(config) as srv:
+        yield srv
+
+
+def fetch(server, categories, cache=None):
+    return asyncio.run(afetch_categories(categories, base_url=server.url + "/rss", cache=cache))
+
+
+def test_normalize_arxiv_id():
+    for value in ("oai:arXiv.org:2401.01234v2", "https://arxiv.org/abs/2401.01234v2",
+                  "https://arxiv.org/pdf/2401.01234v1.pdf", " 2401.01234 "):
+        assert normalize_arxiv_id(value) == "2401.01234"
+    assert normalize_arxiv_id("http://arxiv.org/abs/cs/0112017v1") == "cs/0112017"
+
+
+def test_cached_feeds_are_reused_on_304(server, tmp_path):
+    cache = FeedCache(tmp_path)
+    first = fetch(server, CATEGORIES, cache)
+    assert {f.status for f in first.feeds.values()} == {"fetched"}
+
+    server.invalidate("cs.CV")
+    second = fetch(server, CATEGORIES, cache)
+    assert {c: f.status for c, f in second.feeds.items()} == {
+        "cs.AI": "not_modified", "cs.CV": "fetched", "cs.LG": "not_modified"}
+    assert server.stats["not_modified"] == 2
+    assert second.by_category == first.by_category
+    assert second.papers == first.papers
+
+
+def test_cross_listed_papers_are_merged(server):
+    result = fetch(server, CATEGORIES)
+    ids = [p["arxiv_id"] for p in result.papers]
+    assert len(ids) == len(set(ids)) == 30
+
+    # Every fifth cs.AI paper is cross-listed in cs.CV
+    cross_listed = next(p for p in result.papers if p["arxiv_id"] == paper_id(0, 5))
+    assert cross_listed["categories"] == ["cs.AI", "cs.CV"]
+    assert paper_id(0, 5) in result.by_category["cs.CV"]
+    own = next(p for p in result.papers if p["arxiv_id"] == paper_id(0, 1))
+    assert own["categories"] == ["cs.AI"]
+
+
+def test_failing_feed_does_not_fail_the_others(server):
+    result = fetch(server, ["cs.AI", "cs.XX", "cs.LG"])
+    assert result.feeds["cs.XX"].status == "error"
+    assert "404" in result.feeds["cs.XX"].error
+    assert result.by_category["cs.XX"] == []
+    assert result.feeds["cs.AI"].status == result.feeds["cs.LG"].status == "fetched"
+    assert {p["arxiv_id"] for p in result.papers} >= {paper_id(0, 0), paper_id(2, 0)}
@@ -0,0 +1,140 @@
+# tests/test_coder_agent.py
+import json
+import asyncio
+import base64
+import hashlib
+
+import pytest
+
+from agents.coder_agent import CODER_BATCH_SYSTEM_PROMPT, CoderAgent
+from tasks import Task
+from tools import file_tools
+
+CONTENT = "print('hello, world')\n"
+B64 = base64.b64encode(CONTENT.encode()).decode()
+
+
+@pytest.fixture
+def coder():
+    return CoderAgent(None, hedging=False)
+
+
+def test_decode_reply(coder):
+    raw = json.dumps({"path": "main.py", "content_b64": B64})
+    assert coder._decode_reply(raw) == ("main.py", CONTENT)
+
+
+def test_decode_reply_checks_sha256(coder):
+    good = hashlib.sha256(CONTENT.encode()).hexdigest()
+    raw = json.dumps({"path": "main.py", "content_b64": B64, "sha256": good})
+    assert coder._decode_reply(raw) == ("main.py", CONTENT)
+    raw = json.dumps({"path": "main.py", "content_b64": B64, "sha256": "0" * 64})
+    assert coder._decode_reply(raw) is None
+
+
+@pytest.mark.parametrize("cut", [1, 2, 3, 5])
+def test_decode_reply_rejects_truncated_base64(coder, cut):
+    raw = json.dumps({"path": "main.py", "content_b64": B64[:-cut]})
+    assert coder._decode_reply(raw) is None
+
+
+def test_decode_reply_needs_closed_string(coder):
+    assert coder._decode_reply('{"path": "main.py", "content_b64": "' + B64) is None
+
+
+class StreamingLLM:
+    def __init__(self, reply):
+        self.reply = reply
+
+    async def astream(self, system_prompt, messages):
+        for i in range(0, len(self.reply), 7):
+            yield self.reply[i:i + 7]
+
+
+def test_stream_file_never_writes_truncated_content(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_tools, "WORKSPACE_ROOT", tmp_path)
+    file_tools.reset_dir_cache()
+    task = Task(id=1, name="t", description="d", files=["main.py"], depends_on=[])
+
+    coder = CoderAgent(StreamingLLM(json.dumps({"path": "main.py", "content_b64": B64[:-2]})),
+                       hedging=False)
+    with pytest.raises(ValueError):
+        asyncio.run(coder._stream_file(task, "main.py", "proj", "payload"))
+    assert list((tmp_path / "proj").iterdir()) == []
+
+    coder.llm = StreamingLLM(json.dumps({"path": "main.py", "content_b64": B64}))
+    asyncio.run(coder._stream_file(task, "main.py", "proj", "payload"))
+    assert (tmp_path / "proj" / "main.py").read_text() == CONTENT
+
+
+class BufferedLLM:
+    def __init__(self, reply):
+        self.reply = reply
+
+    async def achat(self, system_prompt, messages, validate=None, refresh=False):
+        validate(self.reply)
+        return self.reply
+
+
+class Prompt:
+    def build(self, values, deps):
+        return "payload"
+
+
+def test_reply_path_never_redirects_the_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_tools, "WORKSPACE_ROOT", tmp_path)
+    file_tools.reset_dir_cache()
+    task = Task(id=1, name="t", description="d", files=["main.py"], depends_on=[])
+    reply = json.dumps({"path": "../outside.py", "content_b64": B64})
+
+    coder = CoderAgent(StreamingLLM(reply), hedging=False, streaming=True)
+    asyncio.run(coder._stream_file(task, "main.py", "proj", "payload"))
+    assert (tmp_path / "proj" / "main.py").read_text() == CONTENT
+    (tmp_path / "proj" / "main.py").unlink()
+
+    coder = CoderAgent(BufferedLLM(reply), hedging=False, streaming=False)
+    result = asyncio.run(coder._generate_file(task, "main.py", "proj", Prompt(), []))
+    assert result.status == "ok"
+    assert (tmp_path / "proj" / "main.py").read_text() == CONTENT
+    assert sorted(p.name for p in tmp_path.rglob("*")) == ["main.py", "proj"]
+
+
+def frame(path, content):
+    data = content.encode()
+    return (f"=== FILE: {path} ===\n{base64.b64encode(data).decode()}\n"
+            f"=== END FILE: {path} sha256={hashlib.sha256(data).hexdigest()} ===\n")
+
+
+class BatchLLM:
+    """
+    Answers the batch request with `batch_reply` and single-file requests
+    with `single_reply`, recording which kind was made.
+    """
+
+    def __init__(self, batch_reply, single_reply):
+        self.batch_reply = batch_reply
+        self.single_reply = single_reply
+        self.requests = []
+
+    async def achat(self, system_prompt, messages, validate=None, refresh=False):
+        batched = system_prompt == CODER_BATCH_SYSTEM_PROMPT
+        self.requests.append("batch" if batched else "single")
+        return self.batch_reply if batched else self.single_reply
+
+
+def test_file_cut_off_in_batch_reply_falls_back_to_single_request(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_tools, "WORKSPACE_ROOT", tmp_path)
+    file_tools.reset_dir_cache()
+    utils = "def greet():\n    return 'hello'\n"
+    task = Task(id=1, name="t", description="d", files=["main.py", "utils.py"], depends_on=[])
+    cut = frame("utils.py", utils * 10)
+    llm = BatchLLM(frame("main.py", CONTENT) + cut[:cut.index("\n") + 40],
+                   json.dumps({"path": "utils.py",
+                               "content_b64": base64.b64encode(utils.encode()).decode()}))
+
+    coder = CoderAgent(llm, hedging=False, streaming=False, batch=True)
+    results = asyncio.run(coder.arun([task], "proj"))
+    assert sorted((r.path, r.status) for r in results) == [("main.py", "ok"), ("utils.py", "ok")]
+    assert llm.requests == ["batch", "single"]
+    assert (tmp_path / "proj" / "main.py").read_text() == CONTENT
+    assert (tmp_path / "proj" / "utils.py").read_text() == utils
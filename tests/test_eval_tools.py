@@ -0,0 +1,58 @@
+# tests/test_eval_tools.py
+from tools.eval_tools import EvalCache, check_python_source, import_roots, project_context
+
+SOURCE = b"import os\nimport helpers.text as t\nfrom requests import get\nfrom . import sibling\n"
+
+
+def test_import_roots():
+    assert import_roots(SOURCE) == {"os", "helpers", "requests"}
+    assert import_roots(b"def broken(:\n") == set()
+
+
+def test_key_ignores_unrelated_files(tmp_path):
+    (tmp_path / "main.py").write_bytes(SOURCE)
+    (tmp_path / "requirements.txt").write_text("requests>=2\n")
+    (tmp_path / "helpers").mkdir()
+    (tmp_path / "helpers" / "text.py").write_text("")
+    key = EvalCache.make_key("main.py", SOURCE, project_context(tmp_path))
+
+    (tmp_path / "unrelated.py").write_text("")
+    assert EvalCache.make_key("main.py", SOURCE, project_context(tmp_path)) == key
+
+    (tmp_path / "helpers" / "text.py").unlink()
+    (tmp_path / "helpers").rmdir()
+    context = project_context(tmp_path)
+    assert EvalCache.make_key("main.py", SOURCE, context) != key
+    assert any("helpers.text" in i for i in check_python_source(SOURCE.decode(), "main.py", context))
+
+
+def test_key_tracks_requirements(tmp_path):
+    (tmp_path / "main.py").write_bytes(SOURCE)
+    key = EvalCache.make_key("main.py", SOURCE, project_context(tmp_path))
+    (tmp_path / "requirements.txt").write_text("flask\n")
+    assert EvalCache.make_key("main.py", SOURCE, project_context(tmp_path)) == key
+    (tmp_path / "requirements.txt").write_text("flask\nRequests\n")
+    assert EvalCache.make_key("main.py", SOURCE, project_context(tmp_path)) != key
+
+
+def test_concurrent_saves_merge(tmp_path):
+    path = tmp_path / "eval_cache.json"
+    first, second = EvalCache(path), EvalCache(path)
+    first.put("a", [])
+    second.put("b", ["Lint: unused import 'os' (line 1)"])
+    first.save()
+    second.save()
+    assert EvalCache(path).entries == {"a": [], "b": ["Lint: unused import 'os' (line 1)"]}
+
+
+def test_save_keeps_most_recent(tmp_path):
+    path = tmp_path / "eval_cache.json"
+    old = EvalCache(path, max_entries=2)
+    old.put("a", [])
+    old.put("b", [])
+    old.save()
+    new = EvalCache(path, max_entries=2)
+    new.put("c", [])
+    new.get("a")
+    new.save()
+    assert list(EvalCache(path).entries) == ["c", "a"]
@@ -0,0 +1,68 @@
+# tests/test_exec_tools.py
+import time
+
+import pytest
+
+from tools import exec_tools
+from tools.exec_tools import Limits, find_jobs, run_job
+
+LIMITS = Limits(cpu_seconds=1, memory_bytes=512 * 1024 * 1024, wall_seconds=2.0)
+
+
+def smoke(tmp_path, source):
+    (tmp_path / "main.py").write_text(source)
+    [job] = find_jobs(tmp_path)
+    assert job.kind == "smoke"
+    return job
+
+
+def test_smoke_job_passes(tmp_path):
+    result = run_job(smoke(tmp_path, "print('hello')\n"), LIMITS)
+    assert result.status == "passed"
+    assert "hello" in result.output
+
+
+def test_smoke_job_fails(tmp_path):
+    result = run_job(smoke(tmp_path, "raise RuntimeError('boom')\n"), LIMITS)
+    assert result.status == "failed"
+    assert result.returncode == 1
+    assert "RuntimeError: boom" in result.output
+
+
+def test_wall_clock_timeout(tmp_path):
+    result = run_job(smoke(tmp_path, "import time\ntime.sleep(30)\n"), LIMITS)
+    assert result.status == "timeout"
+    assert "wall time" in result.output
+    assert result.duration < LIMITS.wall_seconds + 1
+
+
+def test_timeout_after_output_closed(tmp_path):
+    # The child closes its pipe and keeps running: still killed at the deadline
+    source = "import os, time\nos.close(1)\nos.close(2)\ntime.sleep(30)\n"
+    start = time.perf_counter()
+    result = run_job(smoke(tmp_path, source), LIMITS)
+    assert result.status == "timeout"
+    assert "wall time" in result.output
+    assert time.perf_counter() - start < LIMITS.wall_seconds + 1
+
+
+def test_cpu_limit(tmp_path):
+    limits = Limits(cpu_seconds=1, memory_bytes=LIMITS.memory_bytes, wall_seconds=10.0)
+    result = run_job(smoke(tmp_path, "while True:\n    pass\n"), limits)
+    assert result.status == "timeout"
+    assert "CPU time" in result.output
+
+
+def test_memory_limit(tmp_path):
+    result = run_job(smoke(tmp_path, "data = bytearray(1024 * 1024 * 1024)\n"), LIMITS)
+    assert result.status == "failed"
+    assert "MemoryError" in result.output
+
+
+def test_close_runner(monkeypatch):
+    monkeypatch.setattr(exec_tools, "_runner", None)
+    runner = exec_tools.get_runner()
+    assert exec_tools.get_runner() is runner
+    exec_tools.close_runner()
+    assert exec_tools.get_runner() is not runner
+    exec_tools.close_runner()
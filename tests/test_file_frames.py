@@ -0,0 +1,56 @@
+# tests/test_file_frames.py
+import base64
+import hashlib
+
+from tools.file_frames import decode_frame, parse_file_frames
+
+FILES = {
+    "main.py": "from utils import greet\n\nprint(greet('world'))\n",
+    "utils.py": "def greet(name):\n    return f'hello, {name} ✓'\n" * 20,
+}
+
+
+def frame(path, content, sha=True, width=76):
+    data = content.encode("utf-8")
+    b64 = base64.b64encode(data).decode()
+    lines = "\n".join(b64[i:i + width] for i in range(0, len(b64), width))
+    end = f" sha256={hashlib.sha256(data).hexdigest()}" if sha else ""
+    return f"=== FILE: {path} ===\n{lines}\n=== END FILE: {path}{end} ===\n"
+
+
+def test_frames_round_trip():
+    reply = "Here are the files:\n\n" + "".join(frame(p, c) for p, c in FILES.items())
+    assert parse_file_frames(reply) == FILES
+
+
+def test_sha256_is_optional():
+    assert parse_file_frames(frame("main.py", FILES["main.py"], sha=False)) == {"main.py": FILES["main.py"]}
+
+
+def test_sha256_mismatch_drops_the_frame():
+    good = frame("main.py", FILES["main.py"])
+    other = hashlib.sha256(b"something else").hexdigest()
+    bad = good.replace(hashlib.sha256(FILES["main.py"].encode()).hexdigest(), other)
+    assert bad != good
+    assert parse_file_frames(bad + frame("utils.py", FILES["utils.py"])) == {"utils.py": FILES["utils.py"]}
+
+
+def test_invalid_base64_or_utf8_is_rejected():
+    assert decode_frame("aGVsbG8*") is None
+    assert decode_frame(base64.b64encode(b"\xff\xfe").decode()) is None
+    assert decode_frame("aGVs\nbG8=\n") == "hello"
+
+
+def test_frame_cut_off_mid_base64_is_dropped():
+    # A reply truncated inside the second frame: its END line never came
+    complete = frame("main.py", FILES["main.py"])
+    cut = frame("utils.py", FILES["utils.py"])
+    cut = cut[:cut.index("\n", 200) - 7]
+    assert parse_file_frames(complete + cut) == {"main.py": FILES["main.py"]}
+
+
+def test_frame_without_its_own_end_line_is_dropped():
+    # An END line for another path does not close the frame
+    cut = frame("utils.py", FILES["utils.py"]).split("=== END")[0]
+    reply = cut + frame("main.py", FILES["main.py"])
+    assert parse_file_frames(reply) == {"main.py": FILES["main.py"]}
@@ -0,0 +1,59 @@
+# tests/test_file_tools.py
+import os
+import stat
+
+import pytest
+
+from tools import file_tools
+from tools.file_tools import FileTransaction, replace_if_changed, write_file
+
+
+@pytest.fixture(autouse=True)
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_tools, "WORKSPACE_ROOT", tmp_path)
+    file_tools.reset_dir_cache()
+    return tmp_path
+
+
+def test_write_file_keeps_mode(workspace):
+    target = workspace / "proj" / "run.sh"
+    assert write_file("proj/run.sh", "echo one\n")
+    os.chmod(target, 0o750)
+    assert write_file("proj/run.sh", "echo two\n")
+    assert target.read_text() == "echo two\n"
+    assert stat.S_IMODE(target.stat().st_mode) == 0o750
+    assert not write_file("proj/run.sh", "echo two\n")
+    assert [p.name for p in target.parent.iterdir()] == ["run.sh"]
+
+
+def test_replace_if_changed_keeps_mode(workspace):
+    target = workspace / "tool.py"
+    target.write_text("old\n")
+    os.chmod(target, 0o700)
+    part = workspace / "tool.py.part"
+    part.write_text("new\n")
+    assert replace_if_changed(part, target)
+    assert target.read_text() == "new\n"
+    assert stat.S_IMODE(target.stat().st_mode) == 0o700
+
+
+def test_transaction_commits_together(workspace):
+    write_file("proj/same.py", "same\n")
+    with FileTransaction() as tx:
+        tx.stage("proj/a.py", "a\n")
+        tx.stage("proj/pkg/b.py", "b\n")
+        tx.stage("proj/same.py", "same\n")
+        assert not (workspace / "proj" / "a.py").exists()
+    assert (workspace / "proj" / "a.py").read_text() == "a\n"
+    assert (workspace / "proj" / "pkg" / "b.py").read_text() == "b\n"
+    assert sorted(p.name for p in tx.written) == ["a.py", "b.py"]
+    assert [p.name for p in tx.unchanged] == ["same.py"]
+
+
+def test_transaction_aborts_on_error(workspace):
+    with pytest.raises(RuntimeError):
+        with FileTransaction() as tx:
+            tx.stage("proj/a.py", "a\n")
+            raise RuntimeError("model reply rejected")
+    assert not (workspace / "proj" / "a.py").exists()
+    assert list((workspace / "proj").iterdir()) == []
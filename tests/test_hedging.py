@@ -0,0 +1,86 @@
+# tests/test_hedging.py
+import asyncio
+
+from hedging import HedgePolicy, first_valid
+
+
+def policy(delay=0.02, budget=1.0, burst=1):
+    # Enough min_samples that the fixed initial delay is always used
+    return HedgePolicy(initial_delay=delay, min_samples=1000, budget=budget, burst=burst)
+
+
+class Requests:
+    """
+    start() stand-in: the n-th call sleeps `plan[n][0]` seconds and returns
+    `plan[n][1]`. Records started and cancelled calls.
+    """
+
+    def __init__(self, *plan):
+        self.plan = plan
+        self.started = 0
+        self.cancelled = []
+
+    async def __call__(self):
+        n = self.started
+        self.started += 1
+        delay, reply = self.plan[n]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(n)
+            raise
+        return reply
+
+
+def accept(reply):
+    return reply.upper() if reply.startswith("good") else None
+
+
+def test_hedge_wins_when_primary_reply_is_invalid():
+    start = Requests((0.1, "bad"), (0.1, "good"))
+    p = policy()
+
+    result, replies = asyncio.run(first_valid(start, accept, p))
+    assert result == "GOOD"
+    assert replies == ["bad", "good"]
+    assert start.started == 2
+    assert p.hedges == p.wins == 1
+
+
+def test_no_hedge_once_budget_is_spent():
+    start = Requests((0.1, "good primary"), (0.0, "good hedge"))
+    p = policy(budget=0.0, burst=0)
+
+    result, replies = asyncio.run(first_valid(start, accept, p))
+    assert result == "GOOD PRIMARY"
+    assert start.started == 1
+    assert p.hedges == 0
+
+
+def test_budget_allows_hedges_in_proportion_to_requests():
+    p = policy(budget=0.5, burst=0)
+
+    async def run():
+        outcomes = []
+        for _ in range(4):
+            start = Requests((0.05, "good primary"), (0.0, "good hedge"))
+            outcomes.append((await first_valid(start, accept, p))[0])
+        return outcomes
+
+    assert asyncio.run(run()) == ["GOOD HEDGE", "GOOD PRIMARY", "GOOD HEDGE", "GOOD PRIMARY"]
+    assert p.hedges == 2
+
+
+def test_losing_request_is_cancelled():
+    start = Requests((5.0, "good primary"), (0.01, "good hedge"))
+    p = policy()
+
+    async def run():
+        result = await first_valid(start, accept, p, critical=True)
+        await asyncio.sleep(0)  # let the cancellation reach the primary
+        return result
+
+    result, replies = asyncio.run(run())
+    assert result == "GOOD HEDGE"
+    assert replies == ["good hedge"]
+    assert start.cancelled == [0]
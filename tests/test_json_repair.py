@@ -0,0 +1,55 @@
+# tests/test_json_repair.py
+import json
+
+import pytest
+
+from tools.json_repair import (
+    extract_json_text, find_string_field, loads_lenient, repair_json, strip_code_fences,
+)
+
+
+def test_strip_code_fences_only_strips_outer_fences():
+    body = '{"readme": "Run:\\n```bash\\npython main.py\\n```\\n"}'
+    assert strip_code_fences(f"```json\n{body}\n```\n") == body
+    assert strip_code_fences(f"```\n{body}\n```") == body
+    assert strip_code_fences(body) == body
+
+
+def test_fence_inside_string_survives():
+    readme = "Usage:\n```\npython main.py\n```\n"
+    reply = "```json\n" + json.dumps({"path": "README.md", "content": readme}) + "\n```"
+    assert loads_lenient(reply)["content"] == readme
+
+
+@pytest.mark.parametrize("reply", [
+    'The result {is below}: {"a": 1}',
+    'Using the format {path, content_b64} you asked for:\n{"a": 1}\nDone {ok}.',
+    '```json\n{"a": 1}\n```',
+    'Sure! [see below]\n{"a": 1,}',
+])
+def test_loads_lenient_skips_prose_brackets(reply):
+    assert loads_lenient(reply) == {"a": 1}
+
+
+def test_loads_lenient_repairs_truncated_value_after_prose():
+    assert loads_lenient('Here {it is}: {"a": [1, 2], "b": "tru') == {"a": [1, 2], "b": "tru"}
+
+
+def test_truncated_object_is_not_replaced_by_inner_object():
+    reply = '{"architecture": {"project_root": "p"}, "tasks": [{"id": 1}, {"id": 2'
+    data = loads_lenient(reply)
+    assert data["architecture"] == {"project_root": "p"}
+    assert data["tasks"][0] == {"id": 1}
+
+
+def test_repair_json():
+    assert json.loads(repair_json('{"a": "line\none", "b": [1, 2,],}')) == {"a": "line\none", "b": [1, 2]}
+    assert json.loads(repair_json('{"a": 1, "b"')) == {"a": 1}
+    assert extract_json_text("no json here") == ""
+    with pytest.raises(ValueError):
+        loads_lenient("no json here")
+
+
+def test_find_string_field():
+    assert find_string_field('{"path": "a.py", "content_b64": "QQ==" ', "content_b64") == "QQ=="
+    assert find_string_field('{"path": "a.py", "content_b64": "QQ', "content_b64") is None
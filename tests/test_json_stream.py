@@ -0,0 +1,63 @@
+# tests/test_json_stream.py
+import json
+
+import pytest
+
+from tools.json_stream import JSONStreamScanner
+
+PLAN = {
+    "architecture": {"language": "Python", "project_root": "demo", "modules": ["a{b}.py"]},
+    "tasks": [
+        {"id": 1, "name": "core", "description": 'quote " and ] bracket', "files": ["main.py"]},
+        {"id": 2, "name": "docs", "description": "d", "files": ["README.md"], "depends_on": [1]},
+    ],
+    "version": 3,
+    "final": True,
+}
+
+
+def scan(text, size):
+    scanner = JSONStreamScanner()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(scanner.feed(text[i:i + size]))
+    return scanner, events
+
+
+@pytest.mark.parametrize("size", [1, 5, 10_000])
+def test_events_match_the_document_in_any_chunking(size):
+    scanner, events = scan("Here is the plan:\n```json\n" + json.dumps(PLAN, indent=2) + "\n```", size)
+    assert events == [
+        ("member", "architecture", PLAN["architecture"]),
+        ("item", "tasks", PLAN["tasks"][0]),
+        ("item", "tasks", PLAN["tasks"][1]),
+        ("member", "version", 3),
+        ("member", "final", True),
+    ]
+    assert scanner.complete
+
+
+def test_item_is_emitted_once_it_closes():
+    scanner = JSONStreamScanner()
+    assert scanner.feed('{"tasks": [{"id": 1, "name": "a"') == []
+    assert scanner.feed('}, {"id": 2') == [("item", "tasks", {"id": 1, "name": "a"})]
+    assert not scanner.complete
+
+
+def test_items_are_parsed_leniently():
+    _, events = scan('{"tasks": [{"id": 1, "files": ["a.py",],}, {"id": 2, "description": "two\nlines"}]}', 3)
+    assert events == [
+        ("item", "tasks", {"id": 1, "files": ["a.py"]}),
+        ("item", "tasks", {"id": 2, "description": "two\nlines"}),
+    ]
+
+
+def test_unrecoverable_item_raises():
+    with pytest.raises(ValueError):
+        scan('{"tasks": [nonsense]}', 4)
+
+
+def test_truncated_document_is_not_complete():
+    scanner, events = scan(json.dumps(PLAN)[:-40], 8)
+    assert [e[:2] for e in events] == [("member", "architecture"), ("item", "tasks")]
+    assert not scanner.complete
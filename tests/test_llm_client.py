@@ -0,0 +1,132 @@
+# tests/test_llm_client.py
+import json
+import time
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from config import LLM_API_KEY_ENV
+from agents.base import BaseAgent
+import llm_client
+from llm_client import LLMClient
+
+
+RETRY_AFTER = 0.3
+
+
+class ChatHandler(BaseHTTPRequestHandler):
+    """
+    Answers every completion with "ok" and records the client's port and
+    the request time. The first `server.throttle` requests get a 429.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.ports.append(self.client_address[1])
+        self.server.times.append(time.monotonic())
+        if self.server.throttle:
+            self.server.throttle -= 1
+            self.send_response(429)
+            self.send_header("Retry-After", str(RETRY_AFTER))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps({
+            "choices": [{"message": {"content": "ok"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), ChatHandler)
+    srv.ports = []
+    srv.times = []
+    srv.throttle = 0
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def llm(server, monkeypatch):
+    monkeypatch.setenv(LLM_API_KEY_ENV, "test-key")
+    client = LLMClient(api_base=f"http://127.0.0.1:{server.server_port}", use_cache=False)
+    client.use_real_llm = True
+    return client
+
+
+@pytest.fixture
+def short_backoff(monkeypatch):
+    # Keeps the jittered backoff well under Retry-After, which sets the wait
+    monkeypatch.setattr(llm_client, "LLM_BACKOFF_BASE", 0.01)
+
+
+def test_chat_waits_retry_after_on_429(server, llm, short_backoff):
+    server.throttle = 1
+    assert llm.chat("system", [{"role": "user", "content": "hi"}]) == "ok"
+    assert len(server.times) == 2
+    assert server.times[1] - server.times[0] >= RETRY_AFTER
+
+
+def test_achat_waits_retry_after_on_429(server, llm, short_backoff):
+    server.throttle = 1
+
+    async def run():
+        async with llm:
+            return await llm.achat("system", [{"role": "user", "content": "hi"}])
+
+    assert asyncio.run(run()) == "ok"
+    assert len(server.times) == 2
+    assert server.times[1] - server.times[0] >= RETRY_AFTER
+
+
+def test_chat_closes_its_loops_client(server, llm):
+    for i in range(3):
+        assert llm.chat("system", [{"role": "user", "content": str(i)}]) == "ok"
+        assert llm._aclient is None
+    assert len(server.ports) == 3
+
+
+def test_achat_reuses_one_connection(server, llm):
+    async def run():
+        async with llm:
+            for i in range(5):
+                assert await llm.achat("system", [{"role": "user", "content": str(i)}]) == "ok"
+
+    asyncio.run(run())
+    assert len(server.ports) == 5
+    assert len(set(server.ports)) == 1
+
+
+class EchoAgent(BaseAgent):
+    def __init__(self, llm):
+        super().__init__("echo", "system", llm)
+        self.clients = []
+
+    async def arun(self, content):
+        self.clients.append(self.llm._async_client())
+        return await self._achat(content)
+
+
+def test_sync_wrapper_closes_its_loops_client(llm):
+    agent = EchoAgent(llm)
+    assert agent.run("one") == "ok"
+    assert agent.run("two") == "ok"
+    first, second = agent.clients
+    assert first is not second
+    assert first.is_closed and second.is_closed
+    assert llm._aclient is None
@@ -0,0 +1,55 @@
+# tests/test_plan_diff.py
+from plan_diff import affected_files
+from tasks import Plan, Task
+
+ARCHITECTURE = {"language": "Python", "framework": "Flask", "project_root": "demo"}
+
+
+def plan(*tasks, **architecture):
+    return Plan(architecture=dict(ARCHITECTURE, **architecture), tasks=list(tasks))
+
+
+def task(tid, files, depends_on=(), description="d"):
+    return Task(id=tid, name=f"write {files[0]}", description=description, files=list(files),
+                depends_on=list(depends_on))
+
+
+BASE = [task(1, ["utils.py"]), task(2, ["models.py"], [1]), task(3, ["app.py"], [2]),
+        task(4, ["README.md"])]
+
+
+def test_unchanged_plan_affects_nothing():
+    assert affected_files(plan(*BASE), plan(*BASE)) == set()
+
+
+def test_renumbered_tasks_are_unchanged():
+    renumbered = [task(11, ["utils.py"]), task(12, ["models.py"], [11]),
+                  task(13, ["app.py"], [12]), task(14, ["README.md"])]
+    assert affected_files(plan(*BASE), plan(*renumbered)) == set()
+
+
+def test_edited_task_and_its_dependents_are_affected():
+    edited = [BASE[0], task(2, ["models.py"], [1], description="changed"), BASE[2], BASE[3]]
+    assert affected_files(plan(*BASE), plan(*edited)) == {"models.py", "app.py"}
+
+
+def test_edit_upstream_reaches_the_whole_chain():
+    edited = [task(1, ["utils.py"], description="changed"), *BASE[1:]]
+    assert affected_files(plan(*BASE), plan(*edited)) == {"utils.py", "models.py", "app.py"}
+
+
+def test_new_task_is_affected():
+    added = [*BASE, task(5, ["cli.py"], [1])]
+    assert affected_files(plan(*BASE), plan(*added)) == {"cli.py"}
+
+
+def test_architecture_change_affects_everything():
+    everything = {"utils.py", "models.py", "app.py", "README.md"}
+    assert affected_files(plan(*BASE), plan(*BASE, framework="FastAPI")) == everything
+    assert affected_files(plan(*BASE), plan(*BASE, project_root="other")) == everything
+
+
+def test_invalid_previous_plan_rebuilds_everything():
+    cyclic = [task(1, ["utils.py"], [2]), task(2, ["models.py"], [1])]
+    everything = {"utils.py", "models.py", "app.py", "README.md"}
+    assert affected_files(plan(*cyclic), plan(*BASE)) == everything
@@ -0,0 +1,72 @@
+# tests/test_planner_agent.py
+import json
+import asyncio
+
+from agents.planner_agent import PlannerAgent
+from llm_client import TruncatedReplyError
+
+ARCHITECTURE = {"language": "Python", "framework": "Flask", "project_root": "demo", "modules": []}
+TASKS = [
+    {"id": 1, "name": "core", "description": "d", "files": ["main.py", "utils.py"]},
+    {"id": 2, "name": "docs", "description": "d", "files": ["README.md"], "depends_on": [1]},
+    {"id": 3, "name": "deps", "description": "d", "files": ["requirements.txt"], "depends_on": [1]},
+]
+PLAN = json.dumps({"architecture": ARCHITECTURE, "tasks": TASKS})
+
+
+class PlanLLM:
+    """
+    Streams `streamed` (then raises `error`, if given) and answers the
+    buffered request with the whole plan.
+    """
+
+    def __init__(self, streamed, error=None):
+        self.streamed = streamed
+        self.error = error
+        self.buffered_calls = 0
+
+    async def astream(self, system_prompt, messages):
+        for i in range(0, len(self.streamed), 9):
+            yield self.streamed[i:i + 9]
+        if self.error is not None:
+            raise self.error
+
+    async def achat(self, system_prompt, messages, validate=None, refresh=False):
+        self.buffered_calls += 1
+        return PLAN
+
+
+async def collect(planner):
+    return [item async for item in planner.astream_plan("build a demo")]
+
+
+def test_complete_stream_needs_no_buffered_request():
+    llm = PlanLLM(PLAN)
+    items = asyncio.run(collect(PlannerAgent(llm)))
+    assert items[0]["project_root"] == "demo"
+    assert [t.id for t in items[1:]] == [1, 2, 3]
+    assert llm.buffered_calls == 0
+
+
+def test_truncated_stream_falls_back_for_remaining_tasks():
+    cut = PLAN.index('{"id": 2')
+    llm = PlanLLM(PLAN[:cut], TruncatedReplyError(""))
+    items = asyncio.run(collect(PlannerAgent(llm)))
+    assert items[0]["project_root"] == "demo"
+    assert [t.id for t in items[1:]] == [1, 2, 3]
+    assert llm.buffered_calls == 1
+
+
+def test_stream_that_stops_early_falls_back():
+    llm = PlanLLM(PLAN[:40])
+    items = asyncio.run(collect(PlannerAgent(llm)))
+    assert [t.id for t in items[1:]] == [1, 2, 3]
+    assert llm.buffered_calls == 1
+
+
+def test_unparseable_item_falls_back():
+    broken = PLAN.replace('{"id": 3', '{"id": ]3', 1)
+    llm = PlanLLM(broken)
+    items = asyncio.run(collect(PlannerAgent(llm)))
+    assert [t.id for t in items[1:]] == [1, 2, 3]
+    assert llm.buffered_calls == 1
@@ -0,0 +1,59 @@
+# tests/test_rate_limit.py
+import asyncio
+
+from config import LLM_API_KEY_ENV
+from llm_client import LLMClient
+from rate_limit import AdaptiveConcurrency, FairShareLimiter, current_project
+
+
+def test_burst_of_errors_halves_limit_once():
+    async def run():
+        limiter = AdaptiveConcurrency(initial=16, minimum=1, maximum=32, latency_target=1.0)
+        tickets = [await limiter.acquire() for _ in range(8)]
+        for started in tickets:
+            await limiter.release(started, None, error=True)
+        assert limiter.limit == 8
+        assert limiter.in_flight == 0
+
+        # A request started after the decrease may halve it again
+        started = await limiter.acquire()
+        await limiter.release(started, None, error=True)
+        assert limiter.limit == 4
+
+    asyncio.run(run())
+
+
+def test_healthy_responses_grow_limit():
+    async def run():
+        limiter = AdaptiveConcurrency(initial=2, minimum=1, maximum=4, latency_target=1.0)
+        for _ in range(20):
+            started = await limiter.acquire()
+            await limiter.release(started, 0.1, error=False)
+        assert limiter.limit == 4
+
+    asyncio.run(run())
+
+
+def test_projects_interleave_under_low_limit(monkeypatch):
+    monkeypatch.setenv(LLM_API_KEY_ENV, "test-key")
+    llm = LLMClient(use_cache=False)
+    llm.concurrency = AdaptiveConcurrency(initial=2, minimum=1, maximum=2, latency_target=1.0)
+    llm.fair_share = FairShareLimiter(lambda: int(llm.concurrency.limit))
+    order = []
+
+    async def request(project):
+        current_project.set(project)
+        started = await llm._acquire_slot()
+        order.append(project)
+        await asyncio.sleep(0.01)
+        await llm._release_slot(started, 0.01, error=False)
+
+    async def run():
+        big = [asyncio.create_task(request("B")) for _ in range(12)]
+        await asyncio.sleep(0)
+        small = [asyncio.create_task(request("s")) for _ in range(3)]
+        await asyncio.gather(*big, *small)
+
+    asyncio.run(run())
+    # The small project gets every other slot instead of waiting for the big one
+    assert "".join(order)[:8].count("s") == 3, order
@@ -0,0 +1,103 @@
+# tests/test_scheduler.py
+import asyncio
+
+import pytest
+
+from scheduler import arun_task_graph, arun_task_stream, topological_order
+from tasks import FileResult, Task
+
+
+def task(tid, files=(), depends_on=()):
+    return Task(id=tid, name=f"t{tid}", description="d", files=list(files),
+                depends_on=list(depends_on))
+
+
+def test_topological_order_puts_dependencies_first():
+    tasks = [task(3, depends_on=[2]), task(1), task(2, depends_on=[1]), task(4)]
+    assert [t.id for t in topological_order(tasks)] == [1, 4, 2, 3]
+
+
+@pytest.mark.parametrize("tasks, message", [
+    ([task(1, depends_on=[2]), task(2, depends_on=[1])], "cycle"),
+    ([task(1), task(2, depends_on=[7])], "unknown"),
+    ([task(1, depends_on=[1])], "itself"),
+    ([task(1), task(1)], "Duplicate"),
+])
+def test_invalid_graph_raises_before_any_work(tasks, message):
+    started = []
+
+    async def work(t, path):
+        started.append(path)
+        return FileResult(t.id, path, "ok")
+
+    with pytest.raises(ValueError, match=message):
+        asyncio.run(arun_task_graph(tasks, work))
+    assert started == []
+
+
+class Recorder:
+    """
+    work() stand-in recording what runs concurrently; files named in
+    `fail` fail.
+    """
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.started = []
+        self.in_flight = []
+        self.peak = 0
+        self.overlaps = set()
+
+    async def __call__(self, t, path):
+        self.started.append(path)
+        if path in self.in_flight:
+            self.overlaps.add(path)
+        self.in_flight.append(path)
+        self.peak = max(self.peak, len(self.in_flight))
+        await asyncio.sleep(0.01)
+        self.in_flight.remove(path)
+        if path in self.fail:
+            raise RuntimeError("generation failed")
+        return FileResult(t.id, path, "ok")
+
+
+def test_dependents_of_failed_task_are_skipped():
+    work = Recorder(fail={"a.py"})
+    tasks = [task(1, ["a.py"]), task(2, ["b.py"], [1]), task(3, ["c.py"], [2]), task(4, ["d.py"])]
+    results = {r.path: r for r in asyncio.run(arun_task_graph(tasks, work))}
+
+    assert results["a.py"].status == "failed"
+    assert results["b.py"].status == results["c.py"].status == "skipped"
+    assert results["d.py"].status == "ok"
+    assert sorted(work.started) == ["a.py", "d.py"]
+
+
+def test_max_workers_bounds_files_in_flight():
+    work = Recorder()
+    tasks = [task(i, [f"f{i}_{n}.py" for n in range(3)]) for i in range(1, 5)]
+    results = asyncio.run(arun_task_graph(tasks, work, max_workers=3))
+    assert len(results) == 12 and all(r.ok for r in results)
+    assert work.peak == 3
+
+
+def test_tasks_sharing_a_path_run_it_one_at_a_time():
+    work = Recorder()
+    tasks = [task(i, ["shared.py", f"own{i}.py"]) for i in range(1, 4)]
+    results = asyncio.run(arun_task_graph(tasks, work, max_workers=8))
+    assert len(results) == 6
+    assert work.started.count("shared.py") == 3
+    assert work.overlaps == set()
+    assert work.peak > 1
+
+
+def test_stream_reports_unresolved_tasks_as_skipped():
+    async def source():
+        for t in (task(1, ["a.py"]), task(2, ["b.py"], [9]), task(3, ["c.py"], [4]),
+                  task(4, ["d.py"], [3])):
+            yield t
+
+    results = {r.path: r for r in asyncio.run(arun_task_stream(source(), Recorder()))}
+    assert results["a.py"].status == "ok"
+    for path in ("b.py", "c.py", "d.py"):
+        assert results[path].status == "skipped"
+        assert "unresolved" in results[path].error
@@ -0,0 +1,58 @@
+# tests/test_stream_decode.py
+import io
+import json
+import base64
+import hashlib
+
+import pytest
+
+from tools.stream_decode import StreamingB64Decoder
+
+CONTENT = "print('hello world')\nx = 1\n"
+B64 = base64.b64encode(CONTENT.encode()).decode()
+
+
+def decode(reply, size=5):
+    out = io.BytesIO()
+    decoder = StreamingB64Decoder(out)
+    for i in range(0, len(reply), size):
+        decoder.feed(reply[i:i + size])
+    decoder.close()
+    return decoder, out.getvalue().decode()
+
+
+def test_decodes_in_small_chunks():
+    decoder, content = decode(json.dumps({"path": "main.py", "content_b64": B64}))
+    assert content == CONTENT
+    assert decoder.path == "main.py"
+
+
+def test_checks_sha256_before_or_after_content():
+    good = hashlib.sha256(CONTENT.encode()).hexdigest()
+    for reply in ({"sha256": good, "content_b64": B64}, {"content_b64": B64, "sha256": good}):
+        assert decode(json.dumps(reply))[1] == CONTENT
+    with pytest.raises(ValueError, match="sha256"):
+        decode(json.dumps({"content_b64": B64, "sha256": "0" * 64}))
+
+
+@pytest.mark.parametrize("cut", [1, 2, 3, 5])
+def test_rejects_truncated_base64(cut):
+    with pytest.raises(ValueError, match="truncated"):
+        decode(json.dumps({"path": "main.py", "content_b64": B64[:-cut]}))
+
+
+def test_rejects_invalid_utf8():
+    b64 = base64.b64encode("héllo".encode()[:-2] + b"\xe9").decode()
+    with pytest.raises(ValueError, match="UTF-8"):
+        decode(json.dumps({"content_b64": b64}))
+
+
+def test_rejects_data_after_padding():
+    b64 = base64.b64encode(b"a").decode() + base64.b64encode(b"bcd").decode()
+    with pytest.raises(ValueError, match="padding"):
+        decode(json.dumps({"content_b64": b64}), size=4)
+
+
+def test_needs_closing_quote():
+    with pytest.raises(ValueError, match="cut off"):
+        decode('{"path": "main.py", "content_b64": "' + B64)
@@ -1,28 +1,284 @@
 # tools/arxiv_tools.py
+import os
+import json
+import time
+import asyncio
+import hashlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import httpx
 import feedparser
-from typing import List, Dict
 
+from config import (
+    ARXIV_RSS_BASE, ARXIV_API_URL, ARXIV_FEED_CACHE_DIR, ARXIV_FETCH_CONCURRENCY,
+    ARXIV_FETCH_TIMEOUT, ARXIV_INDEX_PATH,
+)
+from tools.arxiv_index import PaperIndex, SearchResult
+from tools.arxiv_lookup import PaperLookup, iter_query, normalize_arxiv_id
 
-def fetch_latest_papers(category: str, max_results: int = 20) -> List[Dict]:
+
+def parse_feed(body: Union[bytes, str], category: str, max_results: Optional[int] = None) -> List[Dict]:
     """
-    Fetch latest papers for a given arXiv category using RSS feed.
-    Example category: 'cs.AI', 'cs.CV', etc.
+    Paper records from an arXiv RSS/Atom feed body.
     """
-    url = f"https://export.arxiv.org/rss/{category}"
-    feed = feedparser.parse(url)
-
+    feed = feedparser.parse(body)
     papers = []
     for entry in feed.entries[:max_results]:
+        raw_id = entry.get("id") or entry.get("link", "")
         papers.append(
             {
-                "id": entry.id,
-                "title": entry.title,
-                "summary": entry.summary,
-                "link": entry.link,
-                "authors": [a.name for a in entry.authors],
-                "published": entry.published,
+                "id": raw_id,
+                "arxiv_id": normalize_arxiv_id(raw_id),
+                "title": entry.get("title", "").strip(),
+                "summary": entry.get("summary", "").strip(),
+                "link": entry.get("link", ""),
+                "authors": [a.get("name", "") for a in entry.get("authors", [])],
+                "published": entry.get("published", ""),
                 "category": category,
             }
         )
     return papers
 
+
+class FeedCache:
+    """
+    On-disk store of feed bodies, keyed by URL. Each entry keeps the body,
+    its ETag/Last-Modified validators and the papers parsed from it, so a
+    304 Not Modified reply is answered without parsing again.
+    """
+
+    def __init__(self, directory: Union[str, Path] = ARXIV_FEED_CACHE_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+        return self.directory / f"{key}.json", self.directory / f"{key}.xml"
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        meta_path, _ = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("url") == url else None
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """
+        Conditional request headers for `url`, if it has been cached.
+        """
+        meta = self.get(url)
+        headers: Dict[str, str] = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def put(self, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str],
+            papers: List[Dict]) -> None:
+        meta_path, body_path = self._paths(url)
+        _atomic_write(body_path, body)
+        meta = {"url": url, "etag": etag, "last_modified": last_modified,
+                "fetched_at": time.time(), "papers": papers}
+        _atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    def touch(self, url: str) -> None:
+        """
+        Record that `url` was revalidated (a 304) just now.
+        """
+        meta = self.get(url)
+        if meta is not None:
+            meta["fetched_at"] = time.time()
+            _atomic_write(self._paths(url)[0], json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+@dataclass
+class FeedFetch:
+    category: str
+    status: str  # "fetched", "not_modified" or "error"
+    papers: List[Dict] = field(default_factory=list)
+    error: str = ""
+
+
+@dataclass
+class MultiFeedResult:
+    papers: List[Dict]                 # merged, one record per arXiv id
+    feeds: Dict[str, FeedFetch]        # per category
+    by_category: Dict[str, List[str]]  # category -> arXiv ids, in feed order
+
+
+def merge_papers(fetches: Iterable[FeedFetch]) -> List[Dict]:
+    """
+    Merge papers from several feeds, keeping the first record of each
+    arXiv id (in feed order) and collecting every category it is listed in.
+    """
+    merged: Dict[str, Dict] = {}
+    for fetch in fetches:
+        for paper in fetch.papers:
+            record = merged.get(paper["arxiv_id"])
+            if record is None:
+                record = merged[paper["arxiv_id"]] = dict(paper, categories=[])
+            if fetch.category not in record["categories"]:
+                record["categories"].append(fetch.category)
+    return list(merged.values())
+
+
+async def _fetch_feed(client: httpx.AsyncClient, cache: Optional[FeedCache], category: str,
+                      base_url: str, max_results: Optional[int]) -> FeedFetch:
+    url = f"{base_url.rstrip('/')}/{category}"
+    headers = cache.validators(url) if cache is not None else {}
+    try:
+        resp = await client.get(url, headers=headers)
+        if resp.status_code == 304 and cache is not None:
+            meta = cache.get(url)
+            if meta is not None:
+                cache.touch(url)
+                return FeedFetch(category, "not_modified", meta["papers"][:max_results])
+            # The entry vanished between the request and now: fetch in full
+            resp = await client.get(url)
+        resp.raise_for_status()
+        # feedparser is CPU-bound; keep the event loop free for other feeds
+        papers = await asyncio.to_thread(parse_feed, resp.content, category)
+    except (httpx.HTTPError, ValueError) as e:
+        message = str(e).splitlines()[0] if str(e) else ""
+        return FeedFetch(category, "error", error=f"{type(e).__name__}: {message}")
+    if cache is not None:
+        cache.put(url, resp.content, resp.headers.get("ETag"),
+                  resp.headers.get("Last-Modified"), papers)
+    return FeedFetch(category, "fetched", papers[:max_results])
+
+
+async def afetch_categories(
+    categories: Iterable[str],
+    max_results: Optional[int] = None,
+    base_url: str = ARXIV_RSS_BASE,
+    cache: Optional[FeedCache] = None,
+    concurrency: int = ARXIV_FETCH_CONCURRENCY,
+    timeout: float = ARXIV_FETCH_TIMEOUT,
+    index: Optional[PaperIndex] = None,
+) -> MultiFeedResult:
+    """
+    Fetch the RSS feeds of `categories` concurrently (at most `concurrency`
+    at a time), revalidating cached feeds with If-None-Match /
+    If-Modified-Since, and merge the papers across categories. A feed that
+    fails is reported in `feeds` and contributes no papers. The merged
+    papers are added to `index`, if given.
+    """
+    categories = list(dict.fromkeys(categories))
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits, follow_redirects=True) as client:
+        async def bounded(category: str) -> FeedFetch:
+            async with semaphore:
+                return await _fetch_feed(client, cache, category, base_url, max_results)
+
+        fetches = await asyncio.gather(*(bounded(c) for c in categories))
+
+    feeds = {f.category: f for f in fetches}
+    papers = merge_papers(fetches)
+    if index is not None:
+        await asyncio.to_thread(index.add, papers)
+    return MultiFeedResult(
+        papers=papers,
+        feeds=feeds,
+        by_category={f.category: [p["arxiv_id"] for p in f.papers] for f in fetches},
+    )
+
+
+def fetch_categories(categories: Iterable[str], max_results: Optional[int] = None,
+                     base_url: str = ARXIV_RSS_BASE,
+                     cache: Optional[FeedCache] = None,
+                     index: Optional[PaperIndex] = None) -> MultiFeedResult:
+    """
+    Blocking wrapper around afetch_categories() with the default disk cache
+    and search index.
+    """
+    return asyncio.run(afetch_categories(categories, max_results, base_url,
+                                         cache if cache is not None else FeedCache(),
+                                         index=index if index is not None else get_index()))
+
+
+def fetch_latest_papers(category: str, max_results: int = 20) -> List[Dict]:
+    """
+    Fetch latest papers for a given arXiv category using RSS feed.
+    Example category: 'cs.AI', 'cs.CV', etc.
+    """
+    result = fetch_categories([category], max_results)
+    feed = result.feeds[category]
+    if feed.status == "error":
+        print(f"⚠ Could not fetch {category}: {feed.error}")
+    return feed.papers
+
+
+def iter_category_papers(category: str, limit: Optional[int] = None,
+                         api_url: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Newest papers of `category` from the arXiv API, one at a time. The
+    response is parsed as it streams in and paged through as needed, so
+    pulling thousands of papers keeps memory flat.
+    """
+    params = {"search_query": f"cat:{category}", "sortBy": "submittedDate",
+              "sortOrder": "descending"}
+    return iter_query(params, api_url=api_url or ARXIV_API_URL, limit=limit,
+                      timeout=ARXIV_FETCH_TIMEOUT)
+
+
+_index: Optional[PaperIndex] = None
+
+
+def get_index() -> PaperIndex:
+    """
+    Process-wide search index at ARXIV_INDEX_PATH.
+    """
+    global _index
+    if _index is None:
+        _index = PaperIndex(ARXIV_INDEX_PATH)
+    return _index
+
+
+def search_papers(query: str, category: Optional[str] = None, limit: int = 20,
+                  offset: int = 0, sort: str = "relevance") -> SearchResult:
+    """
+    Full-text search over every paper fetched so far (title, abstract,
+    authors, categories), ranked by BM25 or newest first. Offline.
+    """
+    return get_index().search(query, category, limit, offset, sort)
+
+
+_lookup: Optional[PaperLookup] = None
+
+
+def get_lookup() -> PaperLookup:
+    """
+    Process-wide PaperLookup, so concurrent callers share its batches.
+    """
+    global _lookup
+    if _lookup is None:
+        _lookup = PaperLookup(ARXIV_API_URL, timeout=ARXIV_FETCH_TIMEOUT)
+    return _lookup
+
+
+def lookup_papers(ids: Iterable[str]) -> Dict[str, Optional[Dict]]:
+    """
+    Paper details by arXiv id (None if unknown), fetched in batched id_list
+    queries with identical in-flight lookups coalesced, and added to the
+    search index.
+    """
+    found = get_lookup().get_many(ids)
+    get_index().add(p for p in found.values() if p is not None)
+    return found
+
+
+async def alookup_papers(ids: Iterable[str]) -> Dict[str, Optional[Dict]]:
+    return await asyncio.to_thread(lookup_papers, list(ids))
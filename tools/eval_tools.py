@@ -0,0 +1,171 @@
+# tools/eval_tools.py
+import os
+import re
+import ast
+import sys
+import json
+import fcntl
+import hashlib
+import threading
+import importlib.util
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Union
+
+# Bump when the checks change so cached results are recomputed
+CHECKER_VERSION = "1"
+
+# Issues with this prefix are style warnings and do not fail a file
+LINT_PREFIX = "Lint: "
+
+
+def issues_pass(issues: List[str]) -> bool:
+    return all(i.startswith(LINT_PREFIX) for i in issues)
+
+
+def project_context(project_dir: Union[str, Path]) -> Dict[str, List[str]]:
+    """
+    Names a generated file may import without being flagged: top-level
+    modules/packages of the project and distributions in requirements.txt.
+    """
+    root = Path(project_dir)
+    local: Set[str] = set()
+    for p in root.rglob("*.py"):
+        rel = p.relative_to(root)
+        local.update(rel.parts[:-1])
+        local.add(p.stem)
+
+    requirements: Set[str] = set()
+    req = root / "requirements.txt"
+    if req.is_file():
+        for line in req.read_text(encoding="utf-8", errors="ignore").splitlines():
+            name = re.split(r"[<>=!~\[;\s]", line.strip(), maxsplit=1)[0]
+            if name and not name.startswith("#"):
+                requirements.add(name.lower().replace("-", "_"))
+
+    return {"local": sorted(local), "requirements": sorted(requirements)}
+
+
+def import_roots(source: Union[str, bytes]) -> Set[str]:
+    """
+    Top-level names of the absolute imports in `source` (empty if it does
+    not parse).
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return set()
+    roots: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            roots.update(a.name.split(".")[0] for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            roots.add(node.module.split(".")[0])
+    return roots
+
+
+def check_python_source(source: str, filename: str, context: Dict[str, List[str]]) -> List[str]:
+    """
+    Compile, lint and import-check one Python file without executing it.
+    Runs in worker processes, so it only takes plain data.
+    """
+    try:
+        tree = ast.parse(source, filename)
+        compile(tree, filename, "exec")
+    except SyntaxError as e:
+        return [f"SyntaxError line {e.lineno}: {e.msg}"]
+
+    issues: List[str] = []
+    local = set(context["local"])
+    requirements = set(context["requirements"])
+
+    imported: Dict[str, int] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [(a.asname or a.name).split(".")[0] for a in node.names]
+            modules = [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            names = [a.asname or a.name for a in node.names if a.name != "*"]
+            modules = [node.module] if node.module and node.level == 0 else []
+        else:
+            continue
+        for name in names:
+            imported.setdefault(name, node.lineno)
+        for module in modules:
+            top = module.split(".")[0]
+            if (top in local or top in sys.stdlib_module_names
+                    or top.lower() in requirements
+                    or importlib.util.find_spec(top) is not None):
+                continue
+            issues.append(f"Unresolved import '{module}' (line {node.lineno})")
+
+    # Lint: imports never referenced (skipped for package __init__ re-exports)
+    if not filename.endswith("__init__.py"):
+        used = {n.id for n in ast.walk(tree) if isinstance(n, ast.Name)}
+        for name, line in imported.items():
+            if name not in used and f"'{name}'" not in source and f'"{name}"' not in source:
+                issues.append(f"{LINT_PREFIX}unused import '{name}' (line {line})")
+
+    return issues
+
+
+class EvalCache:
+    """
+    Check results keyed by file path, content hash and the part of the
+    project context the file's imports resolve against, persisted as one
+    JSON file holding the `max_entries` most recently used. Several caches
+    (e.g. concurrent builds) may share the file: save() merges with what
+    the others saved, under a file lock.
+    """
+
+    def __init__(self, path: Union[str, Path], max_entries: int = 20000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        try:
+            self.entries: Dict[str, List[str]] = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def make_key(rel_path: str, content: bytes, context: Dict[str, List[str]]) -> str:
+        # Only the modules this file imports count, so adding or removing
+        # an unrelated file keeps its cached result
+        roots = import_roots(content)
+        used = {
+            "local": sorted(roots.intersection(context["local"])),
+            "requirements": sorted({r.lower() for r in roots}.intersection(context["requirements"])),
+        }
+        h = hashlib.sha256()
+        h.update(CHECKER_VERSION.encode())
+        h.update(rel_path.encode("utf-8"))
+        h.update(hashlib.sha256(content).digest())
+        h.update(json.dumps(used, sort_keys=True).encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        with self._lock:
+            if key not in self.entries:
+                return None
+            # Re-insert to mark as most recently used
+            self.entries[key] = self.entries.pop(key)
+            return self.entries[key]
+
+    def put(self, key: str, issues: List[str]) -> None:
+        with self._lock:
+            self.entries[key] = issues
+
+    def save(self) -> None:
+        lock_path = self.path.with_name(self.path.name + ".lock")
+        with self._lock, open(lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                saved = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                saved = {}
+            # Entries used here count as more recent than the saved ones
+            merged = {k: v for k, v in saved.items() if k not in self.entries}
+            merged.update(self.entries)
+            self.entries = dict(list(merged.items())[-self.max_entries:])
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(self.entries), encoding="utf-8")
+            os.replace(tmp, self.path)
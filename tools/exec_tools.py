@@ -1,28 +1,381 @@
 # tools/exec_tools.py
+import os
+import sys
+import time
+import errno
+import signal
+import select
+import asyncio
+import argparse
+import traceback
+import resource
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Tuple, List
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
 
-from config import WORKSPACE_ROOT
+from config import (
+    PROJECT_ROOT, WORKSPACE_ROOT, SANDBOX_WORKERS, SANDBOX_CPU_SECONDS,
+    SANDBOX_MEMORY_BYTES, SANDBOX_WALL_SECONDS, SANDBOX_OUTPUT_MAX_CHARS,
+)
 
+# Entry points smoke-checked (imported, not run as __main__) when a project has no tests
+ENTRY_POINTS = ("main.py", "app.py")
+# Larger writes than this fail inside a job (RLIMIT_FSIZE)
+MAX_FILE_BYTES = 64 * 1024 * 1024
+MAX_OPEN_FILES = 256
+# Exit status of a child that failed before or outside the job itself
+SETUP_FAILED = 70
 
-def run_command(command: List[str], timeout: int = 60) -> Tuple[int, str, str]:
+
+@dataclass
+class Limits:
+    cpu_seconds: int = SANDBOX_CPU_SECONDS
+    memory_bytes: int = SANDBOX_MEMORY_BYTES
+    wall_seconds: float = SANDBOX_WALL_SECONDS
+
+
+@dataclass
+class TestJob:
+    project_dir: str  # absolute path of the generated project
+    kind: str         # "pytest" or "smoke"
+    target: str       # file relative to project_dir
+
+
+@dataclass
+class JobResult:
+    job: TestJob
+    status: str  # "passed", "failed", "timeout", "error" or "skipped"
+    returncode: Optional[int] = None
+    duration: float = 0.0
+    output: str = ""
+
+    @property
+    def passed(self) -> bool:
+        return self.status in ("passed", "skipped")
+
+    def issues(self) -> List[str]:
+        if self.passed:
+            return []
+        label = "Tests" if self.job.kind == "pytest" else "Smoke check"
+        detail = {"timeout": "timed out", "error": "could not run"}.get(
+            self.status, f"failed (exit code {self.returncode})")
+        tail = self.output.strip().splitlines()[-15:]
+        return [f"{label} {detail}: {self.job.target}" + ("\n" + "\n".join(tail) if tail else "")]
+
+
+def apply_limits(limits: Limits) -> None:
     """
-    Run a shell command under workspace directory.
+    Set rlimits on the calling process (used in the child right before it
+    runs a job). The soft CPU limit raises SIGXCPU, the hard one SIGKILL.
+    """
+    cpu = int(limits.cpu_seconds)
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    resource.setrlimit(resource.RLIMIT_AS, (limits.memory_bytes, limits.memory_bytes))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (MAX_FILE_BYTES, MAX_FILE_BYTES))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (MAX_OPEN_FILES, MAX_OPEN_FILES))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+def run_command(command: List[str], timeout: int = 60, cwd: Optional[Path] = None,
+                limits: Optional[Limits] = None) -> Tuple[int, str, str]:
+    """
+    Run a shell command under workspace directory (or `cwd`), optionally
+    with rlimits applied. On timeout the whole process group is killed.
     Returns (return_code, stdout, stderr).
     """
     proc = subprocess.Popen(
         command,
-        cwd=str(WORKSPACE_ROOT),
+        cwd=str(cwd or WORKSPACE_ROOT),
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True,
+        start_new_session=True,
+        preexec_fn=(lambda: apply_limits(limits)) if limits is not None else None,
     )
     try:
         stdout, stderr = proc.communicate(timeout=timeout)
     except subprocess.TimeoutExpired:
-        proc.kill()
+        _kill_group(proc.pid)
         stdout, stderr = proc.communicate()
         return 1, stdout, "Command timed out."
     return proc.returncode, stdout, stderr
 
+
+def find_jobs(project_dir: Path) -> List[TestJob]:
+    """
+    One pytest job per test file (test_*.py / *_test.py) in the project or,
+    if it has none, one smoke job per entry point present.
+    """
+    root = Path(project_dir).resolve()
+    tests = sorted(
+        p.relative_to(root).as_posix()
+        for pattern in ("test_*.py", "*_test.py")
+        for p in root.rglob(pattern)
+        if "__pycache__" not in p.parts
+    )
+    if tests:
+        return [TestJob(str(root), "pytest", t) for t in tests]
+    return [TestJob(str(root), "smoke", e) for e in ENTRY_POINTS if (root / e).is_file()]
+
+
+def _warm_up() -> None:
+    # Pay for heavy imports once per worker instead of once per job
+    try:
+        import pytest  # noqa: F401
+    except ImportError:
+        pass
+
+
+def run_job(job: TestJob, limits: Limits) -> JobResult:
+    """
+    Run one job in a child forked from this (warm) worker: the child gets its
+    own session, the project directory as cwd and sys.path[0], and the given
+    rlimits. Output is collected up to SANDBOX_OUTPUT_MAX_CHARS (the tail is
+    kept), and the child's process group is killed after wall_seconds.
+
+    The child is NOT confined to the project directory: it runs as the same
+    user with the same filesystem and network access as the agent, so it
+    can read or write anything the agent can. Only run projects you would
+    run yourself, or run the whole agent inside a container.
+    """
+    if job.kind == "pytest":
+        try:
+            import pytest  # noqa: F401
+        except ImportError:
+            return JobResult(job, "skipped", output="pytest is not installed")
+
+    start = time.perf_counter()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        code = SETUP_FAILED
+        try:
+            os.setsid()
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.dup2(write_fd, 1)
+            os.dup2(write_fd, 2)
+            # The worker's sys.stdout/stderr may not be fds 1 and 2
+            sys.stdout = open(1, "w", encoding="utf-8", errors="replace", closefd=False)
+            sys.stderr = open(2, "w", encoding="utf-8", errors="replace", closefd=False)
+            _enter_project(job.project_dir)
+            apply_limits(limits)
+        except BaseException as e:
+            os.write(2, f"{type(e).__name__}: {e}\n".encode("utf-8", "replace"))
+        else:
+            code = _exec_job(job)
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+
+    os.close(write_fd)
+    chunks: List[bytes] = []
+    size = 0
+    deadline = start + limits.wall_seconds
+    timed_out = False
+    try:
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                timed_out = True
+                _kill_group(pid)
+                break
+            ready, _, _ = select.select([read_fd], [], [], remaining)
+            if not ready:
+                continue
+            data = os.read(read_fd, 65536)
+            if not data:
+                break
+            chunks.append(data)
+            size += len(data)
+            while size > SANDBOX_OUTPUT_MAX_CHARS * 2 and len(chunks) > 1:
+                size -= len(chunks.pop(0))
+    finally:
+        os.close(read_fd)
+
+    # The child may close its output long before it exits, so its exit is
+    # polled against the same deadline
+    wpid, status, usage = os.wait4(pid, os.WNOHANG)
+    while not wpid:
+        if time.perf_counter() >= deadline:
+            timed_out = True
+            _kill_group(pid)
+            wpid, status, usage = os.wait4(pid, 0)
+            break
+        time.sleep(0.01)
+        wpid, status, usage = os.wait4(pid, os.WNOHANG)
+    duration = time.perf_counter() - start
+
+    output = b"".join(chunks).decode("utf-8", "replace")[-SANDBOX_OUTPUT_MAX_CHARS:]
+    code = os.waitstatus_to_exitcode(status)
+    if timed_out:
+        return JobResult(job, "timeout", code, duration, output + f"\nKilled after {limits.wall_seconds:g}s wall time")
+    # SIGXCPU at the soft CPU limit, SIGKILL at the hard one; any other
+    # SIGKILL (e.g. the OOM killer) is reported as a plain failure
+    cpu_used = usage.ru_utime + usage.ru_stime
+    if code == -signal.SIGXCPU or (code == -signal.SIGKILL and cpu_used >= limits.cpu_seconds):
+        return JobResult(job, "timeout", code, duration, output + f"\nKilled after {limits.cpu_seconds}s CPU time")
+    if code == SETUP_FAILED:
+        return JobResult(job, "error", code, duration, output)
+    # pytest exit code 5: no tests collected in the file
+    return JobResult(job, "passed" if code in (0, 5) else "failed", code, duration, output)
+
+
+def _enter_project(project_dir: str) -> None:
+    """
+    Make the child look like a fresh interpreter started in project_dir:
+    modules of this agent system (config, main, tasks, ...) would shadow the
+    generated project's own, so they are dropped from sys.modules. This only
+    sets the working directory and import path; it confines nothing.
+    """
+    os.chdir(project_dir)
+    own = str(PROJECT_ROOT.resolve())
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None) or ""
+        if path.startswith(own):
+            del sys.modules[name]
+    sys.path[:] = [project_dir] + [p for p in sys.path if p and not p.startswith(own)]
+    os.environ["PYTHONDONTWRITEBYTECODE"] = "1"
+    sys.dont_write_bytecode = True
+    sys.argv = ["sandbox"]
+
+
+def _exec_job(job: TestJob) -> int:
+    """
+    Exit status of the job; uncaught exceptions are printed and count as 1.
+    """
+    try:
+        if job.kind == "pytest":
+            import pytest
+            return int(pytest.main([job.target, "-q", "-p", "no:cacheprovider",
+                                    "--rootdir", job.project_dir]))
+        import runpy
+        runpy.run_path(job.target, run_name="__smoke__")
+        return 0
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+        return 1
+
+
+def _kill_group(pid: int) -> None:
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError as e:
+        if e.errno != errno.ESRCH:
+            raise
+
+
+class SandboxRunner:
+    """
+    Pool of warm worker processes running TestJobs in parallel under
+    per-job CPU, memory and wall-clock limits. Jobs are limited by rlimits
+    only and get the project as cwd and import path, with full access to
+    everything the agent's user can reach: this is not a security boundary
+    (see run_job). Linux only (fork, rlimits, process groups).
+    """
+
+    def __init__(self, workers: Optional[int] = SANDBOX_WORKERS, limits: Optional[Limits] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.limits = limits or Limits()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up)
+        return self._pool
+
+    async def stream(self, jobs: Iterable[TestJob]) -> AsyncIterator[JobResult]:
+        """
+        Run `jobs` in the pool and yield each result as soon as it finishes.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        futures = [loop.run_in_executor(pool, run_job, job, self.limits) for job in jobs]
+        try:
+            for fut in asyncio.as_completed(futures):
+                yield await fut
+        finally:
+            for fut in futures:
+                fut.cancel()
+
+    async def run(self, jobs: Iterable[TestJob]) -> List[JobResult]:
+        return [r async for r in self.stream(jobs)]
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self) -> "SandboxRunner":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_runner: Optional[SandboxRunner] = None
+
+
+def get_runner() -> SandboxRunner:
+    """
+    Process-wide runner, so concurrent builds share one pool of warm workers.
+    """
+    global _runner
+    if _runner is None:
+        _runner = SandboxRunner()
+    return _runner
+
+
+def close_runner() -> None:
+    """
+    Shut down the process-wide runner's workers, e.g. when a build ends.
+    A later get_runner() starts a new pool.
+    """
+    global _runner
+    if _runner is not None:
+        _runner.close()
+        _runner = None
+
+
+async def _validate(projects: List[Path], runner: SandboxRunner) -> int:
+    jobs = [job for p in projects for job in find_jobs(p)]
+    print(f"Running {len(jobs)} job(s) from {len(projects)} project(s) "
+          f"with {runner.workers} worker(s)")
+    failed = 0
+    start = time.perf_counter()
+    async for r in runner.stream(jobs):
+        name = Path(r.job.project_dir).name
+        mark = "✔" if r.passed else "⚠"
+        print(f"{mark} {name}/{r.job.target} [{r.job.kind}] {r.status} in {r.duration:.2f}s")
+        if not r.passed:
+            failed += 1
+            for issue in r.issues():
+                print("   " + issue.replace("\n", "\n   "))
+    print(f"{len(jobs) - failed}/{len(jobs)} job(s) passed in {time.perf_counter() - start:.1f}s")
+    return failed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run tests or smoke checks of generated projects")
+    parser.add_argument("projects", nargs="+", type=Path, help="generated project directories")
+    parser.add_argument("--workers", type=int, default=SANDBOX_WORKERS)
+    parser.add_argument("--cpu", type=int, default=SANDBOX_CPU_SECONDS, help="CPU seconds per job")
+    parser.add_argument("--memory-mb", type=int, default=SANDBOX_MEMORY_BYTES // 2**20,
+                        help="address space per job")
+    parser.add_argument("--wall", type=float, default=SANDBOX_WALL_SECONDS, help="wall seconds per job")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    limits = Limits(args.cpu, args.memory_mb * 2**20, args.wall)
+    with SandboxRunner(args.workers, limits) as runner:
+        sys.exit(1 if asyncio.run(_validate(args.projects, runner)) else 0)
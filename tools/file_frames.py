@@ -0,0 +1,45 @@
+# tools/file_frames.py
+import re
+import base64
+import hashlib
+import binascii
+from typing import Dict, Optional
+
+FRAME_RE = re.compile(
+    r"^=== FILE: (?P<path>.+?) ===[ \t]*\n"
+    r"(?P<body>.*?)"
+    r"^=== END FILE: (?P=path)(?: sha256=(?P<sha>[0-9a-fA-F]{64}))? ===[ \t]*$",
+    re.MULTILINE | re.DOTALL,
+)
+
+
+def parse_file_frames(text: str) -> Dict[str, str]:
+    """
+    Split a multi-file reply into {path: decoded text}.
+
+    Every file is framed as
+        === FILE: <path> ===
+        <base64 lines>
+        === END FILE: <path> sha256=<hex> ===
+    A frame is dropped if it is not closed, its Base64 or UTF-8 is invalid,
+    or its optional sha256 does not match the decoded bytes. Callers fall
+    back to single-file generation for anything missing from the result.
+    """
+    files: Dict[str, str] = {}
+    for m in FRAME_RE.finditer(text):
+        content = decode_frame(m.group("body"), m.group("sha"))
+        if content is not None:
+            files[m.group("path").strip()] = content
+    return files
+
+
+def decode_frame(body: str, sha256: Optional[str] = None) -> Optional[str]:
+    b64 = "".join(body.split())
+    try:
+        data = base64.b64decode(b64, validate=True)
+        content = data.decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    if sha256 and hashlib.sha256(data).hexdigest() != sha256.lower():
+        return None
+    return content
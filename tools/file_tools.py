@@ -1,33 +1,151 @@
 # tools/file_tools.py
+import os
+import stat
+import hashlib
+import threading
 from pathlib import Path
-from typing import Union
+from typing import Dict, List, Optional, Set, Union
 
 from config import WORKSPACE_ROOT
 
+# Directories already created during this build; see reset_dir_cache()
+_created_dirs: Set[Path] = set()
+_dirs_lock = threading.Lock()
 
-def ensure_workspace_subpath(relative_path: Union[str, Path]) -> Path:
+
+def reset_dir_cache() -> None:
+    """
+    Forget which directories exist. Called at the start of every build,
+    since anything may have been removed between builds.
+    """
+    with _dirs_lock:
+        _created_dirs.clear()
+
+
+def _ensure_dir(directory: Path) -> None:
+    if directory in _created_dirs:
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    with _dirs_lock:
+        _created_dirs.add(directory)
+
+
+def ensure_workspace_subpath(relative_path: Union[str, Path], create_parent: bool = True) -> Path:
     """
-    Resolve a path under WORKSPACE_ROOT to prevent path traversal.
+    Resolve a path under WORKSPACE_ROOT to prevent path traversal, creating
+    its parent directory unless create_parent=False.
     """
-    base = WORKSPACE_ROOT
-    target = base / Path(relative_path)
-    target = target.resolve()
-    if not str(target).startswith(str(base.resolve())):
+    base = WORKSPACE_ROOT.resolve()
+    target = (base / Path(relative_path)).resolve()
+    if target != base and not target.is_relative_to(base):
         raise ValueError("Unsafe path detected.")
-    target.parent.mkdir(parents=True, exist_ok=True)
+    if create_parent:
+        _ensure_dir(target.parent)
     return target
 
 
-def create_file(relative_path: Union[str, Path], content: str = "") -> None:
+def _as_bytes(content: Union[str, bytes]) -> bytes:
+    return content.encode("utf-8") if isinstance(content, str) else content
+
+
+def _same_content(target: Path, data: bytes) -> bool:
+    try:
+        if target.stat().st_size != len(data):
+            return False
+        return target.read_bytes() == data
+    except OSError:
+        return False
+
+
+def _target_mode(target: Path) -> Optional[int]:
+    try:
+        return stat.S_IMODE(target.stat().st_mode)
+    except FileNotFoundError:
+        return None
+
+
+def _fsync_dir(directory: Path) -> None:
+    # Makes a rename into `directory` durable
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_temp(target: Path, data: bytes) -> Path:
+    """
+    Write `data` to a new temporary file next to `target` (same filesystem,
+    so it can be renamed over it) and flush it to disk. It takes the mode of
+    an existing `target`; new files get the usual umask-based mode.
+    """
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    except FileNotFoundError:
+        # The directory was removed since it was memoized
+        with _dirs_lock:
+            _created_dirs.discard(target.parent)
+        _ensure_dir(target.parent)
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            mode = _target_mode(target)
+            if mode is not None:
+                os.fchmod(fd, mode)
+            f.write(data)
+            f.flush()
+            os.fsync(fd)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return tmp
+
+
+def replace_if_changed(tmp: Path, target: Path) -> bool:
+    """
+    Move the finished file `tmp` over `target` unless `target` already has
+    the same bytes, in which case `tmp` is discarded and `target` (and its
+    mtime) is left alone. Otherwise `tmp` is flushed to disk and given the
+    mode of `target` first. Returns True if `target` was replaced.
+    """
+    if target.is_file() and tmp.stat().st_size == target.stat().st_size \
+            and _file_digest(tmp) == _file_digest(target):
+        tmp.unlink()
+        return False
+    mode = _target_mode(target)
+    if mode is not None:
+        os.chmod(tmp, mode)
+    fd = os.open(tmp, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp, target)
+    _fsync_dir(target.parent)
+    return True
+
+
+def write_file(relative_path: Union[str, Path], content: Union[str, bytes]) -> bool:
     """
-    Create a new file under workspace with optional initial content.
+    Write a workspace file atomically (temp file + fsync + rename), so a
+    crash never leaves it half-written. Skipped if the file already has
+    this content. Returns True if the file was written.
     """
     target = ensure_workspace_subpath(relative_path)
-    if not target.exists():
-        target.write_text(content, encoding="utf-8")
-    else:
-        # Overwrite behavior can be adjusted if needed.
-        target.write_text(content, encoding="utf-8")
+    data = _as_bytes(content)
+    if _same_content(target, data):
+        return False
+    os.replace(_write_temp(target, data), target)
+    _fsync_dir(target.parent)
+    return True
+
+
+def create_file(relative_path: Union[str, Path], content: str = "") -> bool:
+    """
+    Create or overwrite a file under workspace (see write_file).
+    """
+    return write_file(relative_path, content)
 
 
 def append_to_file(relative_path: Union[str, Path], content: str) -> None:
@@ -43,8 +161,86 @@ def read_file(relative_path: Union[str, Path]) -> str:
     """
     Read a file content under workspace.
     """
-    target = ensure_workspace_subpath(relative_path)
+    target = ensure_workspace_subpath(relative_path, create_parent=False)
     if not target.exists():
         raise FileNotFoundError(f"File not found: {relative_path}")
     return target.read_text(encoding="utf-8")
 
+
+def _file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_sha256(relative_path: Union[str, Path]) -> Optional[str]:
+    """
+    SHA-256 of a workspace file's bytes, or None if it does not exist.
+    """
+    target = ensure_workspace_subpath(relative_path, create_parent=False)
+    if not target.is_file():
+        return None
+    return _file_digest(target)
+
+
+class FileTransaction:
+    """
+    Stages several workspace files and commits them together:
+
+        with FileTransaction() as tx:
+            tx.stage("proj/a.py", source_a)
+            tx.stage("proj/b.py", source_b)
+
+    Each staged file is written to a temporary file right away; commit()
+    then renames them all into place, so no target changes until every
+    file has been written successfully. Files whose content is unchanged
+    are skipped. Leaving the block with an exception (or calling abort())
+    discards everything staged. Each rename is atomic; the set of renames
+    is not, but it only runs once all content is safely on disk.
+    """
+
+    def __init__(self):
+        self._staged: Dict[Path, Path] = {}
+        self.written: List[Path] = []
+        self.unchanged: List[Path] = []
+
+    def stage(self, relative_path: Union[str, Path], content: Union[str, bytes]) -> None:
+        target = ensure_workspace_subpath(relative_path)
+        data = _as_bytes(content)
+        previous = self._staged.pop(target, None)
+        if previous is not None:
+            previous.unlink(missing_ok=True)
+        if _same_content(target, data):
+            self.unchanged.append(target)
+            return
+        self._staged[target] = _write_temp(target, data)
+
+    def commit(self) -> List[Path]:
+        """
+        Move every staged file into place; returns the paths written.
+        """
+        directories = set()
+        for target, tmp in list(self._staged.items()):
+            os.replace(tmp, target)
+            del self._staged[target]
+            self.written.append(target)
+            directories.add(target.parent)
+        for directory in directories:
+            _fsync_dir(directory)
+        return self.written
+
+    def abort(self) -> None:
+        for tmp in self._staged.values():
+            tmp.unlink(missing_ok=True)
+        self._staged.clear()
+
+    def __enter__(self) -> "FileTransaction":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
@@ -0,0 +1,164 @@
+# tools/json_repair.py
+import re
+import json
+from itertools import islice
+from typing import Any, List, Optional
+
+# A fence line opening or closing the whole reply, e.g. ```json
+LEADING_FENCE_RE = re.compile(r"\A\s*```[\w-]*[ \t]*(?:\n|\Z)")
+TRAILING_FENCE_RE = re.compile(r"(?:\A|\n)[ \t]*```\s*\Z")
+# Brackets tried as the start of the JSON value before giving up
+MAX_JSON_STARTS = 16
+BRACKET_RE = re.compile(r"[{\[]")
+
+
+def strip_code_fences(text: str) -> str:
+    # Only the reply's own fence lines: ``` inside the value is content
+    return TRAILING_FENCE_RE.sub("", LEADING_FENCE_RE.sub("", text, count=1), count=1)
+
+
+def extract_json_text(text: str) -> str:
+    """
+    Return the first JSON object or array in `text`, ignoring code fences
+    and prose around it. Brackets in the prose are skipped: the value starts
+    at the first bracket from which it parses, as is or once repaired. If the
+    value never closes (a truncated reply), everything from its opening
+    bracket on is returned.
+    """
+    t = strip_code_fences(text)
+    starts = [m.start() for m in islice(BRACKET_RE.finditer(t), MAX_JSON_STARTS)]
+    if not starts:
+        return ""
+    for start in starts:
+        candidate = _scan_value(t, start)
+        if _parses(candidate) or _parses(_repair_value(candidate)):
+            return candidate
+    return _scan_value(t, starts[0])
+
+
+def _scan_value(t: str, start: int) -> str:
+    # The bracketed value opening at `start`, or the rest of `t` if it never closes
+    depth = 0
+    in_string = escape = False
+    for i in range(start, len(t)):
+        ch = t[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return t[start:i + 1]
+    return t[start:]
+
+
+def _parses(candidate: str) -> bool:
+    try:
+        json.loads(candidate, strict=False)
+    except ValueError:
+        return False
+    return True
+
+
+def repair_json(text: str) -> str:
+    """
+    Best-effort local fix of LLM JSON output:
+    - drop code fences and prose around the value
+    - escape raw newlines, carriage returns and tabs inside strings
+    - remove trailing commas before } and ]
+    - close a truncated string, drop a dangling key or comma, and close
+      every bracket still open
+    """
+    return _repair_value(extract_json_text(text))
+
+
+def _repair_value(candidate: str) -> str:
+    out: List[str] = []
+    closers: List[str] = []
+    in_string = escape = False
+
+    for ch in candidate:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            elif ch in "\n\r\t":
+                ch = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}[ch]
+            out.append(ch)
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            closers.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            if closers:
+                closers.pop()
+        out.append(ch)
+
+    if not closers and not in_string:
+        return "".join(out)
+
+    # Truncated: finish the open string, then trim an incomplete member
+    if escape:
+        out.pop()
+    if in_string:
+        out.append('"')
+    fixed = "".join(out).rstrip()
+    fixed = re.sub(r'(?:,\s*"(?:[^"\\]|\\.)*"\s*:|[,:])\s*$', "", fixed)
+    if closers and closers[-1] == "}":
+        # A lone key with no colon yet: `{"a": 1, "b"`
+        m = re.search(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*$', fixed)
+        if m:
+            fixed = fixed[:m.start(1)] + ("{" if m.group(1) == "{" else "")
+    return fixed + "".join(reversed(closers))
+
+
+def _drop_trailing_comma(out: List[str]) -> None:
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    if i >= 0 and out[i] == ",":
+        del out[i]
+
+
+def loads_lenient(text: str) -> Any:
+    """
+    Parse the JSON value in an LLM reply, repairing it locally if needed.
+    Raises ValueError when the text cannot be recovered.
+    """
+    candidate = extract_json_text(text)
+    if not candidate:
+        raise ValueError("No JSON object found in reply")
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        pass
+    return json.loads(_repair_value(candidate), strict=False)
+
+
+def find_string_field(text: str, key: str) -> Optional[str]:
+    """
+    Pull the string value of `key` straight out of `text` by regex, so it can
+    be recovered even when the JSON around it is broken. Only a value whose
+    closing quote is present is returned; raw control characters inside it
+    are tolerated.
+    """
+    m = re.search(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)"' % re.escape(key), text, re.DOTALL)
+    if m is None:
+        return None
+    try:
+        return json.loads(f'"{m.group(1)}"', strict=False)
+    except ValueError:
+        return None
@@ -0,0 +1,146 @@
+# tools/json_stream.py
+import json
+from typing import Any, Iterator, List, Optional, Tuple
+
+from tools.json_repair import loads_lenient
+
+
+class JSONStreamScanner:
+    """
+    Incrementally scan a JSON object as its text streams in.
+
+    feed() returns events as soon as the corresponding value is complete:
+      ("member", key, value)  a top-level member that is not an array
+      ("item", key, value)    one element of a top-level array member
+    Text before the first "{" (prose, code fences) is ignored. Values are
+    parsed leniently (see json_repair.loads_lenient); one that cannot be
+    recovered raises ValueError. `complete` tells whether the object closed.
+    """
+
+    def __init__(self):
+        self._pos = 0              # absolute offset of the next char
+        self._started = False
+        self.complete = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._expect_value = False
+        self._in_array = False
+        self._value_start: Optional[int] = None
+        self._base = 0             # absolute offset of self._text[0]
+        self._text = ""
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, Any]]:
+        events: List[Tuple[str, str, Any]] = []
+        self._text += chunk
+        start = self._pos - self._base
+        for i in range(start, len(self._text)):
+            ch = self._text[i]
+            events.extend(self._step(ch, self._base + i))
+        self._pos = self._base + len(self._text)
+        self._compact()
+        return events
+
+    # ---------------------- internals ----------------------
+
+    def _step(self, ch: str, pos: int) -> Iterator[Tuple[str, str, Any]]:
+        if not self._started:
+            if ch == "{":
+                self._started = True
+                self._depth = 1
+            return
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._depth == 1 and not self._expect_value:
+                    raw = self._slice(self._string_start, pos + 1)
+                    self._last_string = json.loads(raw, strict=False)
+            return
+
+        if ch == '"':
+            self._in_string = True
+            self._string_start = pos
+            if self._value_start is None and self._is_value_level():
+                self._value_start = pos
+            return
+
+        if ch == ":" and self._depth == 1:
+            self._key = self._last_string
+            self._expect_value = True
+            return
+
+        if ch in "{[":
+            if self._depth == 1 and self._expect_value and ch == "[":
+                self._in_array = True
+            elif self._value_start is None and self._is_value_level():
+                self._value_start = pos
+            self._depth += 1
+            return
+
+        if ch in "}]":
+            if self._value_start is not None and self._is_value_level():
+                # Scalar value ends at its parent's closing bracket
+                yield self._emit(pos)
+            self._depth -= 1
+            if self._depth == 1 and self._in_array and ch == "]":
+                self._in_array = False
+                self._expect_value = False
+                self._value_start = None
+                return
+            if self._value_start is not None and self._is_value_level():
+                yield self._emit(pos + 1)
+            if self._depth == 0:
+                self._started = False
+                self.complete = True
+            return
+
+        if ch == "," and self._is_value_level():
+            if self._value_start is not None:
+                # Scalar value (number, true/false/null) ends at the comma
+                yield self._emit(pos)
+            if self._depth == 1:
+                self._expect_value = False
+            return
+
+        if not ch.isspace() and self._value_start is None and self._is_value_level():
+            self._value_start = pos
+
+    def _is_value_level(self) -> bool:
+        if self._in_array:
+            return self._depth == 2
+        return self._depth == 1 and self._expect_value
+
+    def _emit(self, end: int) -> Tuple[str, str, Any]:
+        raw = self._slice(self._value_start, end).strip()
+        self._value_start = None
+        kind = "item" if self._in_array else "member"
+        if not self._in_array:
+            self._expect_value = False
+        try:
+            value = json.loads(raw, strict=False)
+        except ValueError:
+            value = loads_lenient(raw)
+        return kind, self._key, value
+
+    def _slice(self, start: int, end: int) -> str:
+        return self._text[start - self._base:end - self._base]
+
+    def _compact(self) -> None:
+        # Drop text that no pending value or key can refer to any more
+        keep = self._pos
+        if self._value_start is not None:
+            keep = min(keep, self._value_start)
+        if self._in_string:
+            keep = min(keep, self._string_start)
+        drop = keep - self._base
+        if drop > 0:
+            self._text = self._text[drop:]
+            self._base = keep
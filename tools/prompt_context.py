@@ -0,0 +1,128 @@
+# tools/prompt_context.py
+import ast
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from tools.file_tools import ensure_workspace_subpath
+
+# Small non-Python files whose full text is useful context
+VERBATIM_FILES = ("requirements.txt",)
+MAX_FILE_CHARS = 4000
+
+
+def python_interface(source: str) -> Optional[str]:
+    """
+    Public surface of a Python module: decorators and signatures of
+    top-level functions and classes (with their methods), module constants
+    and the first docstring line of each. Bodies are left out.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+
+    lines: List[str] = []
+    doc = ast.get_docstring(tree)
+    if doc:
+        lines.append(f'"""{doc.strip().splitlines()[0]}"""')
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            lines.extend(_signature(node, ""))
+        elif isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(b) for b in node.bases)
+            lines.extend(f"@{ast.unparse(d)}" for d in node.decorator_list)
+            lines.append(f"class {node.name}({bases}):" if bases else f"class {node.name}:")
+            doc = ast.get_docstring(node)
+            if doc:
+                lines.append(f'    """{doc.strip().splitlines()[0]}"""')
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and (
+                        not item.name.startswith("_") or item.name == "__init__"):
+                    lines.extend(_signature(item, "    "))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names = [t.id for t in targets if isinstance(t, ast.Name) and not t.id.startswith("_")]
+            if names and node.value is not None:
+                value = ast.unparse(node.value)
+                if len(value) > 80:
+                    value = value[:77] + "..."
+                lines.append(f"{' = '.join(names)} = {value}")
+    return "\n".join(lines)
+
+
+def _signature(node, indent: str) -> List[str]:
+    lines = [f"{indent}@{ast.unparse(d)}" for d in node.decorator_list]
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    lines.append(f"{indent}{prefix} {node.name}({ast.unparse(node.args)}){returns}: ...")
+    doc = ast.get_docstring(node)
+    if doc:
+        lines.append(f'{indent}    """{doc.strip().splitlines()[0]}"""')
+    return lines
+
+
+def file_interface(path: Path) -> Optional[str]:
+    """
+    Context to show for a generated file, or None if it has none worth
+    sending (missing, non-Python or unparsable).
+    """
+    if not path.is_file():
+        return None
+    if path.suffix == ".py":
+        text = python_interface(path.read_text(encoding="utf-8", errors="replace"))
+    elif path.name in VERBATIM_FILES:
+        text = path.read_text(encoding="utf-8", errors="replace").strip()
+    else:
+        return None
+    if text and len(text) > MAX_FILE_CHARS:
+        text = text[:MAX_FILE_CHARS] + "\n# ... (truncated)"
+    return text or None
+
+
+class CoderPrompt:
+    """
+    Assembles coder requests as
+        <project prefix>  identical for every file of the build
+        <dependency interfaces>  shared by files with the same dependencies
+        <file request>
+    so providers that cache prompt prefixes can reuse everything up to the
+    last part. Serialization is canonical (sorted keys, fixed separators),
+    so the prefix stays byte-identical across calls.
+    """
+
+    def __init__(self, project_root: str, architecture: Optional[Dict[str, Any]] = None,
+                 max_context_chars: int = 20000):
+        self.project_root = project_root
+        self.max_context_chars = max_context_chars
+        arch = dict(architecture or {"project_root": project_root})
+        self.prefix = "## Project architecture\n" + _canonical(arch) + "\n\n"
+
+    def dependency_context(self, files: Iterable[str]) -> str:
+        """
+        Interfaces of already generated `files`, in path order, within
+        max_context_chars.
+        """
+        root = ensure_workspace_subpath(self.project_root)
+        sections: List[str] = []
+        used = 0
+        for f in sorted(set(files)):
+            text = file_interface(root / f)
+            if text is None:
+                continue
+            section = f"### {f}\n{text}\n"
+            if used + len(section) > self.max_context_chars:
+                sections.append("### (further interfaces omitted)\n")
+                break
+            sections.append(section)
+            used += len(section)
+        if not sections:
+            return ""
+        return "## Interfaces of files this task depends on\n" + "\n".join(sections) + "\n"
+
+    def build(self, request: Dict[str, Any], dependency_files: Iterable[str] = ()) -> str:
+        return self.prefix + self.dependency_context(dependency_files) + "## Request\n" + _canonical(request)
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
@@ -0,0 +1,141 @@
+# tools/stream_decode.py
+import re
+import json
+import codecs
+import base64
+import hashlib
+import binascii
+from typing import BinaryIO, Optional
+
+
+B64_KEY_RE = re.compile(r'"content_b64"\s*:\s*"')
+PATH_RE = re.compile(r'"path"\s*:\s*"((?:[^"\\]|\\.)*)"')
+SHA256_RE = re.compile(r'"sha256"\s*:\s*"([0-9a-fA-F]{64})"')
+
+# JSON escapes that may appear inside a Base64 string value
+_ESCAPES = {"/": "/", "n": "", "r": "", "t": ""}
+
+# Give up if this much text arrives without a content_b64 field
+MAX_HEAD_CHARS = 64 * 1024
+
+
+class StreamingB64Decoder:
+    """
+    Decode the "content_b64" field of a CoderAgent JSON reply while it streams in.
+
+    Text chunks are fed as they arrive. Base64 is decoded in 4-char aligned
+    blocks and written straight to `out`, so the file content is never held
+    in memory as a whole. The "path" and optional "sha256" fields are picked
+    up from the text around the Base64 value. Raises ValueError when more
+    than `max_bytes` would be written, or the Base64 or UTF-8 is malformed;
+    close() also raises if the Base64 was cut short or the written bytes do
+    not match the sha256. As with the buffered decoder, the caller must
+    discard `out` whenever a ValueError is raised.
+    """
+
+    def __init__(self, out: BinaryIO, max_bytes: Optional[int] = None):
+        self.out = out
+        self.max_bytes = max_bytes
+        self.path: Optional[str] = None
+        self.sha256: Optional[str] = None
+        self.bytes_written = 0
+        self.started = False
+        self.finished = False
+        self._head = ""
+        self._tail = ""
+        self._pending = ""
+        self._escape = False
+        self._padded = False
+        self._digest = hashlib.sha256()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")("strict")
+
+    def feed(self, chunk: str) -> None:
+        if self.finished:
+            self._tail += chunk
+            self._find_fields(self._tail)
+            return
+
+        if not self.started:
+            self._head += chunk
+            m = B64_KEY_RE.search(self._head)
+            if not m:
+                if len(self._head) > MAX_HEAD_CHARS:
+                    raise ValueError("No content_b64 field in the first "
+                                     f"{MAX_HEAD_CHARS} characters of the reply")
+                self._find_fields(self._head)
+                return
+            self._find_fields(self._head[:m.start()])
+            self.started = True
+            chunk = self._head[m.end():]
+            self._head = ""
+
+        self._feed_b64(chunk)
+
+    def close(self) -> None:
+        """
+        Check that the file is complete. Call once the stream has ended.
+        """
+        if not self.started:
+            raise ValueError("No content_b64 field found in reply")
+        if not self.finished:
+            raise ValueError("content_b64 value was cut off before its closing quote")
+        if self._pending:
+            # Not padded here: characters are missing, so the file is cut off
+            raise ValueError("Base64 content is truncated")
+        try:
+            self._utf8.decode(b"", final=True)
+        except UnicodeDecodeError as e:
+            raise ValueError(f"Content is not valid UTF-8: {e}")
+        if self.sha256 and self._digest.hexdigest() != self.sha256.lower():
+            raise ValueError("Content does not match its sha256")
+
+    # ---------------------- internals ----------------------
+
+    def _feed_b64(self, chunk: str) -> None:
+        clean = []
+        for i, ch in enumerate(chunk):
+            if self._escape:
+                self._escape = False
+                clean.append(_ESCAPES.get(ch, ""))
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self.finished = True
+                self._tail = chunk[i + 1:]
+                self._find_fields(self._tail)
+                break
+            elif not ch.isspace():
+                clean.append(ch)
+
+        self._pending += "".join(clean)
+        aligned = len(self._pending) - len(self._pending) % 4
+        if aligned:
+            block, self._pending = self._pending[:aligned], self._pending[aligned:]
+            self._write(block)
+
+    def _write(self, block: str) -> None:
+        if self._padded:
+            raise ValueError("Invalid Base64 in stream: data after padding")
+        try:
+            data = base64.b64decode(block, validate=True)
+            self._utf8.decode(data)
+        except binascii.Error as e:
+            raise ValueError(f"Invalid Base64 in stream: {e}")
+        except UnicodeDecodeError as e:
+            raise ValueError(f"Content is not valid UTF-8: {e}")
+        self._padded = block.endswith("=")
+        self.bytes_written += len(data)
+        if self.max_bytes is not None and self.bytes_written > self.max_bytes:
+            raise ValueError(f"Generated file exceeds {self.max_bytes} bytes, aborting")
+        self._digest.update(data)
+        self.out.write(data)
+
+    def _find_fields(self, text: str) -> None:
+        if self.path is None:
+            m = PATH_RE.search(text)
+            if m:
+                self.path = json.loads(f'"{m.group(1)}"')
+        if self.sha256 is None:
+            m = SHA256_RE.search(text)
+            if m:
+                self.sha256 = m.group(1)
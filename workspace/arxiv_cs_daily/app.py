@@ -1,81 +1,260 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
 import requests
-from flask import Flask, render_template, request
+from flask import Flask, abort, render_template, request
+from markupsafe import Markup, escape
 from datetime import datetime
 
+from arxiv_index import PaperIndex
+from arxiv_lookup import PaperLookup, iter_query
+
 app = Flask(__name__)
 
-ARXIV_API = "http://export.arxiv.org/api/query"
+ARXIV_API = os.environ.get("ARXIV_API", "http://export.arxiv.org/api/query")
+CATEGORIES = ["cs.AI", "cs.CV", "cs.LG", "cs.CL", "cs.TH", "cs.SY"]
 
+# 上游请求超时（连接, 读取），单位秒
+REQUEST_TIMEOUT = (5, 20)
+# 每个领域列表显示的论文数；超过 PAGE_SIZE 时自动用 start= 翻页获取
+PAPERS_PER_CATEGORY = int(os.environ.get("PAPERS_PER_CATEGORY", "30"))
+PAGE_SIZE = 500
+# 每个领域列表的缓存有效期（秒）；过期后仍可返回旧数据，同时在后台刷新
+CATEGORY_TTL = {"cs.AI": 600, "cs.LG": 600, "cs.CV": 900, "cs.CL": 900}
+DEFAULT_TTL = 1800
+# 超过 TTL 这么久的数据不再返回，改为同步重新获取
+MAX_STALE = 24 * 3600
+# 论文详情缓存的最大条目数（LRU）
+PAPER_CACHE_SIZE = 512
+# 后台刷新线程的检查间隔（秒）
+REFRESH_INTERVAL = 60
+# 本地全文索引（SQLite FTS5），收录所有获取过的论文，搜索时不访问网络
+PAPER_INDEX = os.environ.get("PAPER_INDEX", os.path.join(os.path.dirname(os.path.abspath(__file__)), "papers.db"))
+SEARCH_PAGE_SIZE = 20
 
-# 获取某个领域的当天论文
-def fetch_daily_papers(category="cs.AI"):
+
+session = requests.Session()
+
+
+# 逐篇获取某个领域的最新论文：边下载边解析（iterparse），需要时自动翻页，
+# 内存占用与总数无关，第一篇论文在第一页下载完之前就能拿到
+def iter_daily_papers(category="cs.AI", limit=PAPERS_PER_CATEGORY):
     params = {
         "search_query": f"cat:{category}",
         "sortBy": "submittedDate",
         "sortOrder": "descending",
-        "max_results": 30
     }
-    response = requests.get(ARXIV_API, params=params)
-    text = response.text
-
-    # ArXiv 返回 Atom XML，这里简单解析（真实项目可用 feedparser）
-    import xml.etree.ElementTree as ET
-    root = ET.fromstring(text)
-
-    ns = {"atom": "http://www.w3.org/2005/Atom"}
-
-    papers = []
-    for entry in root.findall("atom:entry", ns):
-        paper = {
-            "id": entry.find("atom:id", ns).text,
-            "title": entry.find("atom:title", ns).text.strip(),
-            "summary": entry.find("atom:summary", ns).text.strip(),
-            "published": entry.find("atom:published", ns).text,
-            "updated": entry.find("atom:updated", ns).text,
-            "authors": [a.find("atom:name", ns).text for a in entry.findall("atom:author", ns)],
-            "pdf_url": entry.find("atom:link[@type='application/pdf']", ns).attrib["href"],
-            "category": category
-        }
-        papers.append(paper)
+    for paper in iter_query(params, api_url=ARXIV_API, limit=limit, page_size=PAGE_SIZE,
+                            session=session, timeout=REQUEST_TIMEOUT):
+        paper["category"] = category
+        yield paper
 
-    return papers
+
+# 获取某个领域的当天论文
+def fetch_daily_papers(category="cs.AI", limit=PAPERS_PER_CATEGORY):
+    return list(iter_daily_papers(category, limit))
+
+
+# 获取单篇论文详情：同一 id 的并发请求合并为一次，短时间内的不同 id 合并为一次 id_list 查询
+paper_lookup = PaperLookup(ARXIV_API, timeout=REQUEST_TIMEOUT)
+paper_index = PaperIndex(PAPER_INDEX)
 
 
-# 获取单篇论文详情
 def fetch_paper(arxiv_id):
-    url = f"{ARXIV_API}?id_list={arxiv_id}"
-    response = requests.get(url)
-    xml = response.text
-
-    import xml.etree.ElementTree as ET
-    root = ET.fromstring(xml)
-    ns = {"atom": "http://www.w3.org/2005/Atom"}
-
-    entry = root.find("atom:entry", ns)
-
-    info = {
-        "id": entry.find("atom:id", ns).text.split("/")[-1],
-        "title": entry.find("atom:title", ns).text.strip(),
-        "summary": entry.find("atom:summary", ns).text.strip(),
-        "published": entry.find("atom:published", ns).text,
-        "authors": [a.find("atom:name", ns).text for a in entry.findall("atom:author", ns)],
-        "pdf_url": entry.find("atom:link[@type='application/pdf']", ns).attrib["href"]
-    }
+    """返回论文详情，arXiv 上不存在时返回 None。"""
+    paper = paper_lookup.get(arxiv_id)
+    if paper is not None:
+        paper_index.add([paper])
+    return paper
+
+
+# 获取领域论文列表并增量写入搜索索引（未变化的论文不会重复索引）
+def load_category(category):
+    papers = fetch_daily_papers(category)
+    paper_index.add(papers)
+    return papers
+
+
+# ---------------------- 缓存 ----------------------
+
+class CategoryCache:
+    """
+    领域论文列表缓存，按领域设置 TTL，采用 stale-while-revalidate：
+    - 未过期：直接返回内存中的数据
+    - 已过期但未超过 MAX_STALE：返回旧数据，并在后台线程刷新
+    - 没有数据或过旧：同步获取（同一领域同时只有一个请求访问上游）
+    上游失败时，只要有旧数据就继续返回旧数据。
+    """
+
+    def __init__(self, loader, ttl=None, default_ttl=DEFAULT_TTL, max_stale=MAX_STALE):
+        self.loader = loader
+        self.ttl = ttl or {}
+        self.default_ttl = default_ttl
+        self.max_stale = max_stale
+        self.entries = {}  # category -> (papers, fetched_at)
+        self.lock = threading.Lock()
+        self.loading = {}  # category -> threading.Lock
+        self.refreshing = set()
+
+    def ttl_for(self, category):
+        return self.ttl.get(category, self.default_ttl)
+
+    def age(self, category):
+        entry = self.entries.get(category)
+        return None if entry is None else time.time() - entry[1]
 
+    def get(self, category):
+        age = self.age(category)
+        ttl = self.ttl_for(category)
+        if age is not None and age < ttl:
+            return self.entries[category][0]
+        if age is not None and age < ttl + self.max_stale:
+            self.refresh_async(category)
+            return self.entries[category][0]
+        return self.refresh(category)
+
+    def refresh(self, category):
+        """同步刷新一个领域；并发调用会等待同一次上游请求。"""
+        with self.lock:
+            key_lock = self.loading.setdefault(category, threading.Lock())
+            started = time.time()
+        with key_lock:
+            entry = self.entries.get(category)
+            if entry is not None and entry[1] >= started:
+                # 等待期间已被其他线程刷新
+                return entry[0]
+            try:
+                papers = self.loader(category)
+            except Exception as e:
+                if entry is not None:
+                    print(f"⚠ Refresh of {category} failed ({e}); serving cached papers")
+                    return entry[0]
+                raise
+            self.entries[category] = (papers, time.time())
+            return papers
+
+    def refresh_async(self, category):
+        with self.lock:
+            if category in self.refreshing:
+                return
+            self.refreshing.add(category)
+
+        def run():
+            try:
+                self.refresh(category)
+            except Exception as e:
+                print(f"⚠ Background refresh of {category} failed: {e}")
+            finally:
+                with self.lock:
+                    self.refreshing.discard(category)
+
+        threading.Thread(target=run, daemon=True).start()
+
+
+class LRUCache:
+    """线程安全、容量有限的 LRU 缓存。"""
+
+    def __init__(self, max_size=PAPER_CACHE_SIZE):
+        self.max_size = max_size
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.data:
+                return None
+            self.data.move_to_end(key)
+            return self.data[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+
+category_cache = CategoryCache(load_category, CATEGORY_TTL)
+paper_cache = LRUCache(PAPER_CACHE_SIZE)
+
+
+def get_paper(arxiv_id):
+    info = paper_cache.get(arxiv_id)
+    if info is None:
+        # 已索引过的论文直接从本地读取
+        info = paper_index.get(arxiv_id)
+        if info is None:
+            try:
+                info = fetch_paper(arxiv_id)
+            except Exception as e:
+                # 上游出错（超时、5xx、响应无法解析）时返回 502，而不是 500
+                print(f"⚠ Lookup of {arxiv_id} failed: {e}")
+                abort(502)
+        if info is None:
+            abort(404)
+        paper_cache.put(arxiv_id, info)
     return info
 
 
+def refresh_loop():
+    """后台预热并定期刷新所有领域，使页面请求总是命中内存缓存。"""
+    while True:
+        for category in CATEGORIES:
+            age = category_cache.age(category)
+            if age is None or age > category_cache.ttl_for(category) * 0.8:
+                try:
+                    category_cache.refresh(category)
+                except Exception as e:
+                    print(f"⚠ Prefetch of {category} failed: {e}")
+        time.sleep(REFRESH_INTERVAL)
+
+
+_refresher_started = False
+_refresher_lock = threading.Lock()
+
+
+@app.before_request
+def start_refresher():
+    # 在第一个请求时启动，避免 debug 模式下重载器的父进程也去请求上游
+    global _refresher_started
+    with _refresher_lock:
+        if _refresher_started:
+            return
+        _refresher_started = True
+    threading.Thread(target=refresh_loop, daemon=True).start()
+
+
 @app.route("/")
 def index():
-    categories = ["cs.AI", "cs.CV", "cs.LG", "cs.CL", "cs.TH", "cs.SY"]
     category = request.args.get("cat", "cs.AI")
-    papers = fetch_daily_papers(category)
-    return render_template("index.html", papers=papers, categories=categories, cur=category)
+    # 只缓存已知领域，避免任意参数把缓存撑大
+    papers = category_cache.get(category) if category in CATEGORIES else fetch_daily_papers(category)
+    return render_template("index.html", papers=papers, categories=CATEGORIES, cur=category)
+
+
+@app.route("/search")
+def search():
+    query = request.args.get("q", "").strip()
+    category = request.args.get("cat") or None
+    sort = "newest" if request.args.get("sort") == "newest" else "relevance"
+    page = max(request.args.get("page", 1, type=int), 1)
+    result = paper_index.search(query, category, limit=SEARCH_PAGE_SIZE,
+                                offset=(page - 1) * SEARCH_PAGE_SIZE, sort=sort,
+                                highlight=("\x02", "\x03"))
+    for hit in result.hits:
+        # 先转义摘要文本，再把高亮标记换成 <mark>
+        hit["snippet"] = Markup(str(escape(hit["snippet"]))
+                                .replace("\x02", "<mark>").replace("\x03", "</mark>"))
+    return render_template("search.html", result=result, q=query, cat=category or "",
+                           sort=sort, page=page, categories=CATEGORIES,
+                           indexed=len(paper_index))
 
 
 @app.route("/paper/<arxiv_id>")
 def paper_detail(arxiv_id):
-    info = fetch_paper(arxiv_id)
+    info = get_paper(arxiv_id)
 
     # BibTeX 生成
     bibtex = f"""@article{{{info['id']},
@@ -0,0 +1,317 @@
+# arxiv_index.py
+# Vendored from agent_system tools/arxiv_index.py. Do not edit here:
+# change the original and copy it over again.
+"""
+Persistent full-text index of arXiv papers (SQLite FTS5) over title,
+abstract, authors and categories.
+
+Papers are upserted by arXiv id as they are fetched: unchanged records are
+left alone, changed ones are re-indexed, and categories accumulate across
+the feeds a paper is listed in. Searches are ranked with BM25 (title and
+authors weigh more than the abstract), paginated, optionally restricted to
+one category, and never touch the network.
+
+Standalone (standard library only) so generated projects can vendor it;
+keep copies in sync with this file.
+"""
+import re
+import json
+import time
+import sqlite3
+import threading
+import unicodedata
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+# bm25() weights for the indexed columns: title, summary, authors, categories
+RANK_WEIGHTS = (10.0, 1.0, 5.0, 2.0)
+SNIPPET_TOKENS = 24
+# Record fields kept in their own columns rather than in the JSON `data`;
+# "category" (the feed a paper was listed in) is merged into categories
+_COLUMN_FIELDS = ("title", "summary", "categories", "category")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id INTEGER PRIMARY KEY,
+    arxiv_id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    authors TEXT NOT NULL,
+    categories TEXT NOT NULL,
+    published TEXT NOT NULL,
+    data TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS papers_published ON papers (published);
+CREATE TABLE IF NOT EXISTS paper_categories (
+    category TEXT NOT NULL,
+    paper INTEGER NOT NULL REFERENCES papers (id) ON DELETE CASCADE,
+    PRIMARY KEY (category, paper)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5 (
+    title, summary, authors, categories,
+    content='papers', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+    INSERT INTO papers_fts (rowid, title, summary, authors, categories)
+    VALUES (new.id, new.title, new.summary, new.authors, new.categories);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+    INSERT INTO papers_fts (papers_fts, rowid, title, summary, authors, categories)
+    VALUES ('delete', old.id, old.title, old.summary, old.authors, old.categories);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN
+    INSERT INTO papers_fts (papers_fts, rowid, title, summary, authors, categories)
+    VALUES ('delete', old.id, old.title, old.summary, old.authors, old.categories);
+    INSERT INTO papers_fts (rowid, title, summary, authors, categories)
+    VALUES (new.id, new.title, new.summary, new.authors, new.categories);
+END;
+"""
+
+_UPSERT = """
+INSERT INTO papers (arxiv_id, title, summary, authors, categories, published, data, indexed_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (arxiv_id) DO UPDATE SET
+    title = excluded.title, summary = excluded.summary, authors = excluded.authors,
+    categories = excluded.categories, published = excluded.published,
+    data = excluded.data, indexed_at = excluded.indexed_at
+WHERE papers.data IS NOT excluded.data OR papers.title IS NOT excluded.title
+    OR papers.summary IS NOT excluded.summary OR papers.categories IS NOT excluded.categories
+"""
+
+_TERM_RE = re.compile(r'"([^"]*)"|(\w+(?:[.\-/]\w+)*\*?)', re.UNICODE)
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_VERSION_RE = re.compile(r"v\d+$")
+
+
+def _query_terms(text: str) -> List[Tuple[List[str], bool]]:
+    """
+    (words, is_prefix) for each word, dotted term or quoted phrase of `text`.
+    """
+    terms = []
+    for phrase, term in _TERM_RE.findall(text):
+        words = _WORD_RE.findall(phrase or term)
+        if words:
+            terms.append((words, term.endswith("*")))
+    return terms
+
+
+def fts_query(text: str) -> str:
+    """
+    FTS5 query for free text typed by a user: every word (or "quoted
+    phrase") must match, dotted terms such as cs.AI or 2401.01234 match as
+    phrases, a trailing * keeps prefix matching, and anything else that
+    FTS5 would treat as syntax is dropped. "" if nothing is left.
+    """
+    return " ".join('"%s"%s' % (" ".join(words), "*" if prefix else "")
+                    for words, prefix in _query_terms(text))
+
+
+def _fold(word: str) -> str:
+    # Same folding as the unicode61 tokenizer: lower case, no diacritics
+    if word.isascii():
+        return word.lower()
+    return "".join(c for c in unicodedata.normalize("NFKD", word.lower())
+                   if not unicodedata.combining(c))
+
+
+def snippet(text: str, query: str, highlight: Tuple[str, str] = ("[", "]"),
+            size: int = SNIPPET_TOKENS) -> str:
+    """
+    Up to `size` words of `text` starting shortly before the first word
+    that matches `query`, with matching words wrapped in `highlight`.
+    """
+    exact, prefixes = set(), []
+    for words, prefix in _query_terms(query):
+        exact.update(_fold(w) for w in words)
+        if prefix:
+            prefixes.append(_fold(words[-1]))
+    prefixes = tuple(prefixes)
+
+    def matches(token: str) -> bool:
+        return any(w in exact or (prefixes and w.startswith(prefixes))
+                   for w in map(_fold, _WORD_RE.findall(token)))
+
+    tokens = text.split()
+    flags = [matches(t) for t in tokens]
+    first = flags.index(True) if True in flags else 0
+    start = max(0, min(first - size // 4, len(tokens) - size))
+    window = [f"{highlight[0]}{t}{highlight[1]}" if hit else t
+              for t, hit in zip(tokens[start:start + size], flags[start:start + size])]
+    return ("…" if start else "") + " ".join(window) + ("…" if start + size < len(tokens) else "")
+
+
+def _iso_date(value: str) -> str:
+    """
+    ISO-8601 form of an Atom or RSS date, so dates sort as text.
+    """
+    if not value or value[:4].isdigit():
+        return value or ""
+    try:
+        return parsedate_to_datetime(value).isoformat()
+    except (TypeError, ValueError):
+        return value
+
+
+def _paper_key(paper: Dict) -> str:
+    key = paper.get("arxiv_id") or str(paper.get("id", "")).rsplit("/abs/", 1)[-1]
+    return _VERSION_RE.sub("", key.strip())
+
+
+def _paper_categories(paper: Dict) -> List[str]:
+    categories = list(paper.get("categories") or [])
+    if paper.get("category"):
+        categories.append(paper["category"])
+    return [c for c in dict.fromkeys(categories) if c]
+
+
+@dataclass
+class SearchResult:
+    query: str
+    total: int                  # matching papers, across all pages
+    offset: int
+    limit: int
+    hits: List[Dict] = field(default_factory=list)  # papers with "score" and "snippet"
+
+    @property
+    def has_more(self) -> bool:
+        return self.offset + len(self.hits) < self.total
+
+
+class PaperIndex:
+    """
+    Thread-safe; each thread gets its own connection to the database at
+    `path` (WAL mode, so searches run while another thread adds papers).
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA foreign_keys = ON")
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT count(*) FROM papers").fetchone()[0]
+
+    def add(self, papers: Iterable[Dict]) -> int:
+        """
+        Insert or update papers (records from the feed/API parsers), in one
+        transaction. Categories are merged with those already indexed.
+        Returns how many papers were new or changed.
+        """
+        changed = 0
+        conn = self._conn()
+        with self._write_lock, conn:
+            for paper in papers:
+                key = _paper_key(paper)
+                if not key:
+                    continue
+                row = conn.execute("SELECT id, categories FROM papers WHERE arxiv_id = ?",
+                                   (key,)).fetchone()
+                categories = _paper_categories(paper)
+                if row is not None:
+                    categories = list(dict.fromkeys(row["categories"].split() + categories))
+                record = {k: v for k, v in paper.items() if k not in _COLUMN_FIELDS}
+                authors = paper.get("authors") or []
+                if isinstance(authors, str):
+                    authors = [authors]
+                cur = conn.execute(_UPSERT, (
+                    key,
+                    paper.get("title", ""),
+                    paper.get("summary", ""),
+                    ", ".join(authors),
+                    " ".join(categories),
+                    _iso_date(paper.get("published", "")),
+                    json.dumps(record, ensure_ascii=False, sort_keys=True),
+                    time.time(),
+                ))
+                if cur.rowcount:
+                    changed += 1
+                    paper_id = row["id"] if row is not None else cur.lastrowid
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO paper_categories (category, paper) VALUES (?, ?)",
+                        [(c, paper_id) for c in categories])
+        return changed
+
+    def get(self, arxiv_id: str) -> Optional[Dict]:
+        row = self._conn().execute("SELECT * FROM papers WHERE arxiv_id = ?",
+                                   (_paper_key({"arxiv_id": arxiv_id}),)).fetchone()
+        return None if row is None else self._record(row)
+
+    def search(self, query: str, category: Optional[str] = None, limit: int = 20,
+               offset: int = 0, sort: str = "relevance",
+               highlight: Tuple[str, str] = ("[", "]")) -> SearchResult:
+        """
+        Papers matching the free-text `query` (see fts_query), best first
+        (or newest first with sort="newest"). `highlight` wraps the matched
+        words in each hit's "snippet" of the abstract.
+        """
+        match = fts_query(query)
+        result = SearchResult(query, 0, offset, limit)
+        if not match:
+            return result
+
+        # FTS5 drives the query; the category (if any) is checked per match
+        # through the paper_categories primary key
+        source = "papers_fts"
+        params: List = [match]
+        if category:
+            source += (" CROSS JOIN paper_categories AS pc"
+                       " ON pc.category = ? AND pc.paper = papers_fts.rowid")
+            params.insert(0, category)
+        conn = self._conn()
+        result.total = conn.execute(
+            f"SELECT count(*) FROM {source} WHERE papers_fts MATCH ?", params).fetchone()[0]
+        if result.total <= offset:
+            return result
+
+        # Rank first, then load the records of this page only
+        rank = "bm25(papers_fts, %s)" % ", ".join(map(str, RANK_WEIGHTS))
+        if sort == "newest":
+            source += " JOIN papers ON papers.id = papers_fts.rowid"
+            order = "papers.published DESC"
+        else:
+            order = "score"
+        page = conn.execute(
+            f"SELECT papers_fts.rowid, {rank} AS score FROM {source} "
+            f"WHERE papers_fts MATCH ? ORDER BY {order} LIMIT ? OFFSET ?",
+            [*params, limit, offset]).fetchall()
+        marks = ", ".join("?" * len(page))
+        rows = {row["id"]: row for row in conn.execute(
+            f"SELECT * FROM papers WHERE id IN ({marks})", [rowid for rowid, _ in page])}
+        for rowid, score in page:
+            hit = self._record(rows[rowid])
+            # bm25 is lower for better matches; report higher-is-better
+            hit["score"] = -score
+            hit["snippet"] = snippet(hit["summary"], query, highlight)
+            result.hits.append(hit)
+        return result
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict:
+        paper = json.loads(row["data"])
+        paper["title"], paper["summary"] = row["title"], row["summary"]
+        paper["categories"] = row["categories"].split()
+        paper["category"] = paper["categories"][0] if paper["categories"] else ""
+        return paper
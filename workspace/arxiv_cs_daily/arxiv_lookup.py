@@ -0,0 +1,285 @@
+# arxiv_lookup.py
+# Vendored from agent_system tools/arxiv_lookup.py. Do not edit here:
+# change the original and copy it over again.
+"""
+arXiv API client pieces: a streaming Atom parser, a paging query
+iterator, and paper lookups with request coalescing and id_list batching.
+
+Concurrent lookups of the same id share one upstream request
+(single-flight), and distinct ids requested within `window` seconds of
+each other are fetched together in one `id_list=` query whose Atom reply
+is split back per id. Under bursty traffic upstream calls grow with the
+number of batches rather than the number of requests. Ids that are not
+valid arXiv ids are answered with None without a query (arXiv rejects a
+whole id_list holding one), and a failed batch is split in halves and
+retried, so an error reaches only the lookups of the ids that caused it.
+
+Standalone (standard library plus requests) so generated projects can
+vendor it; keep copies in sync with this file.
+"""
+import re
+import time
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+ARXIV_API = "http://export.arxiv.org/api/query"
+BATCH_WINDOW = 0.05     # seconds to wait for more ids before sending a batch
+MAX_BATCH = 50          # ids per id_list query
+MAX_PARALLEL = 4        # batches in flight at once
+REQUEST_TIMEOUT = (5, 20)
+PAGE_SIZE = 500         # max_results per page when paging through a query
+PAGE_DELAY = 3.0        # seconds between pages, as arXiv's API terms ask
+CHUNK_SIZE = 64 * 1024  # bytes read from the HTTP body at a time
+
+NS = {"atom": "http://www.w3.org/2005/Atom", "arxiv": "http://arxiv.org/schemas/atom",
+      "opensearch": "http://a9.com/-/spec/opensearch/1.1/"}
+ENTRY_TAG = "{%s}entry" % NS["atom"]
+TOTAL_TAG = "{%s}totalResults" % NS["opensearch"]
+_VERSION_RE = re.compile(r"v\d+$")
+# New-style ids (2401.01234) and old-style ones (hep-th/9901001, math.CO/0601001)
+_ARXIV_ID_RE = re.compile(r"\d{4}\.\d{4,5}|[a-z]+(?:-[a-z]+)*(?:\.[A-Z]{2})?/\d{7}")
+
+
+def normalize_arxiv_id(value: str) -> str:
+    """
+    Bare arXiv id without prefix or version: "oai:arXiv.org:2401.01234v2",
+    "https://arxiv.org/abs/2401.01234v2" and "2401.01234" all give
+    "2401.01234". Old-style ids keep their archive ("cs/0112017").
+    """
+    value = value.strip()
+    for marker in ("/abs/", "/pdf/", "arXiv.org:", "arxiv.org:"):
+        if marker in value:
+            value = value.split(marker, 1)[1]
+            break
+    if value.endswith(".pdf"):
+        value = value[:-4]
+    return _VERSION_RE.sub("", value)
+
+
+def is_arxiv_id(value: str) -> bool:
+    """
+    Whether `value` (already normalized) follows the arXiv id grammar.
+    """
+    return _ARXIV_ID_RE.fullmatch(value) is not None
+
+
+def _text(entry, path: str) -> str:
+    node = entry.find(path, NS)
+    return (node.text or "").strip() if node is not None else ""
+
+
+def entry_to_paper(entry) -> Dict:
+    """
+    Paper record from one Atom <entry> element.
+    """
+    pdf = entry.find("atom:link[@type='application/pdf']", NS)
+    primary = entry.find("arxiv:primary_category", NS)
+    full_id = _text(entry, "atom:id")
+    return {
+        "id": full_id.split("/abs/")[-1],
+        "arxiv_id": normalize_arxiv_id(full_id),
+        "title": " ".join(_text(entry, "atom:title").split()),
+        "summary": _text(entry, "atom:summary"),
+        "published": _text(entry, "atom:published"),
+        "updated": _text(entry, "atom:updated"),
+        "authors": [_text(a, "atom:name") for a in entry.findall("atom:author", NS)],
+        "pdf_url": pdf.attrib.get("href", "") if pdf is not None else "",
+        "category": primary.attrib.get("term", "") if primary is not None else "",
+    }
+
+
+def iter_atom_entries(chunks: Iterable[bytes], meta: Optional[Dict[str, Any]] = None) -> Iterator[Dict]:
+    """
+    Paper records from an Atom document arriving in `chunks`, yielded as
+    soon as each <entry> is complete. Finished entries are cleared and
+    detached from the tree, so memory stays flat however long the feed is.
+    If given, `meta["total"]` is set from <opensearch:totalResults>.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = elem
+            elif elem.tag == ENTRY_TAG:
+                paper = entry_to_paper(elem)
+                elem.clear()
+                if root is not None and elem in root:
+                    root.remove(elem)
+                yield paper
+            elif elem.tag == TOTAL_TAG and meta is not None:
+                meta["total"] = int((elem.text or "0").strip() or 0)
+    parser.close()
+
+
+def parse_atom(xml: bytes) -> List[Dict]:
+    return list(iter_atom_entries([xml]))
+
+
+def iter_query(params: Dict[str, Any], api_url: str = ARXIV_API, limit: Optional[int] = None,
+               page_size: int = PAGE_SIZE, page_delay: float = PAGE_DELAY,
+               session: Optional[requests.Session] = None,
+               timeout=REQUEST_TIMEOUT) -> Iterator[Dict]:
+    """
+    Papers matching an API query (search_query, sortBy, ...), streamed as
+    they are parsed and paged through with start=/max_results= until
+    `limit` papers, the query's totalResults or an empty page is reached.
+    Stopping the iteration early closes the current response.
+    """
+    session = session or requests
+    start = yielded = 0
+    while limit is None or yielded < limit:
+        size = page_size if limit is None else min(page_size, limit - yielded)
+        meta: Dict[str, Any] = {}
+        received = 0
+        with session.get(api_url, params=dict(params, start=start, max_results=size),
+                         stream=True, timeout=timeout) as resp:
+            resp.raise_for_status()
+            for paper in iter_atom_entries(resp.iter_content(CHUNK_SIZE), meta):
+                received += 1
+                yielded += 1
+                yield paper
+                if limit is not None and yielded >= limit:
+                    return
+        start += received
+        if received == 0 or start >= meta.get("total", start + 1):
+            return
+        if page_delay:
+            time.sleep(page_delay)
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Optional[Dict] = None
+        self.error: Optional[BaseException] = None
+
+
+class PaperLookup:
+    """
+    Thread-safe paper lookups by arXiv id; see the module docstring.
+
+    get()/get_many() block the calling thread until the batch holding the
+    id has been answered. Invalid ids and ids the API does not return map
+    to None.
+    `fetch` replaces the HTTP call (ids -> {arxiv_id: paper}), e.g. in tests.
+    """
+
+    def __init__(self, api_url: str = ARXIV_API, window: float = BATCH_WINDOW,
+                 max_batch: int = MAX_BATCH, max_parallel: int = MAX_PARALLEL,
+                 timeout=REQUEST_TIMEOUT,
+                 fetch: Optional[Callable[[List[str]], Dict[str, Dict]]] = None):
+        self.api_url = api_url
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.fetch = fetch or self.fetch_batch
+        self.session = requests.Session()
+        self.stats = {"lookups": 0, "coalesced": 0, "batches": 0, "ids_fetched": 0}
+        self._cond = threading.Condition()
+        self._inflight: Dict[str, _Call] = {}
+        self._queue: List[str] = []
+        self._pool = ThreadPoolExecutor(max_parallel, thread_name_prefix="arxiv-lookup")
+        self._dispatcher: Optional[threading.Thread] = None
+
+    def get(self, arxiv_id: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        key = normalize_arxiv_id(arxiv_id)
+        return self.get_many([key], timeout)[key]
+
+    def get_many(self, ids: Iterable[str], timeout: Optional[float] = None) -> Dict[str, Optional[Dict]]:
+        """
+        Look up several ids; returns {normalized id: paper or None}. Raises
+        the upstream error if the batch holding an id failed, and
+        TimeoutError if `timeout` seconds pass first.
+        """
+        keys = list(dict.fromkeys(normalize_arxiv_id(i) for i in ids))
+        results: Dict[str, Optional[Dict]] = {}
+        calls: Dict[str, _Call] = {}
+        with self._cond:
+            for key in keys:
+                self.stats["lookups"] += 1
+                if not is_arxiv_id(key):
+                    results[key] = None
+                    continue
+                call = self._inflight.get(key)
+                if call is not None:
+                    self.stats["coalesced"] += 1
+                else:
+                    call = self._inflight[key] = _Call()
+                    self._queue.append(key)
+                calls[key] = call
+            if self._queue:
+                self._ensure_dispatcher()
+                self._cond.notify_all()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for key, call in calls.items():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not call.event.wait(remaining):
+                raise TimeoutError(f"arXiv lookup of {key} timed out")
+            if call.error is not None:
+                raise call.error
+            results[key] = call.result
+        return results
+
+    def fetch_batch(self, ids: List[str]) -> Dict[str, Dict]:
+        """
+        One id_list query for `ids`; returns the papers found, by id.
+        """
+        params = {"id_list": ",".join(ids), "max_results": len(ids)}
+        with self.session.get(self.api_url, params=params, stream=True,
+                              timeout=self.timeout) as resp:
+            resp.raise_for_status()
+            return {p["arxiv_id"]: p for p in iter_atom_entries(resp.iter_content(CHUNK_SIZE))}
+
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(target=self._dispatch, daemon=True,
+                                                name="arxiv-lookup-dispatch")
+            self._dispatcher.start()
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                # Collect ids for up to `window` seconds or until the batch is full
+                deadline = time.monotonic() + self.window
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._queue[:self.max_batch]
+                del self._queue[:self.max_batch]
+            self._pool.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch: List[str]) -> None:
+        outcomes = self._fetch_split(batch)
+        with self._cond:
+            self.stats["ids_fetched"] += len(batch)
+            for key in batch:
+                call = self._inflight.pop(key)
+                call.result, call.error = outcomes[key]
+                call.event.set()
+
+    def _fetch_split(self, batch: List[str]) -> Dict[str, Tuple[Optional[Dict], Optional[BaseException]]]:
+        # {id: (paper or None, error)}; a failed batch is retried in halves
+        with self._cond:
+            self.stats["batches"] += 1
+        try:
+            found = self.fetch(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                return {batch[0]: (None, e)}
+            mid = len(batch) // 2
+            return {**self._fetch_split(batch[:mid]), **self._fetch_split(batch[mid:])}
+        return {key: (found.get(key), None) for key in batch}